@@ -1,7 +1,8 @@
 from lux.game import Game
-from bots.genutil import GenConstruct
+from bots.genutil import GenConstruct, Genome
 import bots.bot as bot
 from bots.statements import GameSpace
+from bots.utility import Actions
 from loguru import logger
 import datetime
 
@@ -13,47 +14,80 @@ gen_const = GenConstruct()
 genome = gen_const.init_daily_genome()
 game_state = None
 game_space = GameSpace()
+random_agent = None
+
+
+class RandomAgent:
+    """Random genome agent with own game statements
+
+    NOTE: each object plays a single game at once, so some games
+    can be played concurrently by separate objects
+    """
+
+    def __init__(
+        self,
+        genome: Genome,
+        gen_const: GenConstruct,
+        game_space: GameSpace = None
+        ) -> None:
+        self.genome = genome
+        self.gen_const = gen_const
+        self.game_space = game_space or GameSpace()
+        self.game_state: Game = None
+
+    def __call__(self, observation, configuration) -> Actions:
+        start = datetime.datetime.now()
+
+        # Do not edit
+        if observation["step"] == 0:
+            self.game_state = Game()
+            self.game_state._initialize(observation["updates"])
+            self.game_state._update(observation["updates"][2:])
+            self.game_state.id = observation.player
+        else:
+            self.game_state._update(observation["updates"])
+        game_state = self.game_state
+
+        # Bot code
+        if game_state.turn == 0:
+            logger.info('Agent is running!')
+            # drop missions_state each game
+            self.game_space.missions_state = {}
+        self.game_space.set_map_statements(game_state=game_state)
+
+        logger.info(f'-------------------> Start random turn {game_state.turn} <')
+        logger.info(f'missions_state: {self.game_space.missions_state}')
+        player = game_state.players[observation.player]
+        opponent = game_state.players[(observation.player + 1) % 2]
+
+        actions, _ = bot.get_bot_actions(
+            genome=self.genome,
+            game_state=game_state,
+            player=player,
+            opponent=opponent,
+            game_space=self.game_space,
+            gen_const=self.gen_const
+            )
+
+        end = datetime.datetime.now()
+        logger.info('time on this step: {}'.format(end - start))
+        logger.info(f'-------------------> End random turn {game_state.turn} <')
+
+        return actions
 
 
 def agent(observation, configuration):
-    start = datetime.datetime.now()
 
     global game_state
-    global genome
-    global game_space
+    global random_agent
 
-    # Do not edit
     if observation["step"] == 0:
-        game_state = Game()
-        game_state._initialize(observation["updates"])
-        game_state._update(observation["updates"][2:])
-        game_state.id = observation.player
-    else:
-        game_state._update(observation["updates"])
-
-    # Bot code
-    if game_state.turn == 0:
-        logger.info('Agent is running!')
-        # drop missions_state each game
-        game_space.missions_state = {}
-    game_space.set_map_statements(game_state=game_state)
-
-    logger.info(f'-------------------> Start random turn {game_state.turn} <')
-    logger.info(f'missions_state: {game_space.missions_state}')
-    player = game_state.players[observation.player]
-    opponent = game_state.players[(observation.player + 1) % 2]
-
-    actions, _ = bot.get_bot_actions(
-        genome=genome,
-        game_state=game_state,
-        player=player,
-        opponent=opponent,
-        game_space=game_space,
-        gen_const=gen_const
-        )
-
-    end = datetime.datetime.now()
-    logger.info('time on this step: {}'.format(end - start))
-    logger.info(f'-------------------> End random turn {game_state.turn} <')
+        random_agent = RandomAgent(
+            genome=genome,
+            gen_const=gen_const,
+            game_space=game_space
+            )
+    actions = random_agent(observation, configuration)
+    game_state = random_agent.game_state
 
     return actions
@@ -1,7 +1,10 @@
 from lux.game import Game
+from bots.genutil import GenConstruct, Genome
 from bots.statements import GameSpace, SubGameSpace
 import bots.bot as bot
 from bots.scoring import TurnScoring
+from bots.utility import Actions
+from engine.simulator import GameDecided
 from loguru import logger
 
 
@@ -12,63 +15,119 @@ gen_const = None
 genome = None
 subgame_space: SubGameSpace = None
 game_space = GameSpace()
+train_agent = None
+
+
+class TrainAgent:
+    """Trained agent with own game statements
+
+    NOTE: each object plays a single game at once, so some games
+    can be played concurrently by separate objects, that share subgame_space.
+    With early_stop the agent finalizes score of decided game and raises
+    GameDecided, engines from engine folder stop such game
+    """
+
+    def __init__(
+        self,
+        genome: Genome,
+        gen_const: GenConstruct,
+        subgame_space: SubGameSpace,
+        game_space: GameSpace = None,
+        early_stop: bool = False,
+        game_num: int = None
+        ) -> None:
+        self.genome = genome
+        self.gen_const = gen_const
+        self.subgame_space = subgame_space
+        self.game_space = game_space or GameSpace()
+        self.game_state: Game = None
+        # number of game is fixed, if games are not played in order
+        self.episode = game_num
+        self.game_num: int = None
+        self.early_stop = early_stop
+
+    def __call__(self, observation, configuration) -> Actions:
+
+        # Do not edit
+        if observation["step"] == 0:
+            self.game_state = Game()
+            self.game_state._initialize(observation["updates"])
+            self.game_state._update(observation["updates"][2:])
+            self.game_state.id = observation.player
+        else:
+            self.game_state._update(observation["updates"])
+        game_state = self.game_state
+
+        # Bot code
+        if game_state.turn == 0:
+            # drop missions_state each game
+            self.game_space.missions_state = {}
+        self.game_space.set_map_statements(game_state=game_state)
+
+        player = game_state.players[observation.player]
+        opponent = game_state.players[(observation.player + 1) % 2]
+
+        actions, turn_space = bot.get_bot_actions(
+            genome=self.genome,
+            game_state=game_state,
+            player=player,
+            opponent=opponent,
+            game_space=self.game_space,
+            gen_const=self.gen_const
+            )
+
+        # start scoring
+
+        if game_state.turn == 0:
+            # score additional scoring for each game
+            if self.episode is None:
+                self.subgame_space.game_num += 1
+                self.game_num = self.subgame_space.game_num
+            else:
+                self.game_num = self.episode
+            self.subgame_space.cross_game_score[self.game_num] = 0
+
+        turn_scoring = TurnScoring(
+            turn=game_state.turn,
+            tiles=turn_space.tiles
+            )
+
+        # day plus night scoring
+        # score = turn_scoring.day_plus_night_turn_scoring()
+
+        # each turn scoring
+        score = turn_scoring.each_turn_scoring(weighted=False)
+
+        if score:
+            self.subgame_space.cross_game_score[self.game_num] += score
+
+        if self.early_stop and game_state.turn < 359 and turn_scoring.is_decided():
+            # the rest of game is scored without playing
+            units, final_units = turn_scoring.remaining_units()
+            for turn, turn_units in enumerate(units, start=game_state.turn + 1):
+                score = TurnScoring.turn_score(turn=turn, citytiles=0, units=turn_units, weighted=False)
+                if score:
+                    self.subgame_space.cross_game_score[self.game_num] += score
+            raise GameDecided(reward=final_units)
+
+        # end scoring
+
+        return actions
 
 
 def agent(observation, configuration):
 
     global game_state
-    global genome
-    global game_space
-    global subgame_space
+    global train_agent
 
-    # Do not edit
     if observation["step"] == 0:
-        game_state = Game()
-        game_state._initialize(observation["updates"])
-        game_state._update(observation["updates"][2:])
-        game_state.id = observation.player
-    else:
-        game_state._update(observation["updates"])
-
-    # Bot code
-    if game_state.turn == 0:
-        # drop missions_state each game
-        game_space.missions_state = {}
-    game_space.set_map_statements(game_state=game_state)
-    
-    player = game_state.players[observation.player]
-    opponent = game_state.players[(observation.player + 1) % 2]
-
-    actions, turn_space = bot.get_bot_actions(
-        genome=genome,
-        game_state=game_state,
-        player=player,
-        opponent=opponent,
-        game_space=game_space,
-        gen_const=gen_const
-        )
-
-    # start scoring
-
-    if game_state.turn == 0:
-        # score additional scoring for each game
-        subgame_space.game_num += 1
-        subgame_space.cross_game_score[subgame_space.game_num] = 0
-    
-    turn_scoring = TurnScoring(
-        turn=game_state.turn, 
-        tiles=turn_space.tiles
-        )
-    
-    # day plus night scoring
-    # score = turn_scoring.day_plus_night_turn_scoring()
-    
-    # each turn scoring
-    score = turn_scoring.each_turn_scoring(weighted=False)
-    
-    if score:
-        subgame_space.cross_game_score[subgame_space.game_num] =+ score
-
-    # end scoring
+        train_agent = TrainAgent(
+            genome=genome,
+            gen_const=gen_const,
+            subgame_space=subgame_space,
+            game_space=game_space
+            )
+    actions = train_agent(observation, configuration)
+    game_state = train_agent.game_state
 
     return actions
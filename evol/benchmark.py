@@ -0,0 +1,368 @@
+from engine.simulator import Observation, run_episode
+from engine.mapgen import MAP_SIZES
+from typing import Any, Callable, Dict, List, Tuple
+from loguru import logger
+import os, sys, json, time, random, platform, statistics, subprocess, tracemalloc
+import click
+
+
+# game phases by turn: [start, end)
+PHASES = {'early': (0, 120), 'mid': (120, 240), 'late': (240, 360)}
+PERCENTILES = [50, 90, 99]
+
+Agent = Callable[[Observation, dict], List[str]]
+Stream = Dict[str, Any]
+
+
+def _commit() -> str:
+    """Short hash of current commit, dirty tree is marked
+    """
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        dirty = subprocess.check_output(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            stderr=subprocess.DEVNULL, text=True
+            ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{commit}-dirty' if dirty else commit
+
+
+def make_agent(name: str, genome_path: str) -> Agent:
+    """Fresh agent of benchmark
+
+    Args:
+        name (str): 'agent' for submission agent or 'agent_train' for trained agent
+        genome_path (str): genome of trained agent
+
+    Returns:
+        Agent: agent function
+    """
+    if name == 'agent':
+        import agent
+        return agent.agent
+
+    import agent_train
+    from bots.genutil import GenConstruct
+    from bots.statements import SubGameSpace
+    with open(genome_path, 'r') as f:
+        vector = json.load(f)
+    gen_const = GenConstruct()
+    return agent_train.TrainAgent(
+        genome=gen_const.convert_daily_genome(vector=vector),
+        gen_const=gen_const,
+        subgame_space=SubGameSpace()
+        )
+
+
+def record_stream(agent: Agent, size: int, seed: int) -> Stream:
+    """Play game of agent with simple_agent and record observations of agent
+
+    Args:
+        agent (Agent): agent of player 0
+        size (int): map size
+        seed (int): map seed, random module is seeded by it too
+
+    Returns:
+        Stream: size, seed, player and observations of each turn
+    """
+    observations = []
+
+    def recorder(observation: Observation, configuration: dict) -> List[str]:
+        observations.append({
+            'step': observation['step'],
+            'updates': list(observation['updates'])
+            })
+        return agent(observation, configuration)
+
+    random.seed(seed)
+    run_episode(
+        agents=[recorder, 'simple_agent'],
+        configuration={'seed': seed, 'rows': size, 'columns': size}
+        )
+    return {'size': size, 'seed': seed, 'player': 0, 'observations': observations}
+
+
+def load_replay(path: str, player: int = 0) -> Stream:
+    """Observation stream of player from replay of runner.py
+
+    NOTE: kaggle keeps shared observation fields (updates, step) in observation
+    of the first agent only
+
+    Args:
+        path (str): replay json
+        player (int, optional): player index. Defaults to 0
+
+    Returns:
+        Stream: size, seed, player and observations of each turn
+    """
+    with open(path, 'r') as f:
+        replay = json.load(f)
+    observations = []
+    for step, agents in enumerate(replay['steps']):
+        if agents[player]['status'] != 'ACTIVE':
+            break
+        shared = agents[0]['observation']
+        observations.append({'step': shared.get('step', step), 'updates': shared['updates']})
+    size = int(observations[0]['updates'][1].split()[0])
+    seed = replay.get('configuration', {}).get('seed')
+    return {'size': size, 'seed': seed, 'player': player, 'observations': observations}
+
+
+def replay_stream(
+    agent: Agent,
+    stream: Stream,
+    memory: bool = False
+    ) -> List[Dict[str, float]]:
+    """Pass observations of stream to agent and measure each turn
+
+    Args:
+        agent (Agent): agent function, its actions are dropped
+        stream (Stream): observation stream
+        memory (bool, optional): trace memory, latency is not valid then. Defaults to False
+
+    Returns:
+        List[Dict[str, float]]: turn, latency in ms and, with memory, peak and
+        retained kilobytes and retained memory blocks of each turn
+    """
+    configuration = {'seed': stream['seed'], 'rows': stream['size'], 'columns': stream['size']}
+    random.seed(stream['seed'])
+    turns = []
+    for obs in stream['observations']:
+        observation = Observation(
+            player=stream['player'],
+            step=obs['step'],
+            updates=obs['updates'],
+            remainingOverageTime=60,
+            reward=0
+            )
+        if memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        agent(observation, configuration)
+        turn = {'turn': obs['step'], 'ms': (time.perf_counter() - start) * 1000}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            turn.update(
+                peak_kb=(peak - before) / 1024,
+                retained_kb=(current - before) / 1024,
+                blocks=sys.getallocatedblocks() - blocks
+                )
+        turns.append(turn)
+    return turns
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile with linear interpolation
+    """
+    values = sorted(values)
+    if not values:
+        return 0.
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(latency: List[Dict[str, float]], memory: List[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Latency percentiles and memory of turns by game phases
+
+    Args:
+        latency (List[Dict[str, float]]): turns of latency passes
+        memory (List[Dict[str, float]], optional): turns of memory pass. Defaults to None
+
+    Returns:
+        Dict[str, Any]: statistics of each phase and of all game
+    """
+    phases = dict(PHASES, all=(0, 360))
+    summary = {}
+    for phase, (begin, end) in phases.items():
+        values = [turn['ms'] for turn in latency if begin <= turn['turn'] < end]
+        if not values:
+            continue
+        stats = {'turns': len(values), 'mean_ms': statistics.mean(values), 'max_ms': max(values)}
+        for q in PERCENTILES:
+            stats[f'p{q}_ms'] = percentile(values, q)
+        turns = [turn for turn in memory or [] if begin <= turn['turn'] < end]
+        if turns:
+            stats.update(
+                peak_kb=max(turn['peak_kb'] for turn in turns),
+                mean_peak_kb=statistics.mean(turn['peak_kb'] for turn in turns),
+                retained_kb=sum(turn['retained_kb'] for turn in turns),
+                blocks=sum(turn['blocks'] for turn in turns)
+                )
+        summary[phase] = stats
+    return summary
+
+
+def benchmark(
+    agent_name: str,
+    genome_path: str,
+    streams: List[Stream],
+    repeat: int = 3,
+    memory: bool = True
+    ) -> Dict[str, Any]:
+    """Replay streams by fresh agents and collect statistics by map size
+
+    NOTE: latency of turn is the best of repeat passes, memory is traced
+    by separate pass, because tracemalloc slows down the agent
+
+    Args:
+        agent_name (str): 'agent' or 'agent_train'
+        genome_path (str): genome of trained agent
+        streams (List[Stream]): observation streams
+        repeat (int, optional): latency passes of each stream. Defaults to 3
+        memory (bool, optional): trace memory. Defaults to True
+
+    Returns:
+        Dict[str, Any]: statistics of each map size
+    """
+    by_size: Dict[int, Tuple[list, list]] = {}
+    for stream in streams:
+        passes = [
+            replay_stream(make_agent(agent_name, genome_path), stream)
+            for _ in range(repeat)
+            ]
+        latency = [
+            {'turn': turns[0]['turn'], 'ms': min(turn['ms'] for turn in turns)}
+            for turns in zip(*passes)
+            ]
+        traced = []
+        if memory:
+            tracemalloc.start()
+            traced = replay_stream(make_agent(agent_name, genome_path), stream, memory=True)
+            tracemalloc.stop()
+        latency_turns, memory_turns = by_size.setdefault(stream['size'], ([], []))
+        latency_turns.extend(latency)
+        memory_turns.extend(traced)
+        click.echo(
+            f'Map {stream["size"]}, seed {stream["seed"]}: {len(latency)} turns, '
+            f'{sum(turn["ms"] for turn in latency) / 1000:.2f}s'
+            )
+    return {
+        str(size): summarize(latency, memory)
+        for size, (latency, memory) in sorted(by_size.items())
+        }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print latency of results relative to baseline
+
+    Args:
+        results (Dict[str, Any]): current results
+        baseline (Dict[str, Any]): results of other commit
+        tolerance (float): allowed relative growth of latency
+
+    Returns:
+        List[str]: regressed statistics
+    """
+    click.echo(f'Compared with {baseline["meta"]["commit"]}:')
+    regressions = []
+    for size, phases in results['sizes'].items():
+        for phase, stats in phases.items():
+            base = baseline['sizes'].get(size, {}).get(phase)
+            if base is None:
+                continue
+            line = []
+            for key in [f'p{q}_ms' for q in PERCENTILES]:
+                ratio = stats[key] / base[key] if base[key] else 1.
+                line.append(f'{key} {ratio:.2f}x')
+                if ratio > 1 + tolerance:
+                    regressions.append(f'{size}/{phase}/{key}')
+            click.echo(f'{size:>4} {phase:<6} ' + ' '.join(line))
+    return regressions
+
+
+@click.command()
+@click.option('--agent', 'agent_name', default='agent', show_default=True,
+              type=click.Choice(['agent', 'agent_train']), help='benchmarked agent')
+@click.option('--genome', 'genome_path', default='bots_dump/best_bot.json', show_default=True,
+              help='genome of agent_train')
+@click.option('--sizes', default=','.join(map(str, MAP_SIZES)), show_default=True,
+              help='map sizes of recorded streams')
+@click.option('--seed', default=42, show_default=True, type=int, help='map seed of recorded streams')
+@click.option('--streams', 'streams_dir', default='replays/benchmark', show_default=True,
+              help='folder of recorded streams, missing streams are recorded once')
+@click.option('-record', is_flag=True, help='record streams again')
+@click.option('--replay', 'replays', multiple=True,
+              help='replay of runner.py to benchmark instead of recorded streams')
+@click.option('--player', default=0, show_default=True, type=int, help='player of replays')
+@click.option('--repeat', default=3, show_default=True, type=int, help='latency passes of each stream')
+@click.option('--memory/--no-memory', default=True, show_default=True, help='trace memory of turns')
+@click.option('--out', default='', help='results json. Defaults to benchmarks/benchmark_<commit>.json')
+@click.option('--compare', 'baseline_path', default='', help='results json of other commit')
+@click.option('--tolerance', default=0.1, show_default=True, type=float,
+              help='allowed relative growth of latency percentiles')
+def main(agent_name, genome_path, sizes, seed, streams_dir, record, replays, player, repeat,
+         memory, out, baseline_path, tolerance):
+    """Benchmark of agent turn latency and memory on fixed observation streams"""
+
+    # must be set before bots are imported by agents
+    os.environ['BOT_TRACE'] = '0'
+    os.environ['BOT_PROFILE'] = '0'
+    logger.remove()
+
+    if replays:
+        streams = [load_replay(path, player=player) for path in replays]
+    else:
+        streams = []
+        os.makedirs(streams_dir, exist_ok=True)
+        for size in map(int, sizes.split(',')):
+            path = os.path.join(streams_dir, f'stream_{size}_{seed}.json')
+            if record or not os.path.exists(path):
+                stream = record_stream(make_agent(agent_name, genome_path), size=size, seed=seed)
+                with open(path, 'w') as f:
+                    json.dump(stream, f)
+                click.echo(f'Stream is recorded: {path}')
+            with open(path, 'r') as f:
+                streams.append(json.load(f))
+
+    start = time.perf_counter()
+    results = {
+        'meta': {
+            'commit': _commit(),
+            'agent': agent_name,
+            'genome': genome_path if agent_name == 'agent_train' else 'bots_dump/best_bot.json',
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+            'streams': [
+                {'size': stream['size'], 'seed': stream['seed'], 'turns': len(stream['observations'])}
+                for stream in streams
+                ]
+            },
+        'sizes': benchmark(agent_name, genome_path, streams, repeat=repeat, memory=memory)
+        }
+    results['meta']['seconds'] = time.perf_counter() - start
+
+    click.echo(f'{"size":>4} {"phase":<6} {"p50, ms":>9} {"p90, ms":>9} {"p99, ms":>9} {"max, ms":>9} {"peak, kb":>9}')
+    for size, phases in results['sizes'].items():
+        for phase, stats in phases.items():
+            click.echo(
+                f'{size:>4} {phase:<6} {stats["p50_ms"]:>9.3f} {stats["p90_ms"]:>9.3f} '
+                f'{stats["p99_ms"]:>9.3f} {stats["max_ms"]:>9.3f} {stats.get("peak_kb", 0):>9.1f}'
+                )
+
+    if not out:
+        os.makedirs('benchmarks', exist_ok=True)
+        out = f'benchmarks/benchmark_{results["meta"]["commit"]}.json'
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    click.echo(f'Results: {out}')
+
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, tolerance)
+        if regressions:
+            click.echo(f'Latency regressions: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
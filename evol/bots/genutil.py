@@ -1,11 +1,73 @@
 from collections import namedtuple
-from typing import List
+from typing import Dict, List, Tuple
 from bots.missions import (
-    WorkerMission, CartMission, CityMission
+    WorkerMission, CartMission, CityMission, MISSION_NAMES, REGISTRY
 )
+from bots.utility import CALENDAR
+import numpy as np
 import random
 
 
+# daily genome segments: each day and each night of game
+DAILY_SEGMENT_OF_TURN: np.ndarray = CALENDAR.phase[:CALENDAR.max_days]
+
+
+class Genome:
+    """Missions weights timeline of the game
+
+    Weights are kept in array (segment, mission), each turn of game
+    refers to its segment. Normalized weights of each segment are
+    precomputed once, so turn lookup costs nothing. Probabilities of turn
+    are tuple in order of columns, column of mission is kept in registry
+    of missions
+
+    NOTE: segment with zero weights of all missions has zero probabilities
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        segment_of_turn: np.ndarray,
+        missions: List[str]
+        ) -> None:
+        self.weights = np.asarray(weights, dtype=np.int64)
+        self.segment_of_turn = np.asarray(segment_of_turn, dtype=np.intp)
+        self.missions = list(missions)
+        self.columns: Dict[str, int] = {name: i for i, name in enumerate(self.missions)}
+        total = self.weights.sum(axis=1, keepdims=True)
+        self.probabilities = np.divide(
+            self.weights, total, out=np.zeros(self.weights.shape), where=total > 0
+            )
+        self._lines: List[Tuple[float, ...]] = [
+            tuple(row) for row in self.probabilities.tolist()
+            ]
+        self._turn_lines: List[Tuple[float, ...]] = [
+            self._lines[segment] for segment in self.segment_of_turn.tolist()
+            ]
+
+    def __len__(self) -> int:
+        return len(self._turn_lines)
+
+    def __getitem__(self, turn: int) -> Tuple[float, ...]:
+        """Get missions probabilities of turn
+
+        Args:
+            turn (int): game turn
+
+        Returns:
+            Tuple[float, ...]: probability of each mission in order of columns
+        """
+        return self._turn_lines[turn]
+
+    def to_vector(self) -> List[int]:
+        """Get flat genome vector
+
+        Returns:
+            List[int]: weights of all segments
+        """
+        return self.weights.ravel().tolist()
+
+
 class GenConstruct:
     """Class where genome vector or genome tuple constructed
     """
@@ -25,11 +87,7 @@ class GenConstruct:
             List[str]: list of method names
         """
         if self.__workers_per is None:
-            self.__workers_per = [
-                method
-                for method in dir(WorkerMission)
-                if method.startswith('mission_')
-                ]
+            self.__workers_per = list(REGISTRY[WorkerMission])
         return self.__workers_per
     
     @property
@@ -40,11 +98,7 @@ class GenConstruct:
             List[str]: list of method names
         """
         if self.__carts_per is None:
-            self.__carts_per = [
-                method
-                for method in dir(CartMission)
-                if method.startswith('mission_')
-                ]
+            self.__carts_per = list(REGISTRY[CartMission])
         return self.__carts_per
     
     @property
@@ -55,11 +109,7 @@ class GenConstruct:
             List[str]: list of method names
         """
         if self.__citytiles_per is None:
-            self.__citytiles_per = [
-                method
-                for method in dir(CityMission)
-                if method.startswith('mission_')
-                ]
+            self.__citytiles_per = list(REGISTRY[CityMission])
         return self.__citytiles_per
     
     @property
@@ -70,85 +120,87 @@ class GenConstruct:
             namedtuple: empty genome object
         """
         if self.__Probability is None:
-            per = list(set(self.workers_per + self.carts_per + self.citytiles_per))
-            self.__Probability = namedtuple('Probability', per)
+            self.__Probability = namedtuple('Probability', MISSION_NAMES)
         return self.__Probability
 
-    def rnd(self) -> int:
+    @property
+    def missions(self) -> List[str]:
+        """Missions names in order of genome columns
+
+        Returns:
+            List[str]: list of method names
+        """
+        return list(self.Probability._fields)
+
+    def make_genome(self, vector: List[int], segment_of_turn: np.ndarray) -> Genome:
+        """Make genome from flat vector
+
+        Args:
+            vector (List[int]): weights of all segments
+            segment_of_turn (np.ndarray): segment number of each turn
+
+        Returns:
+            Genome: genome object
+        """
+        segments = int(segment_of_turn.max()) + 1
+        weights = np.asarray(vector[:segments * self.prob_len]).reshape(segments, self.prob_len)
+        return Genome(weights=weights, segment_of_turn=segment_of_turn, missions=self.missions)
+
+    def rnd(self, rng: random.Random = None) -> int:
         """Get random int value in range [0, 10]
 
+        Args:
+            rng (random.Random, optional): random generator. Defaults to None,
+            module random is used
+
         Returns:
             int: random int in range [0, 10]
         """
-        return random.randint(0, 10)
+        return (rng or random).randint(0, 10)
 
-    def init_day_genome(self) -> List[namedtuple]:
+    def init_day_genome(self) -> Genome:
         """Initialize probability timiline for start learning
         for day genom model
 
         Returns:
-            List[namedtuple]: lis of probability for each turn of game
+            Genome: probability for each turn of game
         """
-        genome = []
-        for i in range(360):
-            genome_init = [self.rnd() for _ in range(self.prob_len)]
-            prob = self.Probability._make(genome_init)
-            genome.append(prob)
-        return genome
+        vector = [self.rnd() for _ in range(CALENDAR.max_days * self.prob_len)]
+        return self.convert_day_genome(vector=vector)
     
-    def init_daily_genome(self) -> List[namedtuple]:
+    def init_daily_genome(self, rng: random.Random = None) -> Genome:
         """Initialize probability timiline for start learning
         for daily genom model
 
+        Args:
+            rng (random.Random, optional): random generator, seeded one gives
+            the same genome each time. Defaults to None, module random is used
+
         Returns:
-            List[namedtuple]: lis of probability for each turn of game
+            Genome: probability for each turn of game
         """
-        genome = []
-        for i in range(18):
-            genome_init = [self.rnd() for _ in range(self.prob_len)]
-            prob = self.Probability._make(genome_init)
-            if i % 2 == 0:
-                gen = [prob for _ in range(30)]
-            else:
-                gen = [prob for _ in range(10)]
-            genome= genome + gen
-        return genome
-
-    def convert_day_genome(self, vector: List[int]) -> List[namedtuple]:
-        """Convert day genome list to named tuples
+        segments = int(DAILY_SEGMENT_OF_TURN.max()) + 1
+        vector = [self.rnd(rng=rng) for _ in range(segments * self.prob_len)]
+        return self.convert_daily_genome(vector=vector)
+
+    def convert_day_genome(self, vector: List[int]) -> Genome:
+        """Convert day genome list, one segment for each turn
 
         Args:
             vector (List[int]): genom
 
         Returns:
-            List[namedtuple]: list of named tuples representation
+            Genome: genome object
         """
-        genome = []
-        for i in range(360):
-            line_v = vector[i * self.prob_len: i * self.prob_len + self.prob_len]
-            genome_line = self.Probability._make(line_v)
-            genome.append(genome_line)
-        return genome
+        return self.make_genome(vector=vector, segment_of_turn=np.arange(CALENDAR.max_days))
     
-    def convert_daily_genome(self, vector: List[int]) -> List[namedtuple]:
-        """Convert daily genome list to named tuples
+    def convert_daily_genome(self, vector: List[int]) -> Genome:
+        """Convert daily genome list, one segment for each day and night
 
         Args:
             vector (List[int]): genome
 
         Returns:
-            List[namedtuple]: list of named tuples representation
+            Genome: genome object
         """
-        genome = []
-        for i in range(18):
-            point = i * self.prob_len
-            if i % 2 == 0:
-                line_v = vector[point: point + self.prob_len]
-                genome_line = self.Probability._make(line_v)
-                gen = [genome_line for _ in range(30)]
-            else:
-                line_v = vector[point: point + self.prob_len]
-                genome_line = self.Probability._make(line_v)
-                gen = [genome_line for _ in range(10)]
-            genome = genome + gen
-        return genome
\ No newline at end of file
+        return self.make_genome(vector=vector, segment_of_turn=DAILY_SEGMENT_OF_TURN)
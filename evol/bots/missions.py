@@ -2,14 +2,15 @@ from lux.game_objects import Unit, CityTile
 from lux.game_map import Position
 from bots.utility import CONSTANTS as cs
 from bots.statements import (
-    TurnSpace, TileState
+    TurnSpace, TileState, FlowField
 )
+from bots.planner import MovePlanner
 from bots.utility import (
     GameActiveObject, MissionsState, 
-    Missions, UnicPos, Coord, AD
+    Missions, Coord, AD, TRACE, CALENDAR
 )
-from typing import List, Tuple, Union, Set
-import os, sys, random
+from typing import Callable, Dict, List, NamedTuple, Tuple, Union, Set
+import os, sys
 
 if os.path.exists("/kaggle"): # check if we're on a kaggle server
     import logging
@@ -45,6 +46,11 @@ class Mission:
         self.action: str = None
         self.check_again: GameActiveObject = None
 
+    @property
+    def _is_night(self) -> bool:
+        """Is night on this turn"""
+        return bool(CALENDAR.is_night[self.turn_space.tiles.game_state.turn])
+
     def _get_direction(self, target_pos: Position) -> str:
         """Get direction to target position
         Returns the direction that would move you closest to target_pos from this Position 
@@ -78,17 +84,13 @@ class Mission:
         Returns:
             Position: closest Position object
         """
-        distance = AD[self.turn_space.tiles.game_state.map_height]['distance'][(self.obj.pos.x, self.obj.pos.y)]
-        dist = {
-            val: key
-            for key, val in distance.items()
-            if Position(key[0], key[1]) in positions
-            }
-        if dist:
-            min_value = min(dist.keys())
-            pos = dist[min_value]
-            closest_pos = Position(pos[0], pos[1])
-            return closest_pos
+        distance = AD[self.turn_space.tiles.game_state.map_height]['distance']
+        closest = distance.closest(
+            (self.obj.pos.x, self.obj.pos.y),
+            ((pos.x, pos.y) for pos in positions)
+            )
+        if closest:
+            return Position(closest[0], closest[1])
 
 class CityMission(Mission):
     """Citytile object missions with his possible actions
@@ -109,43 +111,51 @@ class CityMission(Mission):
         """
         name = self.mission_research.__name__
         if not self.turn_space.tiles.player.researched_uranium():
-            logger.info('> citytile mission_research added')
+            if TRACE:
+                logger.info('> citytile mission_research added')
             self.missions['missions'].append(name)
 
     def action_research(self) -> None:
         """Citytile research action
         """
-        logger.info('> citytile action_research added')
+        if TRACE:
+            logger.info('> citytile action_research added')
         self.action = self.obj.research()  
 
     def mission_build_worker(self) -> None:
         """Citytile build worker mission
         """
-        logger.info('> mission_build_worker: im here')
+        if TRACE:
+            logger.info('> mission_build_worker: im here')
         name = self.mission_build_worker.__name__
         if self.turn_space.tiles.city_units_diff > 0:
             self.missions['missions'].append(name)
-            logger.info('> mission_build_worker added')
+            if TRACE:
+                logger.info('> mission_build_worker added')
 
     def action_build_worker(self) -> None:
         """Citytile build worker action
         """
-        logger.info('> action_build_worker added')
+        if TRACE:
+            logger.info('> action_build_worker added')
         self.action = self.obj.build_worker()
 
     def mission_build_cart(self) -> None:
         """Citytile build cart mission
         """
-        logger.info('> mission_build_cart: im here')
+        if TRACE:
+            logger.info('> mission_build_cart: im here')
         name = self.mission_build_cart.__name__
         if self.turn_space.tiles.city_units_diff > 0:
             self.missions['missions'].append(name)
-            logger.info('> mission_build_cart: added')
+            if TRACE:
+                logger.info('> mission_build_cart: added')
 
     def action_build_cart(self) -> None:
         """Citytile build cart action
         """
-        logger.info('> citytile action_build_cart added')
+        if TRACE:
+            logger.info('> citytile action_build_cart added')
         self.action = self.obj.build_cart()
 
 
@@ -153,7 +163,7 @@ class UnitMission(Mission):
     """Missions for units of any type
     """
     
-    available_pos: UnicPos = None
+    planner: MovePlanner = None
     adj_coord_unic: Set[Coord] = None
 
     def __init__(
@@ -189,95 +199,100 @@ class UnitMission(Mission):
             self.__adjacent_tile_states = states
         return self.__adjacent_tile_states
     
-    def _collision_resolution(self, target: Position) -> None:
-        """Define move action of unit with collision resolution
+    def _collision_resolution(self, target: Position, field: FlowField = None) -> bool:
+        """Request move of unit to target, moves of all units are planned
+        together by MovePlanner of the turn
 
         Args:
             target (Position): position of target cell
-            available_pos (UnicPos): dict wih directions and tuple with
-            positions x, y
+            field (FlowField, optional): flow field of target class. Defaults to None
+
+        Returns:
+            bool: move is requested
         """
-        adj_dir = self._current_tile_state.adjacent_dir_unic_pos
-        logger.info(f'> _collision_resolution: available_pos {self.available_pos}')
-        logger.info(f'> _collision_resolution: adjacent_dir {adj_dir}')
-        logger.info(f'> _collision_resolution: dir_to_target {self.obj.pos.direction_to(target)}')
-        logger.info(f'> _collision_resolution: obj position {self.obj.pos.x}, {self.obj.pos.y}')
-        logger.info(f'> _collision_resolution: target position {target.x}, {target.y}')
-
-        way = None
-
-        if self.obj.pos.x == target.x: # TODO: refactoring - ambiqulous
-            if self.obj.pos.y > target.y:
-                way = ['n', 'e', 'w', 's']
-            if self.obj.pos.y < target.y:
-                way = ['s', 'e', 'w', 'n']
-        elif self.obj.pos.x > target.x:
-            if self.obj.pos.y >= target.y:
-                way = ['w', 's', 'e', 'n']
-            else:
-                way = ['w', 'n', 'e', 's']
-        elif self.obj.pos.x < target.x:
-            if self.obj.pos.y >= target.y:
-                way = ['e', 's', 'w', 'n']
-            else:
-                way = ['e', 'n', 's', 'w']
-        logger.info(f'> _collision_resolution: way: {way}')
-
-        if way:
-            for dir in way:
-                try:
-                    if adj_dir[dir] in self.available_pos:
-                        self.action = self.obj.move(dir)
-                        self.available_pos.discard(adj_dir[dir])
-                        logger.info(f'> _collision_resolution: action {self.action}')
-                        logger.info(f'> _collision_resolution: available_pos {self.available_pos}')
-                        break
-                except KeyError:
-                    logger.info(f'> _collision_resolution: broken position {dir}')
-                    continue
-
-    def _move_to_closest(self, pos: List[Position]) -> None:
+        if TRACE:
+            logger.info(f'> _collision_resolution: obj position {self.obj.pos.x}, {self.obj.pos.y}')
+            logger.info(f'> _collision_resolution: target position {target.x}, {target.y}')
+        return self.planner.request(unit=self.obj, target=(target.x, target.y), field=field)
+
+    def _get_closest_by_field(
+        self,
+        name: str,
+        positions: List[Position]
+        ) -> Tuple[Position, FlowField]:
+        """Get closest position by path around obstacles
+
+        NOTE: flow field of class is shared by units of the turn, it leads
+        only to targets, which are not claimed by other units. If unit
+        is not reached by field or stands on target, closest position is
+        taken by distance without obstacles
+
+        Args:
+            name (str): name of target class
+            positions (List[Position]): targets of class
+
+        Returns:
+            Tuple[Position, FlowField]: closest position and field, or closest
+            position and None
+        """
+        coord = (self.obj.pos.x, self.obj.pos.y)
+        field = self.turn_space.fields.get(name, ((pos.x, pos.y) for pos in positions), coord)
+        target = field.target(coord)
+        if target is None or target == coord:
+            return self._get_closest_pos(positions), None
+        return Position(target[0], target[1]), field
+
+    def _move_to_closest(self, pos: List[Position], name: str = None) -> None:
         """Get move to closest tile of given type action
 
         Args:
             pos (List[Position]): list of positions for closest calculation
+            name (str, optional): name of target class to use its flow field. Defaults to None
         """
-        closest = self._get_closest_pos(pos)
+        if name:
+            closest, field = self._get_closest_by_field(name=name, positions=pos)
+        else:
+            closest, field = self._get_closest_pos(pos), None
         if closest:            
-            self._collision_resolution(target=closest)
+            self._collision_resolution(target=closest, field=field)
             
     def _move_to_closest_available_tile_to_mine(self) -> None:
         """Get move to closest available tile to main
         """
-        self.turn_space.adjcollection.adj_coord_unic = self.adj_coord_unic
-        logger.info(
-            '> _move_to_closest_available_tile_to_mine: len adj_coord_unic '
-            f'{len(self.adj_coord_unic)}'
-            )
+        if TRACE:
+            logger.info(
+                '> _move_to_closest_available_tile_to_mine: len adj_coord_unic '
+                f'{len(self.adj_coord_unic)}'
+                )
         if self.turn_space.tiles.player.researched_uranium():
-            logger.info('> _move_to_closest_available_tile_to_mine: im go mine uranium')
-            positions = self.turn_space.adjcollection.empty_adjacent_any_pos
+            if TRACE:
+                logger.info('> _move_to_closest_available_tile_to_mine: im go mine uranium')
+            name, positions = 'mine_any', self.turn_space.adjcollection.empty_adjacent_any_pos
         elif self.turn_space.tiles.player.researched_coal():
-            logger.info('> _move_to_closest_available_tile_to_mine: im go mine coal')
-            positions = self.turn_space.adjcollection.empty_adjacent_wood_coal_pos
+            if TRACE:
+                logger.info('> _move_to_closest_available_tile_to_mine: im go mine coal')
+            name, positions = 'mine_wood_coal', self.turn_space.adjcollection.empty_adjacent_wood_coal_pos
         else:
-            logger.info('> _move_to_closest_available_tile_to_mine: im go mine wood')
-            positions = self.turn_space.adjcollection.empty_adjacent_wood_pos
-
-        logger.info(f'> _move_to_closest_available_tile_to_mine: positions {len(positions)}')
-        closest = self._get_closest_pos(positions=positions)
-        logger.info(f'> _move_to_closest_available_tile_to_mine: closest {closest}')
+            if TRACE:
+                logger.info('> _move_to_closest_available_tile_to_mine: im go mine wood')
+            name, positions = 'mine_wood', self.turn_space.adjcollection.empty_adjacent_wood_pos
+
+        if TRACE:
+            logger.info(f'> _move_to_closest_available_tile_to_mine: positions {len(positions)}')
+        closest, field = self._get_closest_by_field(name=name, positions=positions)
+        if TRACE:
+            logger.info(f'> _move_to_closest_available_tile_to_mine: closest {closest}')
         if closest:
-            self._collision_resolution(target=closest)
-            logger.info(f'> _move_to_closest_available_tile_to_mine: action {self.action}')
-            if self.action:
+            if self._collision_resolution(target=closest, field=field):
                 cell = self.turn_space.tiles.game_state.map.get_cell_by_pos(closest)
-                logger.info(f'> _move_to_closest_available_tile_to_mine: cell {cell}')
-                self.adj_coord_unic.discard((closest.x, closest.y))
-                logger.info(
-                    '> _move_to_closest_available_tile_to_mine: len adj_coord_unic after remove '
-                    f'{len(self.adj_coord_unic)}'
-                    )
+                if TRACE:
+                    logger.info(f'> _move_to_closest_available_tile_to_mine: cell {cell}')
+                self.turn_space.adjcollection.claim((closest.x, closest.y))
+                if TRACE:
+                    logger.info(
+                        '> _move_to_closest_available_tile_to_mine: len adj_coord_unic after remove '
+                        f'{len(self.adj_coord_unic)}'
+                        )
 
     def _transfer_resource(self) -> None:
         """Transfere resource to cart action
@@ -293,41 +308,50 @@ class UnitMission(Mission):
         the original unit.
         """
         adjacence = self._adjacent_tile_states
-        logger.info(f'> _transfer_resource: adjacence {adjacence}')
+        if TRACE:
+            logger.info(f'> _transfer_resource: adjacence {adjacence}')
 
         for state in adjacence:
-            logger.info(f'> _transfer_resource: state {state}')
+            if TRACE:
+                logger.info(f'> _transfer_resource: state {state}')
             if state.player_cart_object and state.player_cart_object.get_cargo_space_left():
-                logger.info('> _transfer_resource: cart is adjacent and has empty space')
-                logger.info(f'> _transfer_resource: cart id {state.player_cart_object.id}')
-                logger.info(f'> _transfer_resource: cart cargo left {state.player_cart_object.get_cargo_space_left()}')
-                logger.info(f'> _transfer_resource: action {self.action}')
+                if TRACE:
+                    logger.info('> _transfer_resource: cart is adjacent and has empty space')
+                    logger.info(f'> _transfer_resource: cart id {state.player_cart_object.id}')
+                    logger.info(f'> _transfer_resource: cart cargo left {state.player_cart_object.get_cargo_space_left()}')
+                    logger.info(f'> _transfer_resource: action {self.action}')
                 if self.obj.cargo.uranium:
-                    logger.info(f'> _transfer_resource: transfer uranium {self.obj.cargo.uranium}')
+                    if TRACE:
+                        logger.info(f'> _transfer_resource: transfer uranium {self.obj.cargo.uranium}')
                     self.action = self.obj.transfer(
                         dest_id=state.player_cart_object.id,
                         resourceType=cs.RESOURCE_TYPES.URANIUM,
                         amount=self.obj.cargo.uranium
                         )
                 elif self.obj.cargo.coal:
-                    logger.info(f'> _transfer_resource: transfer coal {self.obj.cargo.coal}')
+                    if TRACE:
+                        logger.info(f'> _transfer_resource: transfer coal {self.obj.cargo.coal}')
                     self.action = self.obj.transfer(
                         dest_id=state.player_cart_object.id,
                         resourceType=cs.RESOURCE_TYPES.COAL,
                         amount=self.obj.cargo.coal
                         )
                 elif self.obj.cargo.wood:
-                    logger.info(f'> _transfer_resource: transfer wood {self.obj.cargo.wood}')
+                    if TRACE:
+                        logger.info(f'> _transfer_resource: transfer wood {self.obj.cargo.wood}')
                     self.action = self.obj.transfer(
                         dest_id=state.player_cart_object.id,
                         resourceType=cs.RESOURCE_TYPES.WOOD,
                         amount=self.obj.cargo.wood
                         )
                 else:
-                    logger.info('> _transfer_resource: nothing to transfer')
+                    if TRACE:
+                        logger.info('> _transfer_resource: nothing to transfer')
             else:
-                logger.info('> _transfer_resource: no adjacent carts or is fool')
-            logger.info(f'> _transfer_resource: action {self.action}')
+                if TRACE:
+                    logger.info('> _transfer_resource: no adjacent carts or is fool')
+            if TRACE:
+                logger.info(f'> _transfer_resource: action {self.action}')
 
     def _end_mission(self) -> None:
         """End mission and add object to check_again
@@ -335,8 +359,9 @@ class UnitMission(Mission):
         if self.obj.id in self.turn_space.game_space.missions_state.keys():
             self.turn_space.game_space.missions_state.pop(self.obj.id, None)
             self.check_again = self.obj
-            logger.info(f'> _end_mission: i try end mission. missions_state: {self.turn_space.game_space.missions_state}')
-            logger.info(f'> _end_mission: i end mission. missions_state: {self.turn_space.game_space.missions_state}')
+            if TRACE:
+                logger.info(f'> _end_mission: i try end mission. missions_state: {self.turn_space.game_space.missions_state}')
+                logger.info(f'> _end_mission: i end mission. missions_state: {self.turn_space.game_space.missions_state}')
 
     def mission_drop_the_resources(self) -> None:
         """Move to closest city mission
@@ -346,17 +371,22 @@ class UnitMission(Mission):
         """
         name = self.mission_drop_the_resources.__name__
         if not self.obj.get_cargo_space_left():
-            logger.info('> mission_drop_the_resources: im fool')
+            if TRACE:
+                logger.info('> mission_drop_the_resources: im fool')
             if self._current_tile_state.is_city:
-                logger.info('> mission_drop_the_resources: im in city and drop this mission')
+                if TRACE:
+                    logger.info('> mission_drop_the_resources: im in city and drop this mission')
                 self._end_mission()
             else:
-                logger.info('> mission_drop_the_resources: im not in city')
+                if TRACE:
+                    logger.info('> mission_drop_the_resources: im not in city')
                 if self.turn_space.tiles.player_citytiles:
-                    logger.info('> mission_drop_the_resources: citityles is exist')
+                    if TRACE:
+                        logger.info('> mission_drop_the_resources: citityles is exist')
                     self.missions['missions'].append(name)
         else:
-            logger.info('> mission_drop_the_resources: im empty and drop this mission')
+            if TRACE:
+                logger.info('> mission_drop_the_resources: im empty and drop this mission')
             self._end_mission()
     
     def action_drop_the_resources(self) -> None:
@@ -365,11 +395,13 @@ class UnitMission(Mission):
         NOTE: if it possible - drop resources to cart
         """
         if self.obj.is_worker:
-            logger.info('> action_drop_the_resources: im worker and try drop resources')
+            if TRACE:
+                logger.info('> action_drop_the_resources: im worker and try drop resources')
             self._transfer_resource()
         if not self.action:
-            logger.info('> action_drop_the_resources: im go to closest city')
-            self._move_to_closest(pos=self.turn_space.tiles.player_citytiles_pos)
+            if TRACE:
+                logger.info('> action_drop_the_resources: im go to closest city')
+            self._move_to_closest(pos=self.turn_space.tiles.player_citytiles_pos, name='citytiles')
 
 
 class WorkerMission(UnitMission):
@@ -384,34 +416,40 @@ class WorkerMission(UnitMission):
         """
         name = self.mission_mine_resource.__name__
         if not self.obj.get_cargo_space_left():
-            logger.info('> mission_mine_resource: im fool')
+            if TRACE:
+                logger.info('> mission_mine_resource: im fool')
             self._end_mission()
         else:
-            logger.info('> mission_mine_resource: im empty')
+            if TRACE:
+                logger.info('> mission_mine_resource: im empty')
             self.missions['missions'].append(name)
 
     def action_mine_resource(self) -> None: # FIXME: rewrite if hamburger
         """Worker action for mining resources
         """
-        logger.info('> action_mine_resource: im here')
-        logger.info(f'> action_mine_resource: available_pos: {self.available_pos}')
+        if TRACE:
+            logger.info('> action_mine_resource: im here')
         if self._current_tile_state.is_city:
-            logger.info('> action_mine_resource: im in city')
+            if TRACE:
+                logger.info('> action_mine_resource: im in city')
             main_now = False
         else:
             main_now = False
             adjacence = self._adjacent_tile_states
             for state in adjacence: 
                 if state.is_wood:
-                    logger.info('> action_mine_resource: i mine wood')
+                    if TRACE:
+                        logger.info('> action_mine_resource: i mine wood')
                     main_now = True
                     break
                 elif self.turn_space.tiles.player.researched_coal() and state.is_coal:
-                    logger.info('> action_mine_resource: i mine coal')
+                    if TRACE:
+                        logger.info('> action_mine_resource: i mine coal')
                     main_now = True
                     break
                 elif self.turn_space.tiles.player.researched_uranium() and state.is_uranium:
-                    logger.info('action_mine_resource: i mine uranium')
+                    if TRACE:
+                        logger.info('action_mine_resource: i mine uranium')
                     main_now = True
                     break
         if not main_now:
@@ -423,23 +461,41 @@ class WorkerMission(UnitMission):
         """
         name = self.mission_buld_the_city.__name__
         if self.obj.get_cargo_space_left():
-            logger.info('> mission_buld_the_city: im empty and drop this mission')
+            if TRACE:
+                logger.info('> mission_buld_the_city: im empty and drop this mission')
             self._end_mission()
         else:
-            logger.info('> mission_buld_the_city: im fool and can build city')
+            if TRACE:
+                logger.info('> mission_buld_the_city: im fool and can build city')
             self.missions['missions'].append(name)
                 
+    @property
+    def _lone_city_at_night(self) -> bool:
+        """New citytile is not adjacent to player citytiles at night, so it has
+        no fuel and is lost at the end of turn
+        """
+        if not self._is_night:
+            return False
+        adjacence = AD[self.turn_space.tiles.game_state.map_width]['adjacence']
+        return not any(
+            self.turn_space.tiles.is_owned_by_player(coord)
+            and coord in self.turn_space.tiles.citytile_at
+            for coord in adjacence[(self.obj.pos.x, self.obj.pos.y)]
+            )
+
     def action_buld_the_city(self) -> None:
         """Worker action to build a city
         """
-        logger.info('> action_buld_the_city: im here')
-        if self.obj.can_build(self.turn_space.tiles.game_state.map):
-            logger.info('> action_buld_the_city: i build the city')
+        if TRACE:
+            logger.info('> action_buld_the_city: im here')
+        if self.obj.can_build(self.turn_space.tiles.game_state.map) and not self._lone_city_at_night:
+            if TRACE:
+                logger.info('> action_buld_the_city: i build the city')
             self.action = self.obj.build_city()
         else:
-            logger.info('> action_buld_the_city: i move random')
-            seq = list(cs.DIRECTIONS)
-            self.action = self.obj.move(random.choice(seq=seq))
+            if TRACE:
+                logger.info('> action_buld_the_city: i go to closest build site')
+            self._move_to_closest(pos=self.turn_space.tiles.build_sites_pos, name='build_sites')
 
 
 class CartMission(UnitMission):
@@ -451,17 +507,65 @@ class CartMission(UnitMission):
         """
         name = self.mission_cart_harvest.__name__
         if not self.obj.get_cargo_space_left():
-            logger.info('> mission_cart_harvest: im empty')
+            if TRACE:
+                logger.info('> mission_cart_harvest: im empty')
             self._end_mission()
         else:
-            logger.info('> mission_cart_harvest: im fool and got to closest worker')
+            if TRACE:
+                logger.info('> mission_cart_harvest: im fool and got to closest worker')
             self.missions['missions'].append(name)
 
     def action_cart_harvest(self) -> None:
         """Cart action move to closest resource
         """
-        logger.info('> action_cart_harvest: im here and go to closest worker')
-        self._move_to_closest(pos=self.turn_space.tiles.player_workers_pos)
+        if TRACE:
+            logger.info('> action_cart_harvest: im here and go to closest worker')
+        self._move_to_closest(pos=self.turn_space.tiles.player_workers_pos, name='workers')
+
+
+class MissionEntry(NamedTuple):
+    """Mission of object class in registry
+    """
+    name: str
+    mission: Callable
+    action: Callable
+    cls_: type
+    column: int
+
+
+# all mission names in order of genome columns
+MISSION_NAMES: Tuple[str, ...] = tuple(sorted({
+    method
+    for cls_ in (WorkerMission, CartMission, CityMission)
+    for method in dir(cls_)
+    if method.startswith('mission_')
+    }))
+MISSION_COLUMNS: Dict[str, int] = {name: i for i, name in enumerate(MISSION_NAMES)}
+# mission class of object: mission name and its entry, in order of genome columns
+REGISTRY: Dict[type, Dict[str, MissionEntry]] = {}
+
+
+def register_missions() -> None:
+    """Fill registry with mission and action functions of mission classes
+
+    NOTE: registry is filled in place at import, so profiler calls it again
+    after functions of classes are wrapped
+    """
+    for cls_ in (WorkerMission, CartMission, CityMission):
+        REGISTRY[cls_] = {
+            name: MissionEntry(
+                name=name,
+                mission=getattr(cls_, name),
+                action=getattr(cls_, name.replace('mission_', 'action_')),
+                cls_=cls_,
+                column=MISSION_COLUMNS[name]
+                )
+            for name in MISSION_NAMES
+            if hasattr(cls_, name)
+            }
+
+
+register_missions()
 
 
 class Perform:
@@ -502,16 +606,14 @@ class PerformMissions(Perform):
             turn_space=self.turn_space,
             obj_=self.obj
             )
+        entries = REGISTRY[cls_]
         if mission:
-            logger.info(f'> _iterate_missionss mission: {mission}')
-            class_method = getattr(cls_, mission)
-            logger.info(f'> _iterate_missionss class_method: {class_method}')
-            class_method(perform)
+            if TRACE:
+                logger.info(f'> _iterate_missionss mission: {mission}')
+            entries[mission].mission(perform)
         else:
-            per = [method for method in dir(cls_) if method.startswith('mission_')]
-            for met in per:
-                class_method = getattr(cls_, met)
-                class_method(perform)
+            for entry in entries.values():
+                entry.mission(perform)
         return perform.missions, perform.check_again
 
     def perform_missions(self) -> Tuple[
@@ -526,43 +628,48 @@ class PerformMissions(Perform):
         """
         if self.obj.can_act():
             if isinstance(self.obj, Unit):
-                logger.info('> perform_missions: im unit')
+                if TRACE:
+                    logger.info('> perform_missions: im unit')
                 if self.obj.is_worker():
-                    logger.info('> perform_missions: im worker')
+                    if TRACE:
+                        logger.info('> perform_missions: im worker')
                     cls_ = WorkerMission
                 if self.obj.is_cart():
-                    logger.info('> perform_missions: im cart')
+                    if TRACE:
+                        logger.info('> perform_missions: im cart')
                     cls_ = CartMission
                 if self.obj.id in self.turn_space.game_space.missions_state.keys():
-                    logger.info('> perform_missions: i have mission from previous turn - ' +
-                        f'{self.turn_space.game_space.missions_state[self.obj.id]}')
+                    if TRACE:
+                        logger.info('> perform_missions: i have mission from previous turn - ' +
+                            f'{self.turn_space.game_space.missions_state[self.obj.id]}')
                     return self._iterate_missions(
                         cls_=cls_,
                         mission=self.turn_space.game_space.missions_state[self.obj.id]
                         )
             if isinstance(self.obj, CityTile):
-                logger.info('> perform_missions: im citytile')
+                if TRACE:
+                    logger.info('> perform_missions: im citytile')
                 cls_ = CityMission
-            logger.info('> perform_missions: no mission from previous turn')
+            if TRACE:
+                logger.info('> perform_missions: no mission from previous turn')
             return self._iterate_missions(cls_=cls_, mission=None)
         
 class PerformActions(Perform):
     """This class construct all possible actions for all objects
     that can act
-    
-        available_pos: UnicPos: dict wih directions and tuple with
-        positions x, y
+
+        planner: MovePlanner: planner of unit moves of the turn
     """
    
     def __init__(
         self,
         turn_space: TurnSpace,
         obj_: GameActiveObject,
-        available_pos: UnicPos,
+        planner: MovePlanner,
         ) -> None:
         super().__init__(turn_space, obj_)
-        self.available_pos = available_pos
-        self.adj_coord_unic = turn_space.game_space.adj_coord_unic.copy()
+        self.planner = planner
+        self.adj_coord_unic = turn_space.adjcollection.adj_coord_unic
 
     def _get_action(
         self, 
@@ -582,12 +689,9 @@ class PerformActions(Perform):
             turn_space=self.turn_space,
             obj_=self.obj
             )
-        logger.info(f'> _get_action mission: {mission}')
-        act = mission.replace("mission_", "action_")
-        logger.info(f'> _get_action action: {act}')
-        class_method = getattr(cls_, act)
-        logger.info(f'> _get_action class_method: {class_method}')
-        class_method(perform)
+        if TRACE:
+            logger.info(f'> _get_action mission: {mission}')
+        REGISTRY[cls_][mission].action(perform)
         return perform.action
 
     def perform_actions(self, miss: str) -> str:
@@ -597,17 +701,21 @@ class PerformActions(Perform):
             str: choosed action
         """
         if isinstance(self.obj, Unit):
-            logger.info('> perform_actions: im unit')
+            if TRACE:
+                logger.info('> perform_actions: im unit')
             if self.obj.is_worker():
-                logger.info('> perform_actions: im worker')
+                if TRACE:
+                    logger.info('> perform_actions: im worker')
                 cls_ = WorkerMission
                 cls_.adj_coord_unic = self.adj_coord_unic
             if self.obj.is_cart():
-                logger.info('> perform_actions: im cart')
+                if TRACE:
+                    logger.info('> perform_actions: im cart')
                 cls_ = CartMission
-            cls_.available_pos = self.available_pos
+            cls_.planner = self.planner
             
         if isinstance(self.obj, CityTile):
-            logger.info('> perform_actions: im citytile')
+            if TRACE:
+                logger.info('> perform_actions: im citytile')
             cls_ = CityMission
         return self._get_action(cls_=cls_, mission=miss)
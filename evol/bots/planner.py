@@ -0,0 +1,268 @@
+from lux.game_objects import Unit
+from bots.statements import TurnSpace, FlowField
+from bots.utility import CONSTANTS as cs
+from bots.utility import Actions, Coord, AD, TRACE, CALENDAR, PLAN_HORIZON
+from typing import Dict, List, Optional, Set, Tuple
+import os, sys, time, heapq
+
+if os.path.exists("/kaggle"): # check if we're on a kaggle server
+    import logging
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.WARNING)
+    handler = logging.StreamHandler(sys.stdout)  # log to stdout on kaggle
+    logger.addHandler(handler)
+else:
+    from loguru import logger # log to file locally
+
+
+# turns of space-time search: PLAN_HORIZON moves of worker at day
+HORIZON = PLAN_HORIZON * cs.PARAMETERS.UNIT_ACTION_COOLDOWN.WORKER
+# expanded nodes of single unit search
+MAX_EXPANSIONS = 64
+# expanded nodes of all searches of turn, the rest of units move greedy
+TURN_EXPANSIONS = 16 * MAX_EXPANSIONS
+# safety limit of planning time per turn on kaggle server, seconds
+TIMEOUT = 0.05 if os.path.exists("/kaggle") else None
+
+# node of search and path: tile and turn from now, when unit is there
+Node = Tuple[Coord, int]
+
+
+class MovePlanner:
+    """Turn-level planner of unit moves with space-time reservation table
+
+    Missions request moves of units to their targets, then plan() finds
+    moves of all requested units together: units close to targets go first,
+    each unit runs A* over (tile, turn) states for HORIZON turns against
+    tiles, reserved by planned units and by units that stay. Move costs
+    cooldown of unit on destination tile (roads reduce it) and unit holds
+    destination tile for each turn of cooldown, waiting costs one turn.
+    Opponent citytiles are obstacles, opponent units block the next turn,
+    own citytiles can be shared. If move is requested with flow field of
+    targets, any target of field is the goal and distance of field, that
+    respects obstacles, is heuristic. Searches of turn share budget of
+    TURN_EXPANSIONS nodes, so planned moves do not depend on machine load,
+    the rest of units take the best free adjacent tile. At the end first
+    moves are checked with collision rules of the engine, colliding moves
+    are dropped, so unit stays without cooldown instead of wasting the turn.
+    """
+
+    def __init__(
+        self,
+        turn_space: TurnSpace,
+        horizon: int = HORIZON,
+        max_expansions: int = MAX_EXPANSIONS,
+        turn_expansions: int = TURN_EXPANSIONS,
+        timeout: float = TIMEOUT
+        ) -> None:
+        self.turn_space = turn_space
+        self.horizon = horizon
+        self.max_expansions = max_expansions
+        self.turn_expansions = turn_expansions
+        self.timeout = timeout
+        self.expansions = 0
+        self.requests: Dict[str, Tuple[Unit, Coord, Optional[FlowField]]] = {}
+        self.costs: Dict[str, Dict[Coord, int]] = {}
+
+        tiles = turn_space.tiles
+        self.adjacence = AD[tiles.game_state.map_width]['adjacence']
+        self.night = bool(CALENDAR.is_night[tiles.game_state.turn])
+        self.cities: Set[Coord] = {
+            coord for coord, citytile in tiles.citytile_at.items()
+            if citytile.team == tiles.player.team
+            }
+        self.obstacles: Set[Coord] = set(tiles.citytile_at.keys()) - self.cities
+        self.opponent_units: Set[Coord] = {(unit.pos.x, unit.pos.y) for unit in tiles.opponent_units}
+        # reserved tiles at the end of each turn, index 0 is the current turn
+        self.reserved: List[Set[Coord]] = [set() for _ in range(horizon + 1)]
+
+    def request(self, unit: Unit, target: Coord, field: FlowField = None) -> bool:
+        """Ask to move unit to target
+
+        Args:
+            unit (Unit): player unit
+            target (Coord): target tile
+            field (FlowField, optional): field of target class. Defaults to None
+
+        Returns:
+            bool: move is requested, False if unit is on target
+        """
+        if (unit.pos.x, unit.pos.y) == target:
+            return False
+        self.requests[unit.id] = (unit, target, field)
+        return True
+
+    def _base_cooldown(self, unit: Unit) -> int:
+        """Cooldown of unit after move to tile without road
+        """
+        cooldown = cs.PARAMETERS.UNIT_ACTION_COOLDOWN.WORKER if unit.is_worker() \
+            else cs.PARAMETERS.UNIT_ACTION_COOLDOWN.CART
+        return cooldown * 2 if self.night else cooldown
+
+    def _cooldown(self, unit: Unit, coord: Coord) -> int:
+        """Turns until unit can move again after move to coord
+        """
+        costs = self.costs.setdefault(unit.type, {})
+        if coord not in costs:
+            road = self.turn_space.tiles.game_state.map.get_cell(coord[0], coord[1]).road
+            # engine decreases cooldown by 1 + road each turn, unit acts again when cooldown < 1
+            costs[coord] = int((self._base_cooldown(unit) - 1) // (1 + road)) + 1
+        return costs[coord]
+
+    def _free(self, coord: Coord, turn: int, turns: int = 1) -> bool:
+        """Unit can hold coord for turns after turn
+        """
+        if coord in self.obstacles:
+            return False
+        if coord in self.cities:
+            return True
+        if turn == 0 and coord in self.opponent_units:
+            return False
+        return not any(
+            coord in self.reserved[t]
+            for t in range(turn + 1, min(turn + turns, self.horizon) + 1)
+            )
+
+    def _reserve(self, path: List[Node]) -> None:
+        """Reserve tiles of path for each turn, unit stays on the last tile
+
+        NOTE: unit holds tile of node from the turn after previous node
+        """
+        nodes = iter(path[1:])
+        node = next(nodes, path[0])
+        for turn in range(1, self.horizon + 1):
+            while node[1] < turn:
+                node = next(nodes, None)
+                if node is None:
+                    node = path[-1]
+                    break
+            self.reserved[turn].add(node[0])
+
+    def _distance(self, coord: Coord, target: Coord, field: Optional[FlowField]) -> int:
+        """Moves to target, distance of field if it reaches coord
+        """
+        if field is not None:
+            dis = field.distance(coord)
+            if dis is not None:
+                return dis
+        return abs(coord[0] - target[0]) + abs(coord[1] - target[1])
+
+    def _search(self, unit: Unit, target: Coord, field: FlowField = None) -> List[Node]:
+        """Space-time A* to target
+
+        NOTE: heuristic is distance in turns of unit without roads, so it
+        overestimates only paths on roads and the first reached target or
+        node of horizon is taken. Cost of node is its turn, so node is pushed
+        once. Ties are broken by distance, if expansions are exhausted, the
+        closest reached node is taken
+
+        Returns:
+            List[Node]: nodes from current tile, path ends on target or on
+            the best node of horizon
+        """
+        start = ((unit.pos.x, unit.pos.y), 0)
+        parents: Dict[Node, Optional[Node]] = {start: None}
+        scale = self._base_cooldown(unit)
+        h = self._distance(start[0], target, field) * scale
+        heap = [(h, h, 0, start[0])]
+        best, best_key = start, (h, 0)
+        expansions = 0
+        limit = min(self.max_expansions, self.turn_expansions - self.expansions)
+        while heap and expansions < limit:
+            _, h, turn, coord = heapq.heappop(heap)
+            expansions += 1
+            if coord == target or not h or turn >= self.horizon:
+                best = (coord, turn)
+                break
+            if (h, turn) < best_key:
+                best, best_key = (coord, turn), (h, turn)
+            moves = [(coord, 1)] + [
+                (adjacent, self._cooldown(unit, adjacent)) for adjacent in self.adjacence[coord]
+                ]
+            for next_coord, cost in moves:
+                key = (next_coord, turn + cost)
+                if key in parents or not self._free(next_coord, turn, cost):
+                    continue
+                parents[key] = (coord, turn)
+                next_h = self._distance(next_coord, target, field) * scale
+                heapq.heappush(heap, (turn + cost + next_h, next_h, turn + cost, next_coord))
+        self.expansions += expansions
+
+        path = []
+        node = best
+        while node is not None:
+            path.append(node)
+            node = parents[node]
+        return path[::-1]
+
+    def _greedy(self, unit: Unit, target: Coord, field: FlowField = None) -> List[Node]:
+        """Best free adjacent tile or current tile
+        """
+        start = (unit.pos.x, unit.pos.y)
+        moves = [
+            (coord, self._cooldown(unit, coord)) for coord in self.adjacence[start]
+            if self._free(coord, 0, self._cooldown(unit, coord))
+            ]
+        if not moves:
+            return [(start, 0)]
+        return [(start, 0), min(moves, key=lambda move: self._distance(move[0], target, field))]
+
+    def _validate(self, moves: Dict[str, Coord]) -> Dict[str, Coord]:
+        """Drop colliding moves, as engine cancels them
+
+        NOTE: dropped move can produce new collision with unit, moved
+        to its tile, so it is repeated until stable
+        """
+        units = self.turn_space.tiles.player_units
+        while True:
+            occupied: Dict[Coord, List[str]] = {}
+            for unit in units:
+                coord = moves.get(unit.id, (unit.pos.x, unit.pos.y))
+                occupied.setdefault(coord, []).append(unit.id)
+            cancelled = [
+                unit_id
+                for coord, unit_ids in occupied.items()
+                if len(unit_ids) > 1 and coord not in self.cities
+                for unit_id in unit_ids
+                if unit_id in moves
+                ]
+            if not cancelled:
+                return moves
+            for unit_id in cancelled:
+                moves.pop(unit_id)
+
+    def plan(self) -> Actions:
+        """Plan moves of all requested units
+
+        Returns:
+            Actions: move actions
+        """
+        start = time.perf_counter()
+        for unit in self.turn_space.tiles.player_units:
+            if unit.id not in self.requests:
+                self._reserve([((unit.pos.x, unit.pos.y), 0)])
+
+        requests = sorted(
+            self.requests.values(),
+            key=lambda request: abs(request[0].pos.x - request[1][0]) + abs(request[0].pos.y - request[1][1])
+            )
+        moves: Dict[str, Coord] = {}
+        for unit, target, field in requests:
+            if self.expansions < self.turn_expansions and (
+                    self.timeout is None or time.perf_counter() - start < self.timeout):
+                path = self._search(unit=unit, target=target, field=field)
+            else:
+                path = self._greedy(unit=unit, target=target, field=field)
+            self._reserve(path)
+            if len(path) > 1 and path[1][0] != path[0][0]:
+                moves[unit.id] = path[1][0]
+        moves = self._validate(moves)
+
+        actions = []
+        for unit, _, _ in requests:
+            if unit.id in moves:
+                actions.append(unit.move(self.adjacence[(unit.pos.x, unit.pos.y)][moves[unit.id]]))
+        if TRACE:
+            logger.info(f'> plan: requests {len(requests)}, moves {len(actions)}, '
+                        f'expansions {self.expansions}, {(time.perf_counter() - start) * 1000:.3f} ms')
+        return actions
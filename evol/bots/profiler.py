@@ -0,0 +1,182 @@
+from typing import Any, Callable, Dict, List
+import functools, inspect, os, time, types
+
+
+# profiling is switched on at import of bots by BOT_PROFILE=1 or by enable()
+PROFILE = os.environ.get('BOT_PROFILE', '0') == '1'
+
+# stages of pipeline: module or class name and its methods
+PIPELINE_STAGES = {
+    'BotPipe': [
+        'update_resource_and_unit_statements',
+        'init_missions_and_state_and_check_again',
+        'set_mission_and_state_for_each_object',
+        '_set_mission_for_single_object',
+        'set_action_for_each_mission_in_mission_choosed',
+        ],
+    'TurnSpace': ['__init__'],
+    'PerformMissions': ['perform_missions'],
+    'PerformActions': ['perform_actions'],
+    'MovePlanner': ['plan'],
+    }
+MISSION_CLASSES = ['Mission', 'CityMission', 'UnitMission', 'WorkerMission', 'CartMission']
+
+Snapshot = Dict[str, Dict[Any, List[float]]]
+
+
+class Profiler:
+    """Wall time of nested stages, aggregated by call stack and by turn
+
+    Stack of stage labels is a key of stats: number of calls, total time and
+    time of children, so self time of stage is total minus children.
+    Root stage is a turn of bot, its time is kept for each turn number too
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.reset()
+
+    def reset(self) -> None:
+        self._path: List[str] = []
+        self._starts: List[float] = []
+        self.stats: Dict[str, List[float]] = {}
+        self.turns: Dict[int, List[float]] = {}
+
+    def push(self, label: str) -> None:
+        self._path.append(label)
+        self._starts.append(time.perf_counter())
+
+    def pop(self, turn: int = None) -> None:
+        elapsed = time.perf_counter() - self._starts.pop()
+        key = ';'.join(self._path)
+        self._path.pop()
+        stat = self.stats.setdefault(key, [0, 0., 0.])
+        stat[0] += 1
+        stat[1] += elapsed
+        if self._path:
+            self.stats.setdefault(';'.join(self._path), [0, 0., 0.])[2] += elapsed
+        if turn is not None:
+            turn_stat = self.turns.setdefault(turn, [0, 0.])
+            turn_stat[0] += 1
+            turn_stat[1] += elapsed
+
+    def snapshot(self) -> Snapshot:
+        """Plain copy of collected times, for example to send from worker
+        """
+        return {
+            'stats': {key: list(stat) for key, stat in self.stats.items()},
+            'turns': {turn: list(stat) for turn, stat in self.turns.items()}
+            }
+
+    def merge(self, snapshot: Snapshot) -> None:
+        """Add times of other profiler
+
+        Args:
+            snapshot (Snapshot): snapshot of other profiler
+        """
+        for name in ('stats', 'turns'):
+            target = getattr(self, name)
+            for key, stat in snapshot[name].items():
+                current = target.setdefault(key, [0] * len(stat))
+                for i, value in enumerate(stat):
+                    current[i] += value
+
+    def table(self) -> str:
+        """Summary table of stages, children follow their parent stage
+        """
+        total = sum(stat[1] for key, stat in self.stats.items() if ';' not in key) or 1.
+        lines = [f'{"stage":<72} {"calls":>9} {"total, s":>10} {"self, s":>10} {"%":>6} {"mean, ms":>9}']
+        for key in sorted(self.stats):
+            calls, spent, children = self.stats[key]
+            name = '  ' * key.count(';') + key.rsplit(';', 1)[-1]
+            mean = spent / calls * 1000 if calls else 0.
+            lines.append(
+                f'{name:<72} {calls:>9} {spent:>10.3f} {spent - children:>10.3f} '
+                f'{spent / total * 100:>6.1f} {mean:>9.3f}'
+                )
+        return '\n'.join(lines)
+
+    def collapsed(self) -> str:
+        """Self time of each stack in microseconds, input of flamegraph.pl
+        """
+        return '\n'.join(
+            f'{key} {round((stat[1] - stat[2]) * 1e6)}'
+            for key, stat in sorted(self.stats.items())
+            if stat[1] - stat[2] > 0
+            )
+
+    def write(self, prefix: str) -> List[str]:
+        """Write summary table, collapsed stacks and times of turns
+
+        Args:
+            prefix (str): path prefix of files
+
+        Returns:
+            List[str]: paths of written files
+        """
+        turns = ['turn,calls,total_s,mean_ms'] + [
+            f'{turn},{calls},{spent:.6f},{spent / calls * 1000:.3f}'
+            for turn, (calls, spent) in sorted(self.turns.items())
+            ]
+        paths = []
+        for suffix, text in (('.txt', self.table()), ('.collapsed', self.collapsed()),
+                             ('_turns.csv', '\n'.join(turns))):
+            path = f'{prefix}{suffix}'
+            with open(path, 'w') as f:
+                f.write(text + '\n')
+            paths.append(path)
+        return paths
+
+
+PROFILER = Profiler()
+
+
+def _wrap(func: Callable, label: str, root: bool = False) -> Callable:
+    """Record wall time of func as stage with label
+    """
+    if getattr(func, '__profiled__', False):
+        return func
+    signature = inspect.signature(func) if root else None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # root stage is aggregated by turn of game_state argument
+        turn = signature.bind(*args, **kwargs).arguments['game_state'].turn if root else None
+        PROFILER.push(label)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            PROFILER.pop(turn=turn)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+def enable() -> None:
+    """Instrument bot pipeline, mission and action methods
+
+    NOTE: functions are replaced in their modules and classes, so without
+    enable() the bot has no profiling cost at all
+    """
+    import bots.bot as bot
+    import bots.statements as statements
+    import bots.missions as missions
+    import bots.planner as planner
+
+    if PROFILER.enabled:
+        return
+    PROFILER.enabled = True
+    bot.get_bot_actions = _wrap(bot.get_bot_actions, 'turn', root=True)
+    modules = (bot, statements, missions, planner)
+    for cls_name, methods in PIPELINE_STAGES.items():
+        cls_ = next(getattr(module, cls_name) for module in modules if hasattr(module, cls_name))
+        for method in methods:
+            setattr(cls_, method, _wrap(getattr(cls_, method), f'{cls_name}.{method}'))
+    for cls_name in MISSION_CLASSES:
+        cls_ = getattr(missions, cls_name)
+        for method, func in list(vars(cls_).items()):
+            if isinstance(func, types.FunctionType) \
+                    and method.startswith(('mission_', 'action_', '_')) and not method.startswith('__'):
+                setattr(cls_, method, _wrap(func, f'{cls_name}.{method}'))
+    # registry keeps functions of classes, so it is filled with wrapped ones
+    missions.register_missions()
@@ -1,6 +1,12 @@
+from lux.game_constants import GAME_CONSTANTS as cs
 from bots.statements import TilesCollection
-from bots.utility import ALL_MORNINGS, Rewards, CrossGameScore
-import statistics
+from bots.utility import CALENDAR, Rewards, CrossGameScore
+from typing import List, Tuple
+import math, statistics
+
+
+# carts burn cargo at night from the least efficient resource
+BURN_ORDER = ['wood', 'coal', 'uranium']
 
 
 class TurnScoring:
@@ -18,7 +24,7 @@ class TurnScoring:
         Returns:
             int: score
         """
-        if self.turn in ALL_MORNINGS:
+        if CALENDAR.is_morning[self.turn]:
             score = (len(self.tiles.player_citytiles) * 10000 + \
                 len(self.tiles.player_units)) \
                 * self.turn / 40
@@ -37,16 +43,83 @@ class TurnScoring:
         Returns:
             int: score
         """
+        return self.turn_score(
+            turn=self.turn,
+            citytiles=len(self.tiles.player_citytiles),
+            units=len(self.tiles.player_units),
+            weighted=weighted
+            )
+
+    @staticmethod
+    def turn_score(turn: int, citytiles: int, units: int, weighted: bool = True) -> int:
+        """Score of each_turn_scoring() for given counts of player objects
+
+        Args:
+            turn (int): turn number
+            citytiles (int): number of player citytiles
+            units (int): number of player units
+            weighted[bool]: use weight or not. Default True
+
+        Returns:
+            int: score
+        """
+        score = citytiles * 10000 + units
         if weighted:
-            score = (len(self.tiles.player_citytiles) * 10000 + \
-                        len(self.tiles.player_units)) * self.turn
-        else:
-            score = len(self.tiles.player_citytiles) * 10000 + \
-                        len(self.tiles.player_units)
-        if self.turn == 359:
+            score = score * turn
+        if turn == 359:
             score = score * 10
         return score
 
+    def is_decided(self) -> bool:
+        """Game is decided for player, if it has no citytiles and no workers
+
+        NOTE: only workers build citytiles and only citytiles build units,
+        carts can't collect resources, so the rest of game is defined
+        by cargo of carts. Engines stop game without units and citytiles
+        by themselves, so here are caught games with carts only
+
+        Returns:
+            bool: player can't change its future score
+        """
+        return not self.tiles.player_citytiles and not self.tiles.player_workers
+
+    def remaining_units(self) -> Tuple[List[int], int]:
+        """Number of player units for decided game, each cart burns own
+        cargo in night turns and dies without enough fuel
+
+        Returns:
+            Tuple[List[int], int]: units at each next turn till 359
+            and units at the end of game
+        """
+        upkeep = cs['PARAMETERS']['LIGHT_UPKEEP']['CART']
+        fuel_rate = cs['PARAMETERS']['RESOURCE_TO_FUEL_RATE']
+        max_turns = cs['PARAMETERS']['MAX_DAYS']
+        # the last turn with observation of each cart
+        last_turns = []
+        for cart in self.tiles.player_carts:
+            cargo = {r_type: getattr(cart.cargo, r_type) for r_type in BURN_ORDER}
+            last_turn = max_turns
+            for turn in range(self.turn, max_turns):
+                if not CALENDAR.is_night[turn]:
+                    continue
+                need = upkeep
+                for r_type in BURN_ORDER:
+                    if need <= 0:
+                        break
+                    rate = fuel_rate[r_type.upper()]
+                    used = min(cargo[r_type], math.ceil(need / rate))
+                    cargo[r_type] -= used
+                    need -= used * rate
+                if need > 0:
+                    last_turn = turn
+                    break
+            last_turns.append(last_turn)
+        units = [
+            sum(turn <= last_turn for last_turn in last_turns)
+            for turn in range(self.turn + 1, max_turns)
+            ]
+        return units, sum(last_turn == max_turns for last_turn in last_turns)
+
 
 class FinalScoring:
     """Final scorings functions for evolution alghoritm
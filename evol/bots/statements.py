@@ -5,13 +5,12 @@ from lux.game_map import Position, Cell
 from bots.utility import CONSTANTS as cs
 from bots.utility import (
     UnicPos, GameObjects, GameActiveObject, MissionsState,
-    Coord, CrossGameScore, AD
+    Coord, CrossGameScore, AD, PLAN_HORIZON
 )
+import numpy as np
 import os, sys
-from typing import List, Tuple, Union, Dict, Set, Iterable
-from collections import ChainMap
+from typing import List, Tuple, Union, Dict, Set, FrozenSet, Iterable
 from functools import cached_property
-from itertools import chain
 
 if os.path.exists("/kaggle"):  # check if we're on a kaggle server
     import logging
@@ -36,6 +35,68 @@ class SubGameSpace:
         self.cross_game_score: CrossGameScore = {}
 
 
+class ResourceAdjacency:
+    """Tiles adjacent to live resources, maintained incrementally between turns
+
+    Index keeps type and adjacent coordinates of each resource and number
+    of live resources of each type around each tile. Depleted resource
+    decrements counts of its adjacent tiles, tile leaves adjacent sets,
+    when no live resource touches it
+    """
+
+    r_types = (cs.RESOURCE_TYPES.WOOD, cs.RESOURCE_TYPES.COAL, cs.RESOURCE_TYPES.URANIUM)
+
+    def __init__(self) -> None:
+        self.resources: Dict[Coord, Tuple[str, Tuple[Coord, ...]]] = {}
+        self.counts: Dict[str, Dict[Coord, int]] = {r_type: {} for r_type in self.r_types}
+        self.adjacent: Dict[str, Set[Coord]] = {r_type: set() for r_type in self.r_types}
+        self.totals: Dict[Coord, int] = {}
+        self.coords: Set[Coord] = set()
+
+    def reset(self, cells: List[Cell], size: int) -> None:
+        """Build index of the game
+
+        Args:
+            cells (List[Cell]): resource cells
+            size (int): map size
+        """
+        adjacence = AD[size]['adjacence']
+        self.resources = {}
+        self.counts = {r_type: {} for r_type in self.r_types}
+        self.adjacent = {r_type: set() for r_type in self.r_types}
+        self.totals = {}
+        self.coords = set()
+        for cell in cells:
+            coord = (cell.pos.x, cell.pos.y)
+            adjacent = tuple(adjacence[coord].keys())
+            r_type = cell.resource.type
+            self.resources[coord] = (r_type, adjacent)
+            counts = self.counts[r_type]
+            for adj in adjacent:
+                counts[adj] = counts.get(adj, 0) + 1
+                self.totals[adj] = self.totals.get(adj, 0) + 1
+            self.adjacent[r_type].update(adjacent)
+            self.coords.update(adjacent)
+
+    def remove(self, coord: Coord) -> None:
+        """Drop depleted resource
+
+        Args:
+            coord (Coord): coordinate of resource
+        """
+        r_type, adjacent = self.resources.pop(coord)
+        counts = self.counts[r_type]
+        for adj in adjacent:
+            counts[adj] -= 1
+            if not counts[adj]:
+                del counts[adj]
+                self.adjacent[r_type].discard(adj)
+            self.totals[adj] -= 1
+            if not self.totals[adj]:
+                del self.totals[adj]
+                self.coords.discard(adj)
+
+
 class GameSpace:
     """Statement game_space for transition to subsequent turns
     """
@@ -46,8 +107,9 @@ class GameSpace:
         self.map_cells_pos_unic: UnicPos = None
 
         self.missions_state: MissionsState = {}
-        self.adj_coord_unic: Set(Coord) = set()
-        self.adj_stack: ChainMap = ChainMap()
+        self.adjacency = ResourceAdjacency()
+        # tiles adjacent to live resources, maintained by adjacency
+        self.adj_coord_unic: Set[Coord] = self.adjacency.coords
         
         self.resources: List[Cell] = None
         self.woods: List[Cell] = None
@@ -55,13 +117,17 @@ class GameSpace:
         self.uraniums: List[Cell] = None
 
         self.resources_pos: List[Position] = None
-        # self.woods_pos: List[Position] = None
-        # self.coals_pos: List[Position] = None
-        # self.uraniums_pos: List[Position] = None
+        self.woods_pos: Set[Position] = None
+        self.coals_pos: Set[Position] = None
+        self.uraniums_pos: Set[Position] = None
 
-    def _set_res_types(self, game_state: Game, seq: List[Position]) -> None:
+    def _set_res_types(self, game_state: Game, seq: List[Position]) -> List[Position]:
         """Set sequence of all resource types
+
+        Returns:
+            List[Position]: positions of seq without resource
         """
+        depleted = []
         resources = []
         resources_pos = []
         woods = []
@@ -78,11 +144,17 @@ class GameSpace:
                     coals.append(cell)
                 elif cell.resource.type == cs.RESOURCE_TYPES.URANIUM:
                     uraniums.append(cell)
+            else:
+                depleted.append(pos)
         self.resources = resources
         self.resources_pos = resources_pos
         self.woods = woods
         self.coals = coals
         self.uraniums = uraniums
+        self.woods_pos = {cell.pos for cell in woods}
+        self.coals_pos = {cell.pos for cell in coals}
+        self.uraniums_pos = {cell.pos for cell in uraniums}
+        return depleted
 
     def set_map_statements(self, game_state: Game) -> None:
         """Set map cells and positions
@@ -92,13 +164,23 @@ class GameSpace:
             self.map_cells_pos = [cell.pos for cell in self.map_cells]
             self.map_cells_pos_unic: UnicPos = AD[game_state.map_height]['unic_pos']
             self._set_res_types(game_state=game_state, seq=self.map_cells_pos)
+            # game_space can be reused by the next game with other map
+            self.adjacency.reset(cells=self.resources, size=game_state.map_width)
+            self.adj_coord_unic = self.adjacency.coords
         else:
             self.map_cells = [game_state.map.get_cell_by_pos(pos) for pos in self.map_cells_pos]
-            self._set_res_types(game_state=game_state, seq=self.resources_pos)
+            for pos in self._set_res_types(game_state=game_state, seq=self.resources_pos):
+                self.adjacency.remove((pos.x, pos.y))
 
 
 class TilesCollection:
-    """Get massive of tiles"""
+    """Get massive of tiles
+
+    NOTE: objects of both players are indexed in single pass on init:
+    lists of workers, carts, cities and citytiles, coordinate to owner team,
+    units and citytile, and ids of each object type. All collections are
+    materialized, so they can be iterated and checked many times in turn
+    """
 
     def __init__(
         self,
@@ -115,17 +197,74 @@ class TilesCollection:
         self.player_units = player.units
         self.opponent_units = opponent.units
         self.build_units_counter = 0
+
+        # object index of the turn
+        self.owners: Dict[Coord, int] = {}
+        self.units_at: Dict[Coord, List[Unit]] = {}
+        self.citytile_at: Dict[Coord, CityTile] = {}
+        self.ids: Dict[str, Set[str]] = {}
+        (
+            self.player_workers, self.player_carts,
+            self.player_cities, self.player_citytiles
+            ) = self._index(side='player', obj=player)
+        (
+            self.opponent_workers, self.opponent_carts,
+            self.opponent_cities, self.opponent_citytiles
+            ) = self._index(side='opponent', obj=opponent)
+
+    def _index(
+        self,
+        side: str,
+        obj: Player
+        ) -> Tuple[List[Unit], List[Unit], List[City], List[CityTile]]:
+        """Add objects of player to index of the turn
+
+        Args:
+            side (str): 'player' or 'opponent', prefix of id sets
+            obj (Player): player or opponent
+
+        Returns:
+            Tuple[List[Unit], List[Unit], List[City], List[CityTile]]: workers,
+            carts, cities and citytiles
+        """
+        workers, carts, citytiles = [], [], []
+        for unit in obj.units:
+            coord = (unit.pos.x, unit.pos.y)
+            (workers if unit.is_worker() else carts).append(unit)
+            self.owners[coord] = obj.team
+            self.units_at.setdefault(coord, []).append(unit)
+        cities = list(obj.cities.values())
+        for city in cities:
+            for citytile in city.citytiles:
+                coord = (citytile.pos.x, citytile.pos.y)
+                citytiles.append(citytile)
+                self.owners[coord] = obj.team
+                self.citytile_at[coord] = citytile
+        self.ids[f'{side}_workers'] = set(self._unit_ids(workers))
+        self.ids[f'{side}_carts'] = set(self._unit_ids(carts))
+        self.ids[f'{side}_cities'] = set(self._city_ids(cities))
+        return workers, carts, cities, citytiles
+
+    def is_owned_by_player(self, coord: Coord) -> bool:
+        """Player's unit or citytile is on the tile
+        """
+        return self.owners.get(coord) == self.player.team
+
+    def is_owned_by_opponent(self, coord: Coord) -> bool:
+        """Opponent's unit or citytile is on the tile
+        """
+        return self.owners.get(coord) == self.opponent.team
         
-    def _pos(self, seq: GameObjects) -> List[Position]:
-        """Get sequence of positions
+    def _pos(self, seq: GameObjects) -> Set[Position]:
+        """Get set of positions
 
         Args:
             seq (GameObjects): sequence of objects
 
         Returns:
-            List[Position]: list of Positions objects
+            Set[Position]: set of Positions objects
         """
-        return [cell.pos for cell in seq]
+        return {cell.pos for cell in seq}
     
     def _unic_pos(self, seq: List[Position]) -> UnicPos:
         """Get sequence of unic tuples of coordinates
@@ -169,230 +308,144 @@ class TilesCollection:
         return (self.city_units_diff - self.build_units_counter) > 0
 
     @cached_property
-    def player_units_pos(self) -> Iterable[Position]:
+    def player_units_pos(self) -> Set[Position]:
         """
         Returns positions of all Player's units.
 
         Returns:
-            List[Position]: Positions of the Units.
+            Set[Position]: Positions of the Units.
         """
-        return chain(self.player_carts_pos, self.player_workers_pos)
+        return self.player_carts_pos | self.player_workers_pos
     
     @cached_property
-    def player_workers(self) -> List[Unit]:
-        """
-        Returns Player's workers.
-
-        Returns:
-            List[Unit]: Units objects.
-        """
-        return [unit for unit in self.player_units if unit.is_worker()]
-
-    @cached_property
-    def player_workers_pos(self) -> List[Position]:
+    def player_workers_pos(self) -> Set[Position]:
         """
         Returns Player's workers positions.
 
         Returns:
-            List[Position]: Positions of the workers.
+            Set[Position]: Positions of the workers.
         """
         return self._pos(self.player_workers)
     
     @cached_property
-    def player_carts(self) -> List[Unit]:
-        """
-        Returns Player's carts.
-
-        Returns:
-            List[Unit]: Units objects.
-        """
-        return [unit for unit in self.player_units if unit.is_cart()]
-    
-    @cached_property
-    def player_carts_pos(self) -> List[Position]:
+    def player_carts_pos(self) -> Set[Position]:
         """
         Returns Player's carts positions.
 
         Returns:
-            List[Position]: Positions of the carts.
+            Set[Position]: Positions of the carts.
         """
         return self._pos(self.player_carts)
     
     @cached_property
-    def player_cities(self) -> List[City]:
-        """
-        Returns Player's Cities.
-
-        Returns:
-            List[City]: Cities objects.
-        """
-        return list(self.player.cities.values())
-    
-    @cached_property
-    def player_citytiles(self) -> List[CityTile]:
-        """
-        Returns Player's CityTiles.
-
-        Returns:
-            List[CityTile]: CityTiles objects.
-        """
-        citytiles = []
-        for city in self.player_cities:
-            citytiles = citytiles + city.citytiles
-        return citytiles
-    
-    @cached_property
-    def player_citytiles_pos(self) -> List[Position]:
+    def player_citytiles_pos(self) -> Set[Position]:
         """
         Returns Player's CityTiles positions.
 
         Returns:
-            List[Position]: Positions of the CityTiles.
+            Set[Position]: Positions of the CityTiles.
         """
         return self._pos(self.player_citytiles)
     
     @cached_property
-    def player_own(self) -> Iterable[Union[Unit, CityTile]]:
+    def player_own(self) -> List[Union[Unit, CityTile]]:
         """
         Returns all objects owned by Player.
 
         Returns:
-            Iterable[Unit, CityTile]: Player's Unit or CityTile.
+            List[Unit, CityTile]: Player's Unit or CityTile.
         """
-        return chain(self.player_units, self.player_citytiles)
+        return self.player_units + self.player_citytiles
     
     @cached_property
-    def player_own_pos(self) -> Iterable[Position]:
+    def player_own_pos(self) -> Set[Position]:
         """
         Returns positions where Player's Units and CityTiles are located.
 
         Returns:
-            Iterable[Position]: Positions of Units or CityTiles.
+            Set[Position]: Positions of Units or CityTiles.
         """
-        return chain(self.player_units_pos, self.player_citytiles_pos)
+        return self.player_units_pos | self.player_citytiles_pos
     
     @cached_property
-    def opponent_units_pos(self) -> Iterable[Position]:
+    def opponent_units_pos(self) -> Set[Position]:
         """
         Returns positions of all Opponent's units.
 
         Returns:
-            Iterable[Position]: Positions of the Units.
+            Set[Position]: Positions of the Units.
         """
-        return chain(self.opponent_carts_pos, self.opponent_workers_pos)
+        return self.opponent_carts_pos | self.opponent_workers_pos
     
     @cached_property
-    def opponent_workers(self) -> List[Unit]:
-        """
-        Returns Opponent's workers.
-
-        Returns:
-            List[Unit]: Units.
-        """
-        return [unit for unit in self.opponent_units if unit.is_worker()]
-    
-    @cached_property
-    def opponent_workers_pos(self) -> List[Position]:
+    def opponent_workers_pos(self) -> Set[Position]:
         """
         Returns Opponent's workers positions.
 
         Returns:
-            List[Position]: Positions of the workers.
+            Set[Position]: Positions of the workers.
         """
         return self._pos(self.opponent_workers)
     
     @cached_property
-    def opponent_carts(self) -> List[Unit]:
-        """
-        Returns Opponent's carts.
-
-        Returns:
-            List[Unit]: Units.
-        """
-        return [unit for unit in self.opponent_units if unit.is_cart()]
-    
-    @cached_property
-    def opponent_carts_pos(self) -> List[Position]:
+    def opponent_carts_pos(self) -> Set[Position]:
         """
         Returns Opponent's carts positions.
 
         Returns:
-            List[Position]: Positions of the carts.
+            Set[Position]: Positions of the carts.
         """
         return self._pos(self.opponent_carts)
     
     @cached_property
-    def opponent_cities(self) -> List[City]:
-        """
-        Returns Opponent's Cities.
-
-        Returns:
-            List[City]: Cities.
-        """
-        return list(self.opponent.cities.values())
-    
-    @cached_property
-    def opponent_citytiles(self) -> List[CityTile]:
-        """
-        Returns Opponent's CityTiles.
-
-        Returns:
-            List[CityTile]: CityTiles.
-        """
-        citytiles = []
-        for city in self.opponent_cities:
-            citytiles = citytiles + city.citytiles
-        return citytiles
-    
-    @cached_property
-    def opponent_citytiles_pos(self) -> List[Position]:
+    def opponent_citytiles_pos(self) -> Set[Position]:
         """
         Returns Opponent's CityTiles positions.
 
         Returns:
-            List[Position]: Positions of the CityTiles.
+            Set[Position]: Positions of the CityTiles.
         """
         return self._pos(self.opponent_citytiles)
     
     @cached_property
-    def opponent_own(self) -> Iterable[Union[Unit, CityTile]]:
+    def opponent_own(self) -> List[Union[Unit, CityTile]]:
         """
         Returns all objects owned by Opponent.
 
         Returns:
-            Iterable[Unit, CityTile]: Opponent's objects with type Unit or CityTile.
+            List[Unit, CityTile]: Opponent's objects with type Unit or CityTile.
         """
-        return chain(self.opponent_units, self.opponent_citytiles)
+        return self.opponent_units + self.opponent_citytiles
     
     @cached_property
-    def opponent_own_pos(self) -> Iterable[Position]:
+    def opponent_own_pos(self) -> Set[Position]:
         """
         Returns positions where Opponent's Units and CityTiles are located.
 
         Returns:
-            Iterable[Position]: Position of Units or CityTiles.
+            Set[Position]: Position of Units or CityTiles.
         """
-        return chain(self.opponent_units_pos, self.opponent_citytiles_pos)
+        return self.opponent_units_pos | self.opponent_citytiles_pos
     
     @cached_property
-    def own(self) -> Iterable[Union[Unit, CityTile]]:
+    def own(self) -> List[Union[Unit, CityTile]]:
         """
         Returns all objects owned by Player and Opponent.
 
         Returns:
-            Iterable[Unit, CityTile]: objects with type Unit or CityTile.
+            List[Unit, CityTile]: objects with type Unit or CityTile.
         """
-        return chain(self.player_own, self.opponent_own)
+        return self.player_own + self.opponent_own
     
     @cached_property
-    def own_pos(self) -> Iterable[Position]:
+    def own_pos(self) -> Set[Position]:
         """
         Returns positions where Player's and Opponent's Units and CityTiles are located.
 
         Returns:
-            Iterable[Position]: Positions Units or CityTiles.
+            Set[Position]: Positions Units or CityTiles.
         """
-        return chain(self.player_own_pos, self.opponent_own_pos)
+        return self.player_own_pos | self.opponent_own_pos
     
     @cached_property
     def own_pos_unic(self) -> UnicPos:
@@ -413,84 +466,108 @@ class TilesCollection:
         return self.game_space.map_cells_pos_unic - self.own_pos_unic
     
     @cached_property
-    def empty_pos(self) -> List[Position]:
+    def empty_pos(self) -> Set[Position]:
         """
         Returns Position of all empty Cell objects on game map.
 
         Returns:
-            List[Position]: Positions of the empty Cells;
+            Set[Position]: Positions of the empty Cells;
         """
-        return [Position(coor[0], coor[1]) for coor in self.empty_pos_unic]
-    
+        return {Position(coor[0], coor[1]) for coor in self.empty_pos_unic}
+
+    @cached_property
+    def build_sites_pos(self) -> List[Position]:
+        """
+        Returns Position of empty tiles without resources, where city can be built:
+        tiles adjacent to player citytiles or all of them, if player has no citytiles.
+
+        Returns:
+            List[Position]: Positions of build sites;
+        """
+        if self.player_citytiles:
+            adjacence = AD[self.game_state.map_width]['adjacence']
+            coords = {
+                coord
+                for citytile in self.player_citytiles
+                for coord in adjacence[(citytile.pos.x, citytile.pos.y)]
+                }
+        else:
+            coords = self.game_space.map_cells_pos_unic
+        resources = self.game_space.adjacency.resources
+        return [
+            Position(coord[0], coord[1]) for coord in coords
+            if coord not in self.owners and coord not in resources
+            ]
+
     @cached_property
-    def workers(self) -> Iterable[Unit]:
+    def workers(self) -> List[Unit]:
         """
         Returns Player's and Opponent's workers.
 
         Returns:
-            Iterable[Unit]: Units.
+            List[Unit]: Units.
         """
-        return chain(self.player_workers, self.opponent_workers)
+        return self.player_workers + self.opponent_workers
 
     @cached_property
-    def workers_pos(self) -> Iterable[Position]:
+    def workers_pos(self) -> Set[Position]:
         """
         Returns Player's and Opponent's workers positions.
 
         Returns:
-            Iterable[Position]: Positions of the workers.
+            Set[Position]: Positions of the workers.
         """
-        return chain(self.player_workers_pos, self.opponent_workers_pos)
+        return self.player_workers_pos | self.opponent_workers_pos
     
     @cached_property
-    def carts(self) -> Iterable[Unit]:
+    def carts(self) -> List[Unit]:
         """
         Returns Player's and Opponent's carts.
 
         Returns:
-            Iterable[Unit]: Units.
+            List[Unit]: Units.
         """
-        return chain(self.player_carts, self.opponent_carts)
+        return self.player_carts + self.opponent_carts
     
     @cached_property
-    def carts_pos(self) -> Iterable[Position]:
+    def carts_pos(self) -> Set[Position]:
         """
         Returns Player's and Opponent's carts positions.
 
         Returns:
-            Iterable[Position]: Positions of the carts.
+            Set[Position]: Positions of the carts.
         """
-        return chain(self.player_carts_pos, self.opponent_carts_pos)
+        return self.player_carts_pos | self.opponent_carts_pos
     
     @cached_property
-    def cities(self) -> Iterable[City]:
+    def cities(self) -> List[City]:
         """
         Returns Player's and Opponent's Cities.
 
         Returns:
-            Iterable[City]: Cities.
+            List[City]: Cities.
         """
-        return chain(self.player_cities, self.opponent_cities)
+        return self.player_cities + self.opponent_cities
     
     @cached_property
-    def citytiles(self) -> Iterable[CityTile]:
+    def citytiles(self) -> List[CityTile]:
         """
         Returns Player's and Opponent's CityTiles.
 
         Returns:
-            Iterable[CityTile]: CityTiles.
+            List[CityTile]: CityTiles.
         """
-        return chain(self.player_citytiles, self.opponent_citytiles)
+        return self.player_citytiles + self.opponent_citytiles
     
     @cached_property
-    def citytiles_pos(self) -> Iterable[Position]:
+    def citytiles_pos(self) -> Set[Position]:
         """
         Returns Player's and Opponent's CityTiles positions.
 
         Returns:
-            Iterable[Position]: Positions of the CityTiles.
+            Set[Position]: Positions of the CityTiles.
         """
-        return chain(self.player_citytiles_pos, self.opponent_citytiles_pos)
+        return self.player_citytiles_pos | self.opponent_citytiles_pos
     
     @cached_property
     def roads(self) -> List[Cell]:
@@ -503,12 +580,12 @@ class TilesCollection:
         return [cell for cell in self.game_space.map_cells if cell.road]
     
     @cached_property
-    def roads_pos(self) -> List[Position]:
+    def roads_pos(self) -> Set[Position]:
         """
         Returns positions of tiles with road.
 
         Returns:
-            List[Position]: Positions of the tile.
+            Set[Position]: Positions of the tile.
         """
         return self._pos(self.roads)
     
@@ -525,11 +602,15 @@ class TilesCollection:
 
 class TileState:
     """Get tile statement
+
+    NOTE: tile statement is a view over cell of game map and object index
+    of TilesCollection of the turn
     """
 
     def __init__(self, tiles: TilesCollection, pos: Position) -> None:
         self.tiles = tiles
         self.pos = pos
+        self.coord = (pos.x, pos.y)
         self.map_width = tiles.game_state.map_width
         self.map_height = tiles.game_state.map_height
         self.cell = tiles.game_state.map.get_cell_by_pos(pos)
@@ -539,82 +620,77 @@ class TileState:
         self.opponent_worker_object: Union[Unit, None] = None
         self.opponent_cart_object: Union[Unit, None] = None
 
-    @cached_property
+    @property
     def is_owned_by_player(self) -> bool:
         """Is owned by player
         """
-        return self.cell.pos in self.tiles.player_own_pos
+        return self.tiles.is_owned_by_player(self.coord)
     
-    @cached_property
+    @property
     def is_owned_by_opponent(self) -> bool:
         """Is owned by opponent
         """
-        return self.cell.pos in self.tiles.opponent_own_pos
+        return self.tiles.is_owned_by_opponent(self.coord)
 
-    @cached_property
+    @property
     def is_owned(self) -> bool:
         """Is owned by any
         """
-        if self.is_owned_by_player or self.is_owned_by_opponent:
-            return True
-        else:
-            return False
+        return not self.is_empty
 
-    @cached_property
+    @property
     def is_resource(self) -> bool:
         """Is tile resource
         """
         return self.cell.has_resource()
 
-    @cached_property
+    @property
     def is_wood(self) -> bool:
         """Is tile wood
         """
-        return self.cell in self.tiles.game_space.woods
+        return self.cell.has_resource() and self.cell.resource.type == cs.RESOURCE_TYPES.WOOD
 
-    @cached_property
+    @property
     def is_coal(self) -> bool:
-        """Is tile wood
+        """Is tile coal
         """
-        return self.cell in self.tiles.game_space.coals
+        return self.cell.has_resource() and self.cell.resource.type == cs.RESOURCE_TYPES.COAL
 
-    @cached_property
+    @property
     def is_uranium(self) -> bool:
-        """Is tile wood
+        """Is tile uranium
         """
-        return self.cell in self.tiles.game_space.uraniums
+        return self.cell.has_resource() and self.cell.resource.type == cs.RESOURCE_TYPES.URANIUM
 
-    @cached_property
+    @property
     def is_road(self) -> bool:
         """Is tile Road
         """
-        return self.cell in self.tiles.roads
+        return bool(self.cell.road)
 
-    @cached_property
+    @property
     def is_city(self) -> bool:
         """Is tile city
         """
-        return bool(self.cell.citytile)
+        return self.coord in self.tiles.citytile_at
 
-    @cached_property
+    @property
     def is_worker(self) -> bool:
         """Is tile worker
         """
-        x, y = self.cell.pos
-        return Position(x, y) in self.tiles.workers_pos
+        return any(unit.is_worker() for unit in self.tiles.units_at.get(self.coord, ()))
 
-    @cached_property
+    @property
     def is_cart(self) -> bool:
         """Is tile cart
         """
-        x, y = self.cell.pos
-        return Position(x, y) in self.tiles.carts_pos
+        return any(unit.is_cart() for unit in self.tiles.units_at.get(self.coord, ()))
 
-    @cached_property
+    @property
     def is_empty(self) -> bool:
         """Is tile empty
         """
-        return self.cell.pos in self.tiles.empty_pos
+        return self.coord not in self.tiles.owners
 
     @cached_property
     def adjacence_unic_pos(self) -> UnicPos:
@@ -638,7 +714,7 @@ class TileState:
                 }
 
     @cached_property
-    def adjacent_pos(self) -> List[Position]:
+    def adjacent_pos(self) -> Set[Position]:
         """Calculate positions of adjacent tiles
 
         Returns:
@@ -755,31 +831,35 @@ class AdjacentToResourceCollection:
     def __init__(
         self,
         tiles: TilesCollection,
-        states: TileStatesCollection,
+        states: TileStatesCollection
         ) -> None:
         self.tiles = tiles
         self.states = states
-        self.adj_coord_unic: Set(Coord) = None
+        # tiles of turn, shared by units, tiles taken by units are claimed
+        self.adj_coord_unic: Set[Coord] = tiles.game_space.adj_coord_unic.copy()
         self.__empty_adjacent_any_pos = None
         self.__empty_adjacent_wood_pos = None
         self.__empty_adjacent_wood_coal_pos = None
         
     def _set_empty_adjacent_res_pos(self) -> None:
-        any_ = []
-        wood = []
-        wood_coal = []
-        for coord in self.adj_coord_unic:
-            pos = Position(coord[0], coord[1])
-            state = self.states.get_state(pos)
-            if state.is_empty:
-                any_.append(pos)
-                if state.is_wood:
-                    wood.append(pos)
-                if self.tiles.player.researched_coal() and (state.is_wood or state.is_coal):
-                    wood_coal.append(pos)
-        self.__empty_adjacent_any_pos = any_
-        self.__empty_adjacent_wood_pos = wood
-        self.__empty_adjacent_wood_coal_pos = wood_coal
+        adjacent = self.tiles.game_space.adjacency.adjacent
+        empty = self.adj_coord_unic - self.tiles.owners.keys()
+        wood = empty & adjacent[cs.RESOURCE_TYPES.WOOD]
+        if self.tiles.player.researched_coal():
+            wood_coal = wood | (empty & adjacent[cs.RESOURCE_TYPES.COAL])
+        else:
+            wood_coal = set()
+        self.__empty_adjacent_any_pos = [Position(*coord) for coord in empty]
+        self.__empty_adjacent_wood_pos = [Position(*coord) for coord in wood]
+        self.__empty_adjacent_wood_coal_pos = [Position(*coord) for coord in wood_coal]
+
+    def claim(self, coord: Coord) -> None:
+        """Remove tile, taken by unit, from targets of the other units
+        """
+        self.adj_coord_unic.discard(coord)
+        self.__empty_adjacent_any_pos = None
+        self.__empty_adjacent_wood_pos = None
+        self.__empty_adjacent_wood_coal_pos = None
     
     @property
     def empty_adjacent_any_pos(self) -> List[Position]:
@@ -800,6 +880,115 @@ class AdjacentToResourceCollection:
         return self.__empty_adjacent_wood_coal_pos
 
 
+class FlowField:
+    """Distances to the closest target of class around obstacles and
+    the closest target of each reached tile
+
+    NOTE: tiles farther than BFS depth are not reached
+    """
+
+    unreached = np.iinfo(np.int16).max
+
+    def __init__(self, distances: np.ndarray, nearest: np.ndarray, size: int) -> None:
+        self.distances = distances
+        self.nearest = nearest
+        self.size = size
+
+    def distance(self, coord: Coord) -> Union[int, None]:
+        """Moves to the closest target, None if tile is not reached
+        """
+        dis = self.distances[coord]
+        return None if dis == self.unreached else int(dis)
+
+    def target(self, coord: Coord) -> Union[Coord, None]:
+        """The closest target of tile, None if tile is not reached
+        """
+        index = self.nearest[coord]
+        return None if index < 0 else divmod(int(index), self.size)
+
+
+class FlowFields:
+    """Flow fields of the turn: multi-source BFS from targets of class
+
+    Opponent citytiles and units are obstacles. Field of class is shared by
+    units of the turn and is computed again, when targets are claimed by
+    units and the old field leads to claimed target. BFS is stopped,
+    when all player units are reached and PLAN_HORIZON moves around them
+    are known, so planner can use field as heuristic
+    """
+
+    def __init__(self, game_state: Game, tiles: TilesCollection) -> None:
+        self.size = game_state.map_width
+        self.blocked = np.zeros((self.size, self.size), dtype=bool)
+        for (x, y), team in tiles.owners.items():
+            if team == tiles.opponent.team:
+                self.blocked[x, y] = True
+        self.units = np.zeros((self.size, self.size), dtype=bool)
+        for unit in tiles.player_units:
+            self.units[unit.pos.x, unit.pos.y] = True
+        self.fields: Dict[str, Tuple[FrozenSet[Coord], FlowField]] = {}
+
+    def _bfs(self, targets: Iterable[Coord]) -> FlowField:
+        size = self.size
+        unreached = FlowField.unreached
+        distances = np.full((size, size), unreached, dtype=np.int16)
+        nearest = np.full((size, size), -1, dtype=np.int32)
+        coords = np.array(list(targets), dtype=np.intp).reshape(-1, 2)
+        xs, ys = coords[:, 0], coords[:, 1]
+        distances[xs, ys] = 0
+        nearest[xs, ys] = xs * size + ys
+        frontier = np.zeros((size, size), dtype=bool)
+        frontier[xs, ys] = True
+        free = ~self.blocked
+        units = self.units.copy()
+        depth, stop = 0, None
+        while frontier.any() and (stop is None or depth < stop):
+            depth += 1
+            open_ = free & (distances == unreached)
+            reached = np.zeros((size, size), dtype=bool)
+            # tile is reached from any of 4 neighbours of frontier
+            for dst, src in (
+                ((slice(1, None), slice(None)), (slice(None, -1), slice(None))),
+                ((slice(None, -1), slice(None)), (slice(1, None), slice(None))),
+                ((slice(None), slice(1, None)), (slice(None), slice(None, -1))),
+                ((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+                ):
+                step = frontier[src] & open_[dst] & ~reached[dst]
+                nearest[dst][step] = nearest[src][step]
+                reached[dst] |= step
+            distances[reached] = depth
+            frontier = reached
+            units &= ~reached
+            if stop is None and not units.any():
+                stop = depth + PLAN_HORIZON
+        return FlowField(distances=distances, nearest=nearest, size=size)
+
+    def get(self, name: str, targets: Iterable[Coord], coord: Coord) -> FlowField:
+        """Flow field of target class for unit on tile
+
+        NOTE: removal of targets doesn't change the closest target of tile,
+        if this target is left, so field is reused until targets are added or
+        the closest target of tile is removed
+
+        Args:
+            name (str): name of target class
+            targets (Iterable[Coord]): current targets of class
+            coord (Coord): tile of unit
+
+        Returns:
+            FlowField: field of class
+        """
+        targets = frozenset(targets)
+        if name in self.fields:
+            cached, field = self.fields[name]
+            target = field.target(coord)
+            if targets <= cached and (target is None or target in targets):
+                return field
+        field = self._bfs(targets)
+        self.fields[name] = (targets, field)
+        return field
+
+
 class TurnSpace:
     """Collected game statements
     """
@@ -830,3 +1019,7 @@ class TurnSpace:
             tiles=self.tiles,
             states=self.states
         )
+        self.fields = FlowFields(
+            game_state=game_state,
+            tiles=self.tiles
+            )
@@ -1,8 +1,11 @@
 from lux.game_constants import GAME_CONSTANTS as cs
 from lux.game_objects import Unit, CityTile
 from lux.game_map import Cell, Position
-from typing import List, Dict, NamedTuple, Union, Set, Tuple
+from typing import List, Dict, NamedTuple, Union, Set, Tuple, Iterable, Optional
 from collections import namedtuple
+from collections.abc import Mapping
+import numpy as np
+import os
 
 
 def make_constants_nt(const: dict = cs, name: str = 'CONSTANTS') -> namedtuple:
@@ -49,32 +52,73 @@ def make_constants_nt(const: dict = cs, name: str = 'CONSTANTS') -> namedtuple:
 
 CONSTANTS = make_constants_nt(const=cs)
 
+# trace bot pipeline to log, BOT_TRACE=1 must be set before import of bots
+TRACE: bool = os.environ.get('BOT_TRACE', '0') == '1'
+
+# moves, planned ahead by bots.planner
+PLAN_HORIZON: int = 4
+
 # day constants
 ALL_DAYS: List[int] = [x + y for x in range(30) for y in range(0, 360, 40)]
 ALL_MORNINGS: List[int] = [x for x in range(0, 360, 40) if x]
 ALL_NIGHTS: List[int] = [x + y for x in range(30, 40) for y in range(0, 360, 40)]
 
 
-def day_or_night_number(
-    current: int,
-    days: List[int] = ALL_DAYS,
-    nights: List[int] = ALL_NIGHTS
-    ) -> int:
+class Calendar:
+    """Day and night calendar of the game, arrays are indexed by turn
+
+    phase - number of day or night since begin the game
+    cycle - number of day-night cycle
+    is_night, is_morning - first turn of day, except turn 0
+    turns_until_night - 0 at night
+    turns_until_dawn - 0 at day
+    """
+
+    def __init__(
+        self,
+        day_length: int = CONSTANTS.PARAMETERS.DAY_LENGTH,
+        night_length: int = CONSTANTS.PARAMETERS.NIGHT_LENGTH,
+        max_days: int = CONSTANTS.PARAMETERS.MAX_DAYS
+        ) -> None:
+        self.day_length = day_length
+        self.night_length = night_length
+        self.cycle_length = day_length + night_length
+        self.max_days = max_days
+        turns = np.arange(max_days + 1)
+        position = turns % self.cycle_length
+        self.cycle: np.ndarray = turns // self.cycle_length
+        self.is_night: np.ndarray = position >= day_length
+        self.is_morning: np.ndarray = (position == 0) & (turns > 0)
+        self.phase: np.ndarray = self.cycle * 2 + self.is_night
+        self.turns_until_night: np.ndarray = np.where(self.is_night, 0, day_length - position)
+        self.turns_until_dawn: np.ndarray = np.where(self.is_night, self.cycle_length - position, 0)
+        for array in (self.cycle, self.is_night, self.is_morning, self.phase,
+                      self.turns_until_night, self.turns_until_dawn):
+            array.setflags(write=False)
+
+    def __len__(self) -> int:
+        return self.max_days + 1
+
+    def _check(self, turn: int) -> int:
+        if not 0 <= turn <= self.max_days:
+            raise ValueError(f'Turn {turn} is out of game [0, {self.max_days}]')
+        return turn
+
+
+CALENDAR = Calendar()
+
+
+def day_or_night_number(current: int, calendar: Calendar = CALENDAR) -> int:
     """Is night or day
 
     Args:
         current (int): curent turn
-        days (List[int], optional): days constant. Defaults to ALL_DAYS.
-        nights (List[int], optional): night constant. Defaults to ALL_NIGHTS.
+        calendar (Calendar, optional): game calendar. Defaults to CALENDAR.
 
     Returns:
         int: the number of day or night since begin the game
     """
-    if current in days:
-        n = current // 30 * 2
-    elif current in nights:
-        n = current // 40 * 2 + 1
-    return n
+    return int(calendar.phase[calendar._check(current)])
 
 
 # Types
@@ -89,7 +133,7 @@ Coord = Tuple[int]
 # positions
 UnicPos = Set[Tuple[int]]
 MapData = Union[Dict[Coord, Dict[Coord, Union[str, float]]], Set[Coord]]
-AdjDis = Dict[int, Dict[str, MapData]]
+AdjDis = Mapping
 
 # missions
 MissionName = str
@@ -105,51 +149,199 @@ CrossGameScore = Dict[str, str]
 # game actions
 Actions = List[str]
 
-def map_adjacences_and_distancies() -> AdjDis:
-    """Calculate all ajacence for all cells for all sizes
-    Then calculate all distaces between cells
-    
-    Data:
-    
+MAP_SIZES: List[int] = [12, 16, 24, 32]
+
+
+class DistanceRow(Mapping):
+    """Distances from one cell to all other cells of the map
+
+    Read-only view of a row of the distance matrix, keyed by coord
+    """
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'DistanceTable', index: int) -> None:
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, coord: Coord) -> int:
+        if coord not in self._table.indexes or coord == self._table.coords[self._index]:
+            raise KeyError(coord)
+        return int(self._table.matrix[self._index, self._table.indexes[coord]])
+
+    def __iter__(self):
+        return (coord for coord, _ in self.items())
+
+    def __len__(self) -> int:
+        return len(self._table.coords) - 1
+
+    def items(self):
+        """Pairs (coord, distance) in map order, without the cell itself"""
+        index = self._index
+        return (
+            (coord, dis)
+            for i, (coord, dis) in enumerate(zip(self._table.coords, self._table.matrix[index].tolist()))
+            if i != index
+            )
+
+    @property
+    def array(self) -> np.ndarray:
+        """Raw matrix row, including the cell itself"""
+        return self._table.matrix[self._index]
+
+
+class DistanceTable(Mapping):
+    """Manhattan distances between all cells of one map size
+
+    Data is kept in a single uint8 matrix indexed by x * size + y
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.coords: List[Coord] = [(x, y) for x in range(size) for y in range(size)]
+        self.indexes: Dict[Coord, int] = {coord: i for i, coord in enumerate(self.coords)}
+        xs, ys = np.divmod(np.arange(size * size), size)
+        self.matrix: np.ndarray = (
+            np.abs(xs[:, None] - xs[None, :]) + np.abs(ys[:, None] - ys[None, :])
+            ).astype(np.uint8)
+        self.matrix.setflags(write=False)
+
+    def __getitem__(self, coord: Coord) -> DistanceRow:
+        return DistanceRow(self, self.indexes[coord])
+
+    def closest(self, coord: Coord, targets: Iterable[Coord]) -> Optional[Coord]:
+        """Get closest target to coord by argmin over the matrix row
+
+        NOTE: the cell itself is never a target. Ties are resolved to
+        the last target in map order (x * size + y)
+
+        Args:
+            coord (Coord): start coord
+            targets (Iterable[Coord]): target coords
+
+        Returns:
+            Optional[Coord]: closest target coord or None if no targets
+        """
+        size = self.size
+        index = self.indexes[coord]
+        indexes = np.fromiter((x * size + y for x, y in targets), dtype=np.intp)
+        indexes = indexes[indexes != index]
+        if not indexes.size:
+            return None
+        dis = self.matrix[index, indexes]
+        return self.coords[indexes[dis == dis.min()].max()]
+
+    def __iter__(self):
+        return iter(self.coords)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+
+class MapTables(Mapping):
+    """Adjacence, distance and unic_pos data of one map size
+
+    Each table is calculated on first access
+    """
+
+    keys_ = ('adjacence', 'distance', 'unic_pos')
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._data: Dict[str, MapData] = {}
+
+    def __getitem__(self, key: str) -> MapData:
+        if key not in self._data:
+            if key not in self.keys_:
+                raise KeyError(key)
+            self._data[key] = getattr(self, f'_make_{key}')()
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self.keys_)
+
+    def __len__(self) -> int:
+        return len(self.keys_)
+
+    def _make_adjacence(self) -> Dict[Coord, Dict[Coord, str]]:
+        size = self.size
+        adjacence = {}
+        for x in range(size):
+            for y in range(size):
+                adj = {}
+                if (x - 1) >= 0:
+                    adj[(x - 1, y)] = 'w'
+                if (y + 1) < size:
+                    adj[(x, y + 1)] = 's'
+                if (x + 1) < size:
+                    adj[(x + 1, y)] = 'e'
+                if (y - 1) >= 0:
+                    adj[(x, y - 1)] = 'n'
+                adjacence[(x, y)] = adj
+        return adjacence
+
+    def _make_distance(self) -> DistanceTable:
+        return DistanceTable(self.size)
+
+    def _make_unic_pos(self) -> UnicPos:
+        return {(x, y) for x in range(self.size) for y in range(self.size)}
+
+
+class AdjacencesAndDistancies(Mapping):
+    """Lazy {map size: MapTables} mapping
+
+    Tables are built only for map sizes, that are in play. Call
+    preload() in parent process before forking workers to share
+    them read-only between processes
+    """
+
+    def __init__(self, sizes: List[int] = MAP_SIZES) -> None:
+        self.sizes = list(sizes)
+        self._tables: Dict[int, MapTables] = {}
+
+    def __getitem__(self, size: int) -> MapTables:
+        if size not in self._tables:
+            if size not in self.sizes:
+                raise KeyError(size)
+            self._tables[size] = MapTables(size)
+        return self._tables[size]
+
+    def __iter__(self):
+        return iter(self.sizes)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def preload(self, sizes: List[int] = None) -> None:
+        """Build all tables for given sizes
+
+        Args:
+            sizes (List[int], optional): map sizes. Defaults to all sizes.
+        """
+        for size in sizes or self.sizes:
+            for key in self[size]:
+                self[size][key]
+
+
+def map_adjacences_and_distancies(sizes: List[int] = MAP_SIZES) -> AdjDis:
+    """Make ajacence for all cells and distaces between cells for all sizes
+
+    Data is calculated lazily, on first access for each map size:
+
     {map size: {
-        'adjacence': {coord: list of coord}, 'distance': {coord: {coord: float}}, 'unic_pos': set(coord)}
-        }
+        'adjacence': {coord: {coord: direction}},
+        'distance': {coord: {coord: int}},
+        'unic_pos': set(coord)
+        }}
+
+    Args:
+        sizes (List[int], optional): map sizes. Defaults to MAP_SIZES.
 
     Returns:
-        AdjDis: dict with data
+        AdjDis: mapping with data
     """
-    
-    sizes = [12, 16, 24, 32]
-    coord_state = {}
-    for size in sizes:
-        coords = [(x, y) for x in range(size) for y in range(size)]
-        data = {'adjacence': {}, 'distance': {}, 'unic_pos': set()}
-        for coord in coords:
-            x = coord[0]
-            y = coord[1]
-            
-            data['unic_pos'].add(coord)
-
-            current = Position(x, y)
-            adj = {}
-            if (x - 1) >= 0:
-                adj[(x - 1, y)] = 'w'
-            if (y + 1) < size:
-                adj[(x, y + 1)] = 's'
-            if (x + 1) < size:
-                adj[(x + 1, y)] = 'e'
-            if (y - 1) >= 0:
-                adj[(x, y - 1)] = 'n'
-            data['adjacence'][coord] = adj
-            
-            dis = {}
-            for remote in coords:
-                if remote != coord:
-                    dis[remote] = current.distance_to(Position(remote[0], remote[1]))
-            data['distance'][coord] = dis
 
-        coord_state[size] = data
+    return AdjacencesAndDistancies(sizes=sizes)
 
-    return coord_state
 
 AD = map_adjacences_and_distancies()
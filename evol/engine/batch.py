@@ -0,0 +1,838 @@
+from engine.mapgen import generate_map, MAP_SIZES
+from engine.simulator import (
+    Observation, Agent, GameDecided, BUILTIN_AGENTS, PARAMETERS, COLLECTION_ORDER,
+    COLLECTION_RATE, FUEL_RATE, CYCLE_LENGTH, MOVES, number
+)
+from typing import Dict, List, Optional, Tuple, Union
+from loguru import logger
+import numpy as np
+import random
+
+
+RESOURCE_IDS = {'wood': 1, 'coal': 2, 'uranium': 3}
+RESOURCE_NAMES = {val: key for key, val in RESOURCE_IDS.items()}
+RESEARCH = {
+    'wood': 0,
+    'coal': PARAMETERS['RESEARCH_REQUIREMENTS']['COAL'],
+    'uranium': PARAMETERS['RESEARCH_REQUIREMENTS']['URANIUM'],
+    }
+CAPACITY = np.array([
+    PARAMETERS['RESOURCE_CAPACITY']['WORKER'],
+    PARAMETERS['RESOURCE_CAPACITY']['CART']
+    ])
+UNIT_COOLDOWN = np.array([
+    PARAMETERS['UNIT_ACTION_COOLDOWN']['WORKER'],
+    PARAMETERS['UNIT_ACTION_COOLDOWN']['CART']
+    ])
+UNIT_UPKEEP = np.array([
+    PARAMETERS['LIGHT_UPKEEP']['WORKER'],
+    PARAMETERS['LIGHT_UPKEEP']['CART']
+    ])
+
+
+def _adjacent_sum(grid: np.ndarray, center: bool = True) -> np.ndarray:
+    """Sum of values of adjacent cells for each cell of stacked maps
+
+    Args:
+        grid (np.ndarray): array (episode, x, y)
+        center (bool, optional): add value of cell itself. Defaults to True
+
+    Returns:
+        np.ndarray: array (episode, x, y)
+    """
+    grid = grid.astype(np.float64)
+    out = grid.copy() if center else np.zeros_like(grid)
+    out[:, 1:, :] += grid[:, :-1, :]
+    out[:, :-1, :] += grid[:, 1:, :]
+    out[:, :, 1:] += grid[:, :, :-1]
+    out[:, :, :-1] += grid[:, :, 1:]
+    return out
+
+
+class BatchLuxEngine:
+    """Many Lux AI 2021 episodes of the same map size, stepped in lockstep
+
+    Cells are kept in array (episode, x, y, feature), as MapState in
+    kernels/preserves/npstatements.py does, units and cities in padded
+    arrays (episode, slot, feature). Actions of agents are applied per
+    episode, all per-cell rules (roads, resource collection, drops, night
+    upkeep, wood regrowth and cooldowns) are applied to all episodes by
+    single vectorized operations.
+
+    NOTE: slots of dead units and removed cities are not reused, so slot
+    index defines id of object: u_{slot + 1} and c_{slot + 1}. Citytiles
+    keep order of LuxEngine in city (by build, merged cities are appended)
+    in city_order feature, so updates of both engines are identical.
+    Finished episodes are frozen: rules of step skip them.
+    """
+
+    fmap = {
+        'resource_type': 0,
+        'resource_amount': 1,
+        'road': 2,
+        'city_id': 3,
+        'city_team': 4,
+        'city_cooldown': 5,
+        'city_order': 6,
+        }
+    ufmap = {
+        'alive': 0,
+        'team': 1,
+        'type': 2,
+        'x': 3,
+        'y': 4,
+        'cooldown': 5,
+        'wood': 6,
+        'coal': 7,
+        'uranium': 8,
+        }
+    cfmap = {
+        'alive': 0,
+        'team': 1,
+        'fuel': 2,
+        }
+
+    def __init__(self, size: int, seeds: List[int]) -> None:
+        self.size = size
+        self.seeds = seeds
+        self.n = len(seeds)
+        self.turn = 0
+        self.cells = np.zeros([self.n, size, size, len(self.fmap)], np.float64)
+        self.units = np.zeros([self.n, 8, len(self.ufmap)], np.float64)
+        self.cities = np.zeros([self.n, 8, len(self.cfmap)], np.float64)
+        self.unit_count = np.zeros(self.n, np.int64)
+        self.city_count = np.zeros(self.n, np.int64)
+        self.tile_count = np.zeros(self.n, np.int64)
+        self.research = np.zeros([self.n, 2], np.int64)
+        self.done = np.zeros(self.n, bool)
+        self.final_rewards: List[Optional[List[int]]] = [None] * self.n
+        self._upkeep: Optional[np.ndarray] = None
+        self._updates: Optional[Dict[int, List[str]]] = None
+
+        for e, seed in enumerate(seeds):
+            game_map, spawns = generate_map(size=size, rng=random.Random(seed))
+            for row in game_map.map:
+                for cell in row:
+                    if cell.resource is not None:
+                        self.cells[e, cell.pos.x, cell.pos.y, self.fmap['resource_type']] = \
+                            RESOURCE_IDS[cell.resource.type]
+                        self.cells[e, cell.pos.x, cell.pos.y, self.fmap['resource_amount']] = \
+                            cell.resource.amount
+            for team, (x, y) in enumerate(spawns):
+                self._build_citytile(e, team, x, y)
+                self._spawn_unit(e, team, 0, x, y)
+
+    @property
+    def is_night(self) -> bool:
+        return self.turn % CYCLE_LENGTH >= PARAMETERS['DAY_LENGTH']
+
+    def _next_tile(self, e: int) -> int:
+        """Next number of citytile order in episode
+        """
+        self.tile_count[e] += 1
+        return int(self.tile_count[e])
+
+    def _grow(self, arr: np.ndarray, need: int) -> np.ndarray:
+        """Double slots of padded array if needed
+        """
+        if need < arr.shape[1]:
+            return arr
+        pad = np.zeros([arr.shape[0], arr.shape[1], arr.shape[2]], arr.dtype)
+        return np.concatenate([arr, pad], axis=1)
+
+    def _spawn_unit(self, e: int, team: int, u_type: int, x: int, y: int) -> int:
+        """Create new unit in episode
+
+        Returns:
+            int: unit slot
+        """
+        slot = int(self.unit_count[e])
+        self.units = self._grow(self.units, slot)
+        self.units[e, slot] = 0
+        self.units[e, slot, [self.ufmap['alive'], self.ufmap['team'], self.ufmap['type'],
+                             self.ufmap['x'], self.ufmap['y']]] = [1, team, u_type, x, y]
+        self.unit_count[e] += 1
+        return slot
+
+    def _build_citytile(self, e: int, team: int, x: int, y: int) -> None:
+        """Create new citytile and join it with adjacent cities of team
+        """
+        cells = self.cells[e]
+        adjacent = []
+        for dx, dy in MOVES.values():
+            ax, ay = x + dx, y + dy
+            if 0 <= ax < self.size and 0 <= ay < self.size:
+                city_id = int(cells[ax, ay, self.fmap['city_id']])
+                if city_id and cells[ax, ay, self.fmap['city_team']] == team + 1 \
+                        and city_id not in adjacent:
+                    adjacent.append(city_id)
+        if adjacent:
+            city_id = adjacent[0]
+            for merged in adjacent[1:]:
+                self.cities[e, city_id - 1, self.cfmap['fuel']] += \
+                    self.cities[e, merged - 1, self.cfmap['fuel']]
+                self.cities[e, merged - 1, self.cfmap['alive']] = 0
+                mx, my = np.nonzero(cells[:, :, self.fmap['city_id']] == merged)
+                for i in np.argsort(cells[mx, my, self.fmap['city_order']]):
+                    cells[mx[i], my[i], self.fmap['city_id']] = city_id
+                    cells[mx[i], my[i], self.fmap['city_order']] = self._next_tile(e)
+        else:
+            slot = int(self.city_count[e])
+            self.cities = self._grow(self.cities, slot)
+            self.cities[e, slot] = [1, team, 0]
+            self.city_count[e] += 1
+            city_id = slot + 1
+        cells[x, y, self.fmap['city_id']] = city_id
+        cells[x, y, self.fmap['city_team']] = team + 1
+        cells[x, y, self.fmap['city_cooldown']] = 0
+        cells[x, y, self.fmap['road']] = PARAMETERS['MAX_ROAD']
+        cells[x, y, self.fmap['city_order']] = self._next_tile(e)
+        self._upkeep = None
+
+    def _tile_upkeep(self) -> np.ndarray:
+        """Light upkeep of each citytile
+
+        Returns:
+            np.ndarray: array (episode, x, y), zero for cells without city
+        """
+        city_team = self.cells[..., self.fmap['city_team']]
+        friends = np.zeros_like(city_team)
+        for team in (1, 2):
+            mask = city_team == team
+            friends += _adjacent_sum(mask, center=False) * mask
+        return np.where(
+            city_team > 0,
+            PARAMETERS['LIGHT_UPKEEP']['CITY'] - PARAMETERS['CITY_ADJACENCY_BONUS'] * friends,
+            0
+            )
+
+    def _city_upkeep(self) -> np.ndarray:
+        """Light upkeep of each city
+
+        NOTE: upkeep depends only on layout of citytiles, so it is cached
+        until citytile is built or city is removed
+
+        Returns:
+            np.ndarray: array (episode, city slot)
+        """
+        if self._upkeep is None:
+            tile_upkeep = self._tile_upkeep()
+            city_id = self.cells[..., self.fmap['city_id']].astype(np.int64)
+            e, x, y = np.nonzero(city_id)
+            self._upkeep = np.zeros(self.cities.shape[:2], np.float64)
+            np.add.at(self._upkeep, (e, city_id[e, x, y] - 1), tile_upkeep[e, x, y])
+        return self._upkeep
+
+    def get_updates(self, e: int) -> List[str]:
+        """Serialize episode state to update strings of kaggle environment
+
+        NOTE: updates of all not finished episodes are built at once on the
+        first call after step, finished episodes are built on demand
+
+        Args:
+            e (int): episode index
+
+        Returns:
+            List[str]: update strings, ended by D_DONE
+        """
+        if self._updates is None:
+            self._updates = self._serialize(~self.done)
+        if e not in self._updates:
+            self._updates.update(self._serialize(np.arange(self.n) == e))
+        return self._updates[e]
+
+    def _serialize(self, running: np.ndarray) -> Dict[int, List[str]]:
+        """Update strings of selected episodes
+
+        NOTE: cells are listed by rows, units and cities by team and slot,
+        citytiles by city order, as in LuxEngine
+
+        Args:
+            running (np.ndarray): bool mask of episodes
+
+        Returns:
+            Dict[int, List[str]]: update strings of each selected episode
+        """
+        fm, uf, cf = self.fmap, self.ufmap, self.cfmap
+        updates = {
+            e: [f'rp {team} {points}' for team, points in enumerate(research)]
+            for e, research in enumerate(self.research.tolist()) if running[e]
+            }
+        cells = self.cells.transpose(0, 2, 1, 3)
+        ee, ys, xs = np.nonzero((cells[..., fm['resource_type']] > 0) & running[:, None, None])
+        for e, x, y, r_type, amount in zip(ee.tolist(), xs.tolist(), ys.tolist(),
+                                           cells[ee, ys, xs, fm['resource_type']].tolist(),
+                                           cells[ee, ys, xs, fm['resource_amount']].tolist()):
+            updates[e].append(f'r {RESOURCE_NAMES[int(r_type)]} {x} {y} {number(amount)}')
+
+        ue, us = np.nonzero((self.units[..., uf['alive']] == 1) & running[:, None])
+        units = np.lexsort((us, self.units[ue, us, uf['team']], ue))
+        for e, slot, u in zip(ue[units].tolist(), us[units].tolist(), self.units[ue[units], us[units]].tolist()):
+            updates[e].append(
+                f'u {int(u[uf["type"]])} {int(u[uf["team"]])} u_{slot + 1} {int(u[uf["x"]])} {int(u[uf["y"]])} '
+                f'{number(u[uf["cooldown"]])} {int(u[uf["wood"]])} {int(u[uf["coal"]])} '
+                f'{int(u[uf["uranium"]])}'
+                )
+
+        te, tx, ty = np.nonzero((self.cells[..., fm['city_id']] > 0) & running[:, None, None])
+        tiles = np.lexsort((self.cells[te, tx, ty, fm['city_order']], self.cells[te, tx, ty, fm['city_id']], te))
+        citytiles: Dict[Tuple[int, int], List[str]] = {}
+        for e, x, y, city_id, cooldown in zip(te[tiles].tolist(), tx[tiles].tolist(), ty[tiles].tolist(),
+                                              self.cells[te[tiles], tx[tiles], ty[tiles], fm['city_id']].tolist(),
+                                              self.cells[te[tiles], tx[tiles], ty[tiles], fm['city_cooldown']].tolist()):
+            citytiles.setdefault((e, int(city_id)), []).append(f'{x} {y} {number(cooldown)}')
+        upkeep = self._city_upkeep()
+        ce, cs = np.nonzero((self.cities[..., cf['alive']] == 1) & running[:, None])
+        cities = np.lexsort((cs, self.cities[ce, cs, cf['team']], ce))
+        for e, slot, team, fuel, city_upkeep in zip(ce[cities].tolist(), cs[cities].tolist(),
+                                                    self.cities[ce[cities], cs[cities], cf['team']].tolist(),
+                                                    self.cities[ce[cities], cs[cities], cf['fuel']].tolist(),
+                                                    upkeep[ce[cities], cs[cities]].tolist()):
+            prefix = f'{int(team)} c_{slot + 1}'
+            updates[e].append(f'c {prefix} {number(fuel)} {number(city_upkeep)}')
+            updates[e].extend(f'ct {prefix} {tile}' for tile in citytiles[(e, slot + 1)])
+
+        ee, ys, xs = np.nonzero((cells[..., fm['road']] > 0) & running[:, None, None])
+        for e, x, y, road in zip(ee.tolist(), xs.tolist(), ys.tolist(), cells[ee, ys, xs, fm['road']].tolist()):
+            updates[e].append(f'ccd {x} {y} {number(road)}')
+        for lines in updates.values():
+            lines.append('D_DONE')
+        return updates
+
+    def _validate(
+        self,
+        e: int,
+        team: int,
+        actions: List[str],
+        units: Dict[str, int],
+        city_team: np.ndarray,
+        can_build: int
+        ) -> List[Tuple[str, Union[int, Tuple[int, int]], List[str]]]:
+        """Validate actions of team against start-of-turn state of episode
+
+        NOTE: invalid actions and repeated actions of the same object are dropped,
+        can_build is number of citytiles of team without unit
+
+        Returns:
+            List[Tuple[str, Union[int, Tuple[int, int]], List[str]]]: validated
+            actions with unit slot or citytile coordinate
+        """
+        cells = self.cells[e]
+        uf = self.ufmap
+        valid = []
+        acted = set()
+        for action in actions:
+            strs = action.split(' ')
+            cmd = strs[0]
+            try:
+                if cmd in ('r', 'bw', 'bc'):
+                    x, y = int(strs[1]), int(strs[2])
+                    if not (0 <= x < self.size and 0 <= y < self.size) or (x, y) in acted:
+                        continue
+                    if city_team[x, y] != team + 1 or cells[x, y, self.fmap['city_cooldown']] >= 1:
+                        continue
+                    if cmd != 'r':
+                        if can_build <= 0:
+                            continue
+                        can_build -= 1
+                    acted.add((x, y))
+                    valid.append((cmd, (x, y), strs))
+                elif cmd in ('m', 't', 'bcity', 'p'):
+                    slot = units.get(strs[1])
+                    if slot is None or slot in acted:
+                        continue
+                    u = self.units[e, slot]
+                    if u[uf['team']] != team or u[uf['cooldown']] >= 1:
+                        continue
+                    x, y = int(u[uf['x']]), int(u[uf['y']])
+                    is_worker = u[uf['type']] == 0
+                    if cmd == 'm':
+                        if strs[2] not in MOVES:
+                            continue
+                        dx, dy = MOVES[strs[2]]
+                        tx, ty = x + dx, y + dy
+                        if not (0 <= tx < self.size and 0 <= ty < self.size):
+                            continue
+                        if city_team[tx, ty] and city_team[tx, ty] != team + 1:
+                            continue
+                    elif cmd == 't':
+                        dest = units.get(strs[2])
+                        if dest is None or dest == slot or strs[3] not in RESOURCE_IDS or int(strs[4]) <= 0:
+                            continue
+                        d = self.units[e, dest]
+                        if d[uf['team']] != team or abs(d[uf['x']] - x) + abs(d[uf['y']] - y) != 1:
+                            continue
+                    elif cmd == 'bcity':
+                        cargo = u[uf['wood']] + u[uf['coal']] + u[uf['uranium']]
+                        if not is_worker or cells[x, y, self.fmap['resource_type']] or city_team[x, y]:
+                            continue
+                        if cargo < PARAMETERS['CITY_BUILD_COST']:
+                            continue
+                    elif cmd == 'p':
+                        if not is_worker or city_team[x, y]:
+                            continue
+                    acted.add(slot)
+                    valid.append((cmd, slot, strs))
+            except (IndexError, ValueError):
+                continue
+        return valid
+
+    def _apply_actions(self, e: int, actions: List[List[str]]) -> None:
+        """Validate and apply city and unit actions of both teams of episode
+        """
+        cells = self.cells[e]
+        uf = self.ufmap
+        slots = np.nonzero(self.units[e, :self.unit_count[e], uf['alive']] == 1)[0]
+        units = {f'u_{slot + 1}': slot for slot in slots.tolist()}
+        unit_teams = np.bincount(self.units[e, slots, uf['team']].astype(np.int64), minlength=2)
+        city_team = cells[:, :, self.fmap['city_team']].copy()
+        citytiles = np.bincount(city_team.astype(np.int64).reshape(-1), minlength=3)
+        valid = []
+        for team in range(2):
+            can_build = int(citytiles[team + 1] - unit_teams[team])
+            valid.extend(self._validate(e, team, actions[team], units, city_team, can_build))
+
+        # 1. CityTile actions along with increased cooldown
+        for cmd, obj, strs in valid:
+            if cmd not in ('r', 'bw', 'bc'):
+                continue
+            x, y = obj
+            team = int(city_team[x, y]) - 1
+            if cmd == 'r':
+                self.research[e, team] += 1
+            else:
+                self._spawn_unit(e, team, 0 if cmd == 'bw' else 1, x, y)
+            cells[x, y, self.fmap['city_cooldown']] += PARAMETERS['CITY_ACTION_COOLDOWN']
+
+        # 2. Unit actions along with increased cooldown
+        night = 2 if self.is_night else 1
+        moves: Dict[int, Tuple[int, int]] = {}
+        for cmd, slot, strs in valid:
+            if cmd in ('r', 'bw', 'bc'):
+                continue
+            u = self.units[e, slot]
+            x, y = int(u[uf['x']]), int(u[uf['y']])
+            if cmd == 't':
+                d = self.units[e, units[strs[2]]]
+                r_type = strs[3]
+                space = CAPACITY[int(d[uf['type']])] - d[uf['wood']] - d[uf['coal']] - d[uf['uranium']]
+                amount = min(int(strs[4]), u[uf[r_type]], space)
+                u[uf[r_type]] -= amount
+                d[uf[r_type]] += amount
+            elif cmd == 'bcity':
+                self._build_citytile(e, int(u[uf['team']]), x, y)
+                u[[uf['wood'], uf['coal'], uf['uranium']]] = 0
+            elif cmd == 'p':
+                cells[x, y, self.fmap['road']] = max(
+                    cells[x, y, self.fmap['road']] - PARAMETERS['PILLAGE_RATE'],
+                    PARAMETERS['MIN_ROAD']
+                    )
+            elif cmd == 'm':
+                dx, dy = MOVES[strs[2]]
+                moves[slot] = (x + dx, y + dy)
+            u[uf['cooldown']] += UNIT_COOLDOWN[int(u[uf['type']])] * night
+        self._resolve_moves(e, units=list(units.values()), moves=moves, city_team=city_team)
+
+    def _resolve_moves(
+        self,
+        e: int,
+        units: List[int],
+        moves: Dict[int, Tuple[int, int]],
+        city_team: np.ndarray
+        ) -> None:
+        """Cancel colliding moves and move units of episode
+
+        NOTE: units can stack only on citytiles, cancelled moves are repeated
+        until stable, units can swap places
+        """
+        uf = self.ufmap
+        while True:
+            occupied: Dict[Tuple[int, int], List[int]] = {}
+            for slot in units:
+                coord = moves.get(slot, (int(self.units[e, slot, uf['x']]), int(self.units[e, slot, uf['y']])))
+                occupied.setdefault(coord, []).append(slot)
+            cancelled = [
+                slot
+                for coord, slots in occupied.items()
+                if len(slots) > 1 and not city_team[coord]
+                for slot in slots
+                if slot in moves
+                ]
+            if not cancelled:
+                break
+            for slot in cancelled:
+                moves.pop(slot)
+        for slot, (x, y) in moves.items():
+            self.units[e, slot, uf['x']] = x
+            self.units[e, slot, uf['y']] = y
+
+    def _unit_index(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Episode index, coordinates and alive mask of all unit slots
+
+        NOTE: units of finished episodes are masked out of alive
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: arrays (episode, slot)
+        """
+        e = np.broadcast_to(np.arange(self.n)[:, None], self.units.shape[:2])
+        x = self.units[..., self.ufmap['x']].astype(np.int64)
+        y = self.units[..., self.ufmap['y']].astype(np.int64)
+        alive = (self.units[..., self.ufmap['alive']] == 1) & ~self.done[:, None]
+        return e, x, y, alive
+
+    def _build_roads(self) -> None:
+        """Carts develop roads on tiles where they end the turn
+        """
+        e, x, y, alive = self._unit_index()
+        carts = alive & (self.units[..., self.ufmap['type']] == 1)
+        carts &= self.cells[e, x, y, self.fmap['city_id']] == 0
+        road = self.cells[..., self.fmap['road']]
+        np.add.at(road, (e[carts], x[carts], y[carts]), PARAMETERS['CART_ROAD_DEVELOPMENT_RATE'])
+        np.minimum(road, PARAMETERS['MAX_ROAD'], out=road)
+
+    def _collect_resources(self) -> None:
+        """Workers and citytiles with workers collect adjacent resources
+
+        NOTE: collectors are listed with their adjacent tiles, requests are
+        summed on each resource tile. Tiles with enough resource fulfill all
+        requests at once, only tiles where requests exceed amount are split
+        between collectors one by one in order of LuxEngine: by request, then
+        by team and unit slot, citytile goes with its first worker.
+        """
+        uf, fm = self.ufmap, self.fmap
+        e, x, y, alive = self._unit_index()
+        ue, us = np.nonzero(alive & (self.units[..., uf['type']] == 0))
+        if not len(ue):
+            return
+        ux, uy = x[ue, us], y[ue, us]
+        u_team = self.units[ue, us, uf['team']].astype(np.int64)
+        rank = u_team * self.units.shape[1] + us
+        on_city = self.cells[ue, ux, uy, fm['city_id']] > 0
+        # citytiles with workers, the first worker defines order
+        first = np.lexsort((rank[on_city], ue[on_city], ux[on_city], uy[on_city]))
+        ct = np.stack([ue[on_city], ux[on_city], uy[on_city]])[:, first]
+        ct_first = np.ones(ct.shape[1], bool)
+        ct_first[1:] = (ct[:, 1:] != ct[:, :-1]).any(axis=0)
+        is_unit = np.concatenate([np.ones(np.sum(~on_city), bool), np.zeros(np.sum(ct_first), bool)])
+        ce = np.concatenate([ue[~on_city], ct[0, ct_first]])
+        cx = np.concatenate([ux[~on_city], ct[1, ct_first]])
+        cy = np.concatenate([uy[~on_city], ct[2, ct_first]])
+        c_team = np.concatenate([u_team[~on_city], u_team[on_city][first][ct_first]])
+        c_rank = np.concatenate([rank[~on_city], rank[on_city][first][ct_first]])
+        c_slot = us[~on_city]
+
+        # adjacent tiles of collectors (collector, offset)
+        offsets = np.array([(0, 0)] + list(MOVES.values()))
+        ax = cx[:, None] + offsets[:, 0]
+        ay = cy[:, None] + offsets[:, 1]
+        inside = (ax >= 0) & (ax < self.size) & (ay >= 0) & (ay < self.size)
+        tile = np.where(inside, (ce[:, None] * self.size + ax) * self.size + ay, 0)
+        amount = self.cells[..., fm['resource_amount']].reshape(-1)
+        r_type = self.cells[..., fm['resource_type']].reshape(-1)
+        fuel = self.cities[..., self.cfmap['fuel']]
+        c_city = self.cells[ce[~is_unit], cx[~is_unit], cy[~is_unit], fm['city_id']].astype(np.int64) - 1
+
+        for r_name in COLLECTION_ORDER:
+            rate = COLLECTION_RATE[r_name]
+            adjacent = inside & (r_type[tile] == RESOURCE_IDS[r_name]) & (amount[tile] > 0)
+            n_tiles = adjacent.sum(axis=1)
+            active = (self.research[ce, c_team] >= RESEARCH[r_name]) & (n_tiles > 0)
+            cargo = self.units[ue[~on_city], c_slot][:, [uf['wood'], uf['coal'], uf['uranium']]].sum(axis=1)
+            space = CAPACITY[0] - cargo
+            request = np.full(len(ce), float(rate))
+            request[is_unit] = np.minimum(rate, np.ceil(space / np.maximum(n_tiles[is_unit], 1)))
+            active[is_unit] &= space > 0
+            pairs = adjacent & active[:, None]
+            if not pairs.any():
+                continue
+
+            collector = np.nonzero(pairs)[0]
+            tiles, inverse = np.unique(tile[pairs], return_inverse=True)
+            demand = np.bincount(inverse, weights=request[collector])
+            contested = demand > amount[tiles]
+            fulfilled = ~contested[inverse]
+            gain = np.bincount(collector[fulfilled], weights=request[collector[fulfilled]], minlength=len(ce))
+            amount[tiles[~contested]] -= demand[~contested]
+
+            for t in np.nonzero(contested)[0]:
+                reqs = sorted(
+                    (request[c], c_rank[c], c) for c in collector[inverse == t]
+                    )
+                remaining = amount[tiles[t]]
+                left = len(reqs)
+                given = 0
+                for req, _, c in reqs:
+                    share = remaining // left
+                    got = min(req, share)
+                    remaining -= got
+                    given += got
+                    left -= 1
+                    gain[c] += got
+                amount[tiles[t]] -= given
+
+            self.units[ue[~on_city], c_slot, uf[r_name]] += np.minimum(gain[is_unit], space)
+            np.add.at(fuel, (ce[~is_unit], c_city), gain[~is_unit] * FUEL_RATE[r_name])
+
+    def _drop_resources(self) -> None:
+        """Units on friendly citytiles convert cargo to fuel
+        """
+        uf = self.ufmap
+        e, x, y, alive = self._unit_index()
+        city_id = self.cells[..., self.fmap['city_id']].astype(np.int64)
+        city_team = self.cells[..., self.fmap['city_team']]
+        drop = alive & (city_team[e, x, y] == self.units[..., uf['team']] + 1)
+        fuel = sum(self.units[..., uf[r_name]] * FUEL_RATE[r_name] for r_name in COLLECTION_ORDER)
+        np.add.at(
+            self.cities[..., self.cfmap['fuel']],
+            (e[drop], city_id[e[drop], x[drop], y[drop]] - 1),
+            fuel[drop]
+            )
+        for r_name in COLLECTION_ORDER:
+            self.units[..., uf[r_name]][drop] = 0
+
+    def _consume_light(self) -> None:
+        """Night upkeep of units outside of cities and of cities
+        """
+        uf = self.ufmap
+        e, x, y, alive = self._unit_index()
+        off_city = alive & (self.cells[e, x, y, self.fmap['city_id']] == 0)
+        need = np.where(off_city, UNIT_UPKEEP[self.units[..., uf['type']].astype(np.int64)], 0)
+        for r_name in reversed(COLLECTION_ORDER):
+            rate = FUEL_RATE[r_name]
+            used = np.minimum(self.units[..., uf[r_name]], np.ceil(np.maximum(need, 0) / rate))
+            self.units[..., uf[r_name]] -= used
+            need = need - used * rate
+        self.units[..., uf['alive']][off_city & (need > 0)] = 0
+
+        upkeep = self._city_upkeep()
+        fuel = self.cities[..., self.cfmap['fuel']]
+        city_alive = (self.cities[..., self.cfmap['alive']] == 1) & ~self.done[:, None]
+        dark = city_alive & (fuel < upkeep)
+        fuel -= np.where(city_alive & ~dark, upkeep, 0)
+        self.cities[..., self.cfmap['alive']][dark] = 0
+        city_id = self.cells[..., self.fmap['city_id']].astype(np.int64)
+        ce = np.broadcast_to(np.arange(self.n)[:, None, None], city_id.shape)
+        removed = (city_id > 0) & dark[ce, np.maximum(city_id - 1, 0)]
+        for feature in ('city_id', 'city_team', 'city_cooldown', 'city_order', 'road'):
+            self.cells[..., self.fmap[feature]][removed] = 0
+        if dark.any():
+            self._upkeep = None
+
+    def _regrow_wood(self) -> None:
+        """Regrow not depleted wood tiles
+        """
+        max_wood = PARAMETERS['MAX_WOOD_AMOUNT']
+        amount = self.cells[..., self.fmap['resource_amount']]
+        wood = (self.cells[..., self.fmap['resource_type']] == RESOURCE_IDS['wood']) \
+            & (amount > 0) & (amount < max_wood) & ~self.done[:, None, None]
+        grown = np.minimum(amount + np.ceil(amount * (PARAMETERS['WOOD_GROWTH_RATE'] - 1)), max_wood)
+        amount[wood] = grown[wood]
+
+    def _handle_cooldowns(self) -> None:
+        """Decrease cooldowns of units (with roads) and citytiles
+        """
+        e, x, y, alive = self._unit_index()
+        cooldown = self.units[..., self.ufmap['cooldown']]
+        road = self.cells[e, x, y, self.fmap['road']]
+        cooldown[alive] = np.maximum(cooldown[alive] - 1 - road[alive], 0)
+        city_cooldown = self.cells[..., self.fmap['city_cooldown']]
+        city_cooldown[~self.done] = np.maximum(city_cooldown[~self.done] - 1, 0)
+
+    def _remove_depleted(self) -> None:
+        amount = self.cells[..., self.fmap['resource_amount']]
+        depleted = amount <= 0
+        self.cells[..., self.fmap['resource_type']][depleted] = 0
+        amount[depleted] = 0
+
+    def rewards(self) -> np.ndarray:
+        """Rewards of teams as in kaggle environment
+
+        Returns:
+            np.ndarray: array (episode, team) of citytiles * 10000 + units
+        """
+        uf = self.ufmap
+        city_team = self.cells[..., self.fmap['city_team']].reshape(self.n, -1)
+        alive = self.units[..., uf['alive']] == 1
+        rewards = np.zeros([self.n, 2], np.int64)
+        for team in range(2):
+            citytiles = np.sum(city_team == team + 1, axis=1)
+            units = np.sum(alive & (self.units[..., uf['team']] == team), axis=1)
+            rewards[:, team] = citytiles * 10000 + units
+        return rewards
+
+    def step(self, actions: List[Optional[List[List[str]]]]) -> None:
+        """Advance all not finished episodes by one turn
+
+        Args:
+            actions (List[Optional[List[List[str]]]]): actions of each team
+            for each episode, None for finished episodes
+        """
+        for e in range(self.n):
+            if not self.done[e]:
+                self._apply_actions(e, actions[e])
+        self._build_roads()
+        self._collect_resources()
+        self._drop_resources()
+        if self.is_night:
+            self._consume_light()
+        self._regrow_wood()
+        self._handle_cooldowns()
+        self._remove_depleted()
+        self.turn += 1
+        self._updates = None
+
+        rewards = self.rewards()
+        ended = (rewards // 10000 + rewards % 10000 == 0).any(axis=1)
+        if self.turn >= PARAMETERS['MAX_DAYS']:
+            ended[:] = True
+        for e in np.nonzero(ended & ~self.done)[0]:
+            self.final_rewards[e] = rewards[e].tolist()
+        self.done |= ended
+
+
+def run_batch(
+    agents: List[Union[str, List[Agent]]],
+    size: int,
+    seeds: List[int],
+    configuration: dict = None,
+    steps: int = None,
+    debug: bool = False
+    ) -> List[List[Optional[int]]]:
+    """Play games of the same map size in lockstep
+
+    Args:
+        agents (List[Union[str, List[Agent]]]): for each player - builtin
+        agent name or list with separate agent callable for each game
+        size (int): map size
+        seeds (List[int]): map seed of each game
+        configuration (dict, optional): game config passed to agents. Defaults to None
+        steps (int, optional): max number of turns. Defaults to None
+        debug (bool, optional): log agents errors. Defaults to False
+
+    Returns:
+        List[List[Optional[int]]]: rewards of players for each game
+    """
+    n = len(seeds)
+    players = []
+    for agent in agents:
+        if isinstance(agent, str):
+            if agent not in BUILTIN_AGENTS:
+                raise ValueError(f'Unknown agent: {agent}')
+            players.append([BUILTIN_AGENTS[agent]() for _ in range(n)])
+        else:
+            if len(agent) != n:
+                raise ValueError('Need separate agent for each game')
+            players.append(agent)
+    max_turns = min(steps or PARAMETERS['MAX_DAYS'], PARAMETERS['MAX_DAYS'])
+
+    engine = BatchLuxEngine(size=size, seeds=seeds)
+    failed = [[False, False] for _ in range(n)]
+    decided = [[None, None] for _ in range(n)]
+    while engine.turn < max_turns and not engine.done.all():
+        actions = [None] * n
+        for e in range(n):
+            if engine.done[e]:
+                continue
+            updates = engine.get_updates(e)
+            actions[e] = [[], []]
+            for team in range(2):
+                obs_updates = updates
+                if engine.turn == 0:
+                    obs_updates = [str(team), f'{size} {size}'] + updates
+                observation = Observation(
+                    player=team,
+                    step=engine.turn,
+                    updates=obs_updates,
+                    remainingOverageTime=60,
+                    reward=0
+                    )
+                try:
+                    actions[e][team] = players[team][e](observation, configuration) or []
+                except GameDecided as ex:
+                    decided[e][team] = ex.reward
+                except Exception as ex:
+                    if debug:
+                        logger.exception(f'Agent {team} failed in game {e} on turn {engine.turn}: {ex}')
+                    failed[e][team] = True
+            if any(failed[e]) or any(reward is not None for reward in decided[e]):
+                engine.done[e] = True
+                engine.final_rewards[e] = [
+                    reward if decided[e][team] is None else decided[e][team]
+                    for team, reward in enumerate(engine.rewards()[e].tolist())
+                    ]
+                actions[e] = None
+        engine.step(actions)
+
+    rewards = engine.rewards()
+    result = []
+    for e in range(n):
+        final = engine.final_rewards[e] or rewards[e].tolist()
+        result.append([None if failed[e][team] else final[team] for team in range(2)])
+    return result
+
+
+def evaluate_batch(
+    environment: str,
+    agents: List[Union[str, List[Agent]]],
+    configuration: dict = None,
+    steps: int = None,
+    num_episodes: int = 1,
+    debug: bool = False,
+    configurations: List[dict] = None
+    ) -> List[List[Optional[int]]]:
+    """Batched analog of engine.simulator.evaluate
+
+    NOTE: games are grouped by map size and each group is played in lockstep.
+    Each player must have separate agent callable for each episode, because
+    agents keep statements of their game.
+
+    Args:
+        environment (str): environment name, only lux_ai_2021 is supported
+        agents (List[Union[str, List[Agent]]]): for each player - builtin
+        agent name or list of num_episodes agent callables
+        configuration (dict, optional): game config. Defaults to None
+        steps (int, optional): max number of turns. Defaults to None
+        num_episodes (int, optional): number of games. Defaults to 1
+        debug (bool, optional): log agents errors. Defaults to False
+        configurations (List[dict], optional): config of each game, for example
+        with own seed and size, replaces num_episodes. Defaults to None
+
+    Returns:
+        List[List[Optional[int]]]: rewards of players for each game
+    """
+    if environment != 'lux_ai_2021':
+        raise ValueError(f'Unsupported environment: {environment}')
+    configuration = dict(configuration or {})
+    if configurations is None:
+        configurations = [configuration] * num_episodes
+    num_episodes = len(configurations)
+    seeds = []
+    sizes = []
+    for episode in configurations:
+        seed = episode.get('seed')
+        if seed is None:
+            seed = random.randint(0, 2 ** 31)
+        size = episode.get('rows') or episode.get('columns')
+        if size not in MAP_SIZES:
+            size = random.Random(seed).choice(MAP_SIZES)
+        seeds.append(seed)
+        sizes.append(size)
+
+    rewards: List[List[Optional[int]]] = [None] * num_episodes
+    for size in sorted(set(sizes)):
+        group = [i for i, s in enumerate(sizes) if s == size]
+        group_agents = [
+            agent if isinstance(agent, str) else [agent[i] for i in group]
+            for agent in agents
+            ]
+        group_rewards = run_batch(
+            agents=group_agents,
+            size=size,
+            seeds=[seeds[i] for i in group],
+            configuration=configuration,
+            steps=steps,
+            debug=debug
+            )
+        for i, reward in zip(group, group_rewards):
+            rewards[i] = reward
+    return rewards
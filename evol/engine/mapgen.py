@@ -0,0 +1,150 @@
+from lux.game_map import GameMap
+from lux.game_constants import GAME_CONSTANTS
+from typing import List, Tuple
+import random
+
+
+RESOURCE_TYPES = GAME_CONSTANTS['RESOURCE_TYPES']
+MAP_SIZES = [12, 16, 24, 32]
+
+# resource amount ranges of generated tiles
+WOOD_AMOUNT = (300, GAME_CONSTANTS['PARAMETERS']['MAX_WOOD_AMOUNT'])
+COAL_AMOUNT = (300, 400)
+URANIUM_AMOUNT = (300, 350)
+
+
+class MapGenerator:
+    """Symmetric map generator for the headless engine
+
+    NOTE: map is mirrored by vertical or horizontal axis, as in the original
+    game, so both teams have the same resources. Cluster sizes and amounts
+    are close to official maps, but maps are not identical to maps of the
+    kaggle engine with the same seed.
+    """
+
+    def __init__(self, size: int, rng: random.Random) -> None:
+        self.size = size
+        self.rng = rng
+        self.game_map = GameMap(size, size)
+        self.vertical = rng.random() < 0.5
+
+    def _mirror(self, x: int, y: int) -> Tuple[int, int]:
+        """Get mirrored coordinate
+
+        Args:
+            x (int): x coordinate
+            y (int): y coordinate
+
+        Returns:
+            Tuple[int, int]: mirrored coordinate
+        """
+        if self.vertical:
+            return self.size - 1 - x, y
+        return x, self.size - 1 - y
+
+    def _half(self) -> List[Tuple[int, int]]:
+        """Get coordinates of the first half of the map
+
+        Returns:
+            List[Tuple[int, int]]: coordinates
+        """
+        half = self.size // 2
+        if self.vertical:
+            return [(x, y) for x in range(half) for y in range(self.size)]
+        return [(x, y) for x in range(self.size) for y in range(half)]
+
+    def _is_free(self, x: int, y: int) -> bool:
+        """Is cell inside the first half of map and has not resource
+        """
+        half = self.size // 2
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return False
+        if (self.vertical and x >= half) or (not self.vertical and y >= half):
+            return False
+        return self.game_map.get_cell(x, y).resource is None
+
+    def _set_pair(self, r_type: str, x: int, y: int, amount: int) -> None:
+        """Set resource to cell and his mirror
+        """
+        self.game_map._setResource(r_type, x, y, amount)
+        mx, my = self._mirror(x, y)
+        self.game_map._setResource(r_type, mx, my, amount)
+
+    def _cluster(self, r_type: str, amount: Tuple[int, int], tiles: int) -> None:
+        """Grow a random cluster of resource tiles in the first half
+
+        Args:
+            r_type (str): resource type
+            amount (Tuple[int, int]): range of amount of each tile
+            tiles (int): number of tiles in cluster
+        """
+        free = [coord for coord in self._half() if self._is_free(*coord)]
+        if not free:
+            return
+        x, y = self.rng.choice(free)
+        for _ in range(tiles):
+            if self._is_free(x, y):
+                self._set_pair(r_type, x, y, self.rng.randint(*amount))
+            dx, dy = self.rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+            if self._is_free(x + dx, y + dy) or self.rng.random() < 0.5:
+                x = min(max(x + dx, 0), self.size - 1)
+                y = min(max(y + dy, 0), self.size - 1)
+
+    def _spawn(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """Choose spawn coordinates close to wood for both teams
+
+        Returns:
+            Tuple[Tuple[int, int], Tuple[int, int]]: spawns of team 0 and team 1
+        """
+        half = self.size // 2
+        free = []
+        for x, y in self._half():
+            # do not spawn at the edge of the half, so spawns cant be adjacent
+            if (self.vertical and x >= half - 1) or (not self.vertical and y >= half - 1):
+                continue
+            if self.game_map.get_cell(x, y).resource is None:
+                free.append((x, y))
+        near_wood = [
+            (x, y) for x, y in free
+            if any(
+                0 <= x + dx < self.size and 0 <= y + dy < self.size
+                and self.game_map.get_cell(x + dx, y + dy).resource is not None
+                and self.game_map.get_cell(x + dx, y + dy).resource.type == RESOURCE_TYPES['WOOD']
+                for dx, dy in [(2, 0), (-2, 0), (0, 2), (0, -2), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+                )
+            ]
+        coord = self.rng.choice(near_wood or free)
+        if self.rng.random() < 0.5:
+            return coord, self._mirror(*coord)
+        return self._mirror(*coord), coord
+
+    def generate(self) -> Tuple[GameMap, Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """Generate resources and spawn positions
+
+        Returns:
+            Tuple[GameMap, Tuple[Tuple[int, int], Tuple[int, int]]]: map and spawns
+        """
+        scale = self.size // 4
+        for _ in range(scale):
+            self._cluster(RESOURCE_TYPES['WOOD'], WOOD_AMOUNT, self.rng.randint(3, 8))
+        for _ in range(max(1, scale // 2)):
+            self._cluster(RESOURCE_TYPES['COAL'], COAL_AMOUNT, self.rng.randint(2, 5))
+        for _ in range(max(1, scale // 3)):
+            self._cluster(RESOURCE_TYPES['URANIUM'], URANIUM_AMOUNT, self.rng.randint(1, 3))
+        return self.game_map, self._spawn()
+
+
+def generate_map(
+    size: int,
+    rng: random.Random
+    ) -> Tuple[GameMap, Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """Generate symmetric map with resources and spawn positions
+
+    Args:
+        size (int): map size
+        rng (random.Random): random generator
+
+    Returns:
+        Tuple[GameMap, Tuple[Tuple[int, int], Tuple[int, int]]]: map and spawns
+    """
+    return MapGenerator(size=size, rng=rng).generate()
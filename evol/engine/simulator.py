@@ -0,0 +1,719 @@
+from lux.game import Game
+from lux.game_map import GameMap, Cell, Position
+from lux.game_objects import Player, Unit, City, CityTile
+from lux.game_constants import GAME_CONSTANTS
+from lux.constants import Constants
+from engine.mapgen import generate_map, MAP_SIZES
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from loguru import logger
+import math, random
+
+
+PARAMETERS = GAME_CONSTANTS['PARAMETERS']
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+UNIT_TYPES = Constants.UNIT_TYPES
+DIRECTIONS = Constants.DIRECTIONS
+
+# order of resource collection and fuel rates
+COLLECTION_ORDER = [RESOURCE_TYPES.URANIUM, RESOURCE_TYPES.COAL, RESOURCE_TYPES.WOOD]
+COLLECTION_RATE = {
+    r_type: PARAMETERS['WORKER_COLLECTION_RATE'][r_type.upper()]
+    for r_type in COLLECTION_ORDER
+    }
+FUEL_RATE = {
+    r_type: PARAMETERS['RESOURCE_TO_FUEL_RATE'][r_type.upper()]
+    for r_type in COLLECTION_ORDER
+    }
+CYCLE_LENGTH = PARAMETERS['DAY_LENGTH'] + PARAMETERS['NIGHT_LENGTH']
+MOVES = {
+    DIRECTIONS.NORTH: (0, -1),
+    DIRECTIONS.EAST: (1, 0),
+    DIRECTIONS.SOUTH: (0, 1),
+    DIRECTIONS.WEST: (-1, 0),
+    }
+
+Agent = Callable[[dict, dict], List[str]]
+Rewards = List[List[Optional[int]]]
+
+
+def number(value: float) -> str:
+    """Format number of update string as kaggle environment (javascript) does
+
+    Integral values are printed without fraction: 6.0 -> '6', 0.75 -> '0.75'
+    """
+    return str(int(value)) if value == int(value) else str(float(value))
+
+
+class GameDecided(Exception):
+    """Raised by agent, when the rest of game can't change its result
+
+    Engine stops the game, reward of the agent is taken from exception,
+    reward of opponent is its current reward
+    """
+
+    def __init__(self, reward: int) -> None:
+        super().__init__(f'Game is decided with reward {reward}')
+        self.reward = reward
+
+
+class Observation(dict):
+    """Observation dict with attribute access, like kaggle Struct
+    """
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class LuxEngine:
+    """Headless in-process implementation of Lux AI 2021 rules
+
+    Game state is kept in lux.game model objects (GameMap, Player, Unit,
+    City, CityTile), actions are applied in the order of world-rules.md
+    "Game Resolution order" and observations are serialized to the same
+    update strings as the kaggle environment sends to agents.
+    """
+
+    def __init__(self, size: int, seed: int) -> None:
+        self.size = size
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.turn = 0
+        self.map, spawns = generate_map(size=size, rng=self.rng)
+        self.players = [Player(0), Player(1)]
+        self.unit_id_count = 0
+        self.city_id_count = 0
+        for team, (x, y) in enumerate(spawns):
+            self._build_citytile(team=team, x=x, y=y)
+            self._spawn_unit(team=team, u_type=UNIT_TYPES.WORKER, x=x, y=y)
+
+    @property
+    def is_night(self) -> bool:
+        return self.turn % CYCLE_LENGTH >= PARAMETERS['DAY_LENGTH']
+
+    def _cells(self) -> List[Cell]:
+        return [cell for row in self.map.map for cell in row]
+
+    def _spawn_unit(self, team: int, u_type: int, x: int, y: int) -> Unit:
+        """Create new unit of team
+        """
+        self.unit_id_count += 1
+        unit = Unit(team, u_type, f'u_{self.unit_id_count}', x, y, 0, 0, 0, 0)
+        self.players[team].units.append(unit)
+        return unit
+
+    def _build_citytile(self, team: int, x: int, y: int) -> CityTile:
+        """Create new citytile and join it with adjacent cities of team
+
+        NOTE: if new citytile connects some cities - they are merged to one
+        with summary fuel
+        """
+        player = self.players[team]
+        adjacent = []
+        for dx, dy in MOVES.values():
+            ax, ay = x + dx, y + dy
+            if 0 <= ax < self.size and 0 <= ay < self.size:
+                citytile = self.map.get_cell(ax, ay).citytile
+                if citytile and citytile.team == team and citytile.cityid not in adjacent:
+                    adjacent.append(citytile.cityid)
+        if adjacent:
+            city = player.cities[adjacent[0]]
+            for cityid in adjacent[1:]:
+                merged = player.cities.pop(cityid)
+                city.fuel += merged.fuel
+                for citytile in merged.citytiles:
+                    citytile.cityid = city.cityid
+                    city.citytiles.append(citytile)
+        else:
+            self.city_id_count += 1
+            city = City(team, f'c_{self.city_id_count}', 0, 0)
+            player.cities[city.cityid] = city
+        citytile = city._add_city_tile(x, y, 0)
+        cell = self.map.get_cell(x, y)
+        cell.citytile = citytile
+        cell.road = PARAMETERS['MAX_ROAD']
+        return citytile
+
+    def _light_upkeep(self, city: City) -> int:
+        """Calculate light upkeep of city
+        """
+        upkeep = 0
+        for citytile in city.citytiles:
+            friends = 0
+            for dx, dy in MOVES.values():
+                ax, ay = citytile.pos.x + dx, citytile.pos.y + dy
+                if 0 <= ax < self.size and 0 <= ay < self.size:
+                    other = self.map.get_cell(ax, ay).citytile
+                    if other and other.team == citytile.team:
+                        friends += 1
+            upkeep += PARAMETERS['LIGHT_UPKEEP']['CITY'] - PARAMETERS['CITY_ADJACENCY_BONUS'] * friends
+        return upkeep
+
+    def get_updates(self) -> List[str]:
+        """Serialize game state to update strings of kaggle environment
+
+        Returns:
+            List[str]: update strings, ended by D_DONE
+        """
+        updates = [f'rp {player.team} {player.research_points}' for player in self.players]
+        cells = self._cells()
+        for cell in cells:
+            if cell.has_resource():
+                updates.append(
+                    f'r {cell.resource.type} {cell.pos.x} {cell.pos.y} {number(cell.resource.amount)}'
+                    )
+        for player in self.players:
+            for unit in player.units:
+                updates.append(
+                    f'u {unit.type} {unit.team} {unit.id} {unit.pos.x} {unit.pos.y} '
+                    f'{number(unit.cooldown)} {unit.cargo.wood} {unit.cargo.coal} {unit.cargo.uranium}'
+                    )
+        for player in self.players:
+            for city in player.cities.values():
+                city.light_upkeep = self._light_upkeep(city)
+                updates.append(f'c {city.team} {city.cityid} {number(city.fuel)} {number(city.light_upkeep)}')
+                for citytile in city.citytiles:
+                    updates.append(
+                        f'ct {citytile.team} {citytile.cityid} {citytile.pos.x} '
+                        f'{citytile.pos.y} {number(citytile.cooldown)}'
+                        )
+        for cell in cells:
+            if cell.road:
+                updates.append(f'ccd {cell.pos.x} {cell.pos.y} {number(cell.road)}')
+        updates.append('D_DONE')
+        return updates
+
+    def _validate(
+        self,
+        team: int,
+        actions: List[str],
+        units: Dict[str, Unit],
+        city_cells: Dict[Tuple[int, int], CityTile]
+        ) -> List[Tuple[str, Union[Unit, CityTile], List[str]]]:
+        """Validate actions of team against start-of-turn state
+
+        NOTE: invalid actions and repeated actions of the same object are dropped
+
+        Returns:
+            List[Tuple[str, Union[Unit, CityTile], List[str]]]: validated actions
+        """
+        valid = []
+        acted = set()
+        player = self.players[team]
+        can_build = player.city_tile_count - len(player.units)
+        for action in actions:
+            strs = action.split(' ')
+            cmd = strs[0]
+            try:
+                if cmd in ('r', 'bw', 'bc'):
+                    x, y = int(strs[1]), int(strs[2])
+                    citytile = city_cells.get((x, y))
+                    if not citytile or citytile.team != team or not citytile.can_act():
+                        continue
+                    if (x, y) in acted:
+                        continue
+                    if cmd != 'r':
+                        if can_build <= 0:
+                            continue
+                        can_build -= 1
+                    acted.add((x, y))
+                    valid.append((cmd, citytile, strs))
+                elif cmd in ('m', 't', 'bcity', 'p'):
+                    unit = units.get(strs[1])
+                    if not unit or unit.team != team or not unit.can_act() or unit.id in acted:
+                        continue
+                    if cmd == 'm':
+                        if strs[2] not in MOVES:
+                            continue
+                        dx, dy = MOVES[strs[2]]
+                        x, y = unit.pos.x + dx, unit.pos.y + dy
+                        if not (0 <= x < self.size and 0 <= y < self.size):
+                            continue
+                        citytile = city_cells.get((x, y))
+                        if citytile and citytile.team != team:
+                            continue
+                    elif cmd == 't':
+                        dest = units.get(strs[2])
+                        amount = int(strs[4])
+                        if not dest or dest.team != team or dest is unit or amount <= 0:
+                            continue
+                        if strs[3] not in COLLECTION_RATE or unit.pos - dest.pos != 1:
+                            continue
+                    elif cmd == 'bcity':
+                        cell = self.map.get_cell_by_pos(unit.pos)
+                        cargo = unit.cargo.wood + unit.cargo.coal + unit.cargo.uranium
+                        if not unit.is_worker() or cell.has_resource() or cell.citytile:
+                            continue
+                        if cargo < PARAMETERS['CITY_BUILD_COST']:
+                            continue
+                    elif cmd == 'p':
+                        cell = self.map.get_cell_by_pos(unit.pos)
+                        if not unit.is_worker() or cell.citytile:
+                            continue
+                    acted.add(unit.id)
+                    valid.append((cmd, unit, strs))
+            except (IndexError, ValueError):
+                continue
+        return valid
+
+    def _unit_cooldown(self, unit: Unit) -> float:
+        """Base cooldown of unit action, doubled at night
+        """
+        key = 'WORKER' if unit.is_worker() else 'CART'
+        cooldown = PARAMETERS['UNIT_ACTION_COOLDOWN'][key]
+        return cooldown * 2 if self.is_night else cooldown
+
+    def _apply_actions(self, actions: List[List[str]]) -> None:
+        """Validate and apply city and unit actions of both teams
+        """
+        units = {unit.id: unit for player in self.players for unit in player.units}
+        city_cells = {
+            (cell.pos.x, cell.pos.y): cell.citytile
+            for cell in self._cells()
+            if cell.citytile
+            }
+        valid = []
+        for team in range(2):
+            valid.extend(self._validate(team, actions[team], units, city_cells))
+
+        # 1. CityTile actions along with increased cooldown
+        for cmd, citytile, strs in valid:
+            if cmd == 'r':
+                self.players[citytile.team].research_points += 1
+            elif cmd == 'bw':
+                self._spawn_unit(citytile.team, UNIT_TYPES.WORKER, citytile.pos.x, citytile.pos.y)
+            elif cmd == 'bc':
+                self._spawn_unit(citytile.team, UNIT_TYPES.CART, citytile.pos.x, citytile.pos.y)
+            else:
+                continue
+            citytile.cooldown += PARAMETERS['CITY_ACTION_COOLDOWN']
+
+        # 2. Unit actions along with increased cooldown
+        moves = {}
+        for cmd, unit, strs in valid:
+            if cmd == 't':
+                dest = units[strs[2]]
+                r_type = strs[3]
+                amount = min(int(strs[4]), getattr(unit.cargo, r_type), dest.get_cargo_space_left())
+                setattr(unit.cargo, r_type, getattr(unit.cargo, r_type) - amount)
+                setattr(dest.cargo, r_type, getattr(dest.cargo, r_type) + amount)
+            elif cmd == 'bcity':
+                self._build_citytile(unit.team, unit.pos.x, unit.pos.y)
+                unit.cargo.wood, unit.cargo.coal, unit.cargo.uranium = 0, 0, 0
+            elif cmd == 'p':
+                cell = self.map.get_cell_by_pos(unit.pos)
+                cell.road = max(cell.road - PARAMETERS['PILLAGE_RATE'], PARAMETERS['MIN_ROAD'])
+            elif cmd == 'm':
+                dx, dy = MOVES[strs[2]]
+                moves[unit.id] = (unit.pos.x + dx, unit.pos.y + dy)
+            else:
+                continue
+            unit.cooldown += self._unit_cooldown(unit)
+        self._resolve_moves(units=units, moves=moves, city_cells=city_cells)
+
+    def _resolve_moves(
+        self,
+        units: Dict[str, Unit],
+        moves: Dict[str, Tuple[int, int]],
+        city_cells: Dict[Tuple[int, int], CityTile]
+        ) -> None:
+        """Cancel colliding moves and move units
+
+        NOTE: units can stack only on citytiles. Cancelled move can produce new
+        collision with unit, moved to his cell, so it is repeated until stable.
+        Units can swap places.
+        """
+        while True:
+            occupied: Dict[Tuple[int, int], List[str]] = {}
+            for unit in units.values():
+                coord = moves.get(unit.id, (unit.pos.x, unit.pos.y))
+                occupied.setdefault(coord, []).append(unit.id)
+            cancelled = [
+                unit_id
+                for coord, unit_ids in occupied.items()
+                if len(unit_ids) > 1 and coord not in city_cells
+                for unit_id in unit_ids
+                if unit_id in moves
+                ]
+            if not cancelled:
+                break
+            for unit_id in cancelled:
+                moves.pop(unit_id)
+        for unit_id, (x, y) in moves.items():
+            unit = units[unit_id]
+            unit.pos = Position(x, y)
+
+    def _build_roads(self) -> None:
+        """Carts develop roads on tiles where they end the turn
+        """
+        for player in self.players:
+            for unit in player.units:
+                if unit.is_cart():
+                    cell = self.map.get_cell_by_pos(unit.pos)
+                    if not cell.citytile:
+                        cell.road = min(
+                            cell.road + PARAMETERS['CART_ROAD_DEVELOPMENT_RATE'],
+                            PARAMETERS['MAX_ROAD']
+                            )
+
+    def _collect_resources(self) -> None:
+        """Workers and citytiles with workers collect adjacent resources
+
+        NOTE: each collector requests an even amount from each adjacent tile of
+        current resource type. Tiles fulfill requests or split the rest equally,
+        leftover is wasted.
+        """
+        for r_type in COLLECTION_ORDER:
+            rate = COLLECTION_RATE[r_type]
+            collectors = []
+            worked_citytiles = set()
+            for player in self.players:
+                if r_type == RESOURCE_TYPES.COAL and not player.researched_coal():
+                    continue
+                if r_type == RESOURCE_TYPES.URANIUM and not player.researched_uranium():
+                    continue
+                for unit in player.units:
+                    if not unit.is_worker():
+                        continue
+                    citytile = self.map.get_cell_by_pos(unit.pos).citytile
+                    if citytile:
+                        if citytile not in worked_citytiles:
+                            worked_citytiles.add(citytile)
+                            collectors.append(citytile)
+                    else:
+                        collectors.append(unit)
+
+            requests: Dict[Tuple[int, int], List[Tuple[int, Union[Unit, CityTile]]]] = {}
+            for collector in collectors:
+                tiles = []
+                for dx, dy in [(0, 0)] + list(MOVES.values()):
+                    x, y = collector.pos.x + dx, collector.pos.y + dy
+                    if 0 <= x < self.size and 0 <= y < self.size:
+                        cell = self.map.get_cell(x, y)
+                        if cell.has_resource() and cell.resource.type == r_type:
+                            tiles.append((x, y))
+                if not tiles:
+                    continue
+                if isinstance(collector, Unit):
+                    space = collector.get_cargo_space_left()
+                    if space <= 0:
+                        continue
+                    request = min(rate, math.ceil(space / len(tiles)))
+                else:
+                    request = rate
+                for coord in tiles:
+                    requests.setdefault(coord, []).append((request, collector))
+
+            gained: Dict[int, int] = {}
+            owners = {}
+            for coord, reqs in requests.items():
+                cell = self.map.get_cell(*coord)
+                remaining = cell.resource.amount
+                reqs.sort(key=lambda req: req[0])
+                left = len(reqs)
+                given = 0
+                for request, collector in reqs:
+                    share = remaining // left
+                    amount = min(request, share)
+                    remaining -= amount
+                    given += amount
+                    left -= 1
+                    gained[id(collector)] = gained.get(id(collector), 0) + amount
+                    owners[id(collector)] = collector
+                cell.resource.amount -= given
+
+            for key, amount in gained.items():
+                collector = owners[key]
+                if isinstance(collector, Unit):
+                    amount = min(amount, collector.get_cargo_space_left())
+                    setattr(collector.cargo, r_type, getattr(collector.cargo, r_type) + amount)
+                else:
+                    city = self.players[collector.team].cities[collector.cityid]
+                    city.fuel += amount * FUEL_RATE[r_type]
+
+    def _drop_resources(self) -> None:
+        """Units on friendly citytiles convert cargo to fuel
+        """
+        for player in self.players:
+            for unit in player.units:
+                citytile = self.map.get_cell_by_pos(unit.pos).citytile
+                if citytile and citytile.team == player.team:
+                    city = player.cities[citytile.cityid]
+                    city.fuel += (
+                        unit.cargo.wood * FUEL_RATE[RESOURCE_TYPES.WOOD]
+                        + unit.cargo.coal * FUEL_RATE[RESOURCE_TYPES.COAL]
+                        + unit.cargo.uranium * FUEL_RATE[RESOURCE_TYPES.URANIUM]
+                        )
+                    unit.cargo.wood, unit.cargo.coal, unit.cargo.uranium = 0, 0, 0
+
+    def _consume_light(self) -> None:
+        """Night upkeep of units outside of cities and of cities
+
+        NOTE: units burn the least efficient resources first and in whole units.
+        Units and cities without enough fuel are removed.
+        """
+        for player in self.players:
+            alive = []
+            for unit in player.units:
+                if self.map.get_cell_by_pos(unit.pos).citytile:
+                    alive.append(unit)
+                    continue
+                key = 'WORKER' if unit.is_worker() else 'CART'
+                need = PARAMETERS['LIGHT_UPKEEP'][key]
+                for r_type in reversed(COLLECTION_ORDER):
+                    if need <= 0:
+                        break
+                    rate = FUEL_RATE[r_type]
+                    used = min(getattr(unit.cargo, r_type), math.ceil(need / rate))
+                    setattr(unit.cargo, r_type, getattr(unit.cargo, r_type) - used)
+                    need -= used * rate
+                if need <= 0:
+                    alive.append(unit)
+            player.units = alive
+
+            for cityid in list(player.cities.keys()):
+                city = player.cities[cityid]
+                upkeep = self._light_upkeep(city)
+                if city.fuel >= upkeep:
+                    city.fuel -= upkeep
+                else:
+                    for citytile in city.citytiles:
+                        cell = self.map.get_cell_by_pos(citytile.pos)
+                        cell.citytile = None
+                        cell.road = 0
+                    player.cities.pop(cityid)
+
+    def _regrow_wood(self) -> None:
+        """Regrow not depleted wood tiles
+        """
+        max_wood = PARAMETERS['MAX_WOOD_AMOUNT']
+        for cell in self._cells():
+            resource = cell.resource
+            if resource is not None and resource.type == RESOURCE_TYPES.WOOD \
+                    and 0 < resource.amount < max_wood:
+                resource.amount = min(
+                    resource.amount + math.ceil(resource.amount * (PARAMETERS['WOOD_GROWTH_RATE'] - 1)),
+                    max_wood
+                    )
+
+    def _handle_cooldowns(self) -> None:
+        """Decrease cooldowns of units (with roads) and citytiles
+        """
+        for player in self.players:
+            for unit in player.units:
+                road = self.map.get_cell_by_pos(unit.pos).road
+                unit.cooldown = max(unit.cooldown - 1 - road, 0)
+            for city in player.cities.values():
+                for citytile in city.citytiles:
+                    citytile.cooldown = max(citytile.cooldown - 1, 0)
+
+    def _remove_depleted(self) -> None:
+        for cell in self._cells():
+            if cell.resource is not None and cell.resource.amount <= 0:
+                cell.resource = None
+
+    def _count_citytiles(self) -> None:
+        for player in self.players:
+            player.city_tile_count = sum(len(city.citytiles) for city in player.cities.values())
+
+    def step(self, actions: List[List[str]]) -> None:
+        """Run single turn of game
+
+        Args:
+            actions (List[List[str]]): actions of each team
+        """
+        self._count_citytiles()
+        self._apply_actions(actions)
+        self._build_roads()
+        self._collect_resources()
+        self._drop_resources()
+        if self.is_night:
+            self._consume_light()
+        self._regrow_wood()
+        self._handle_cooldowns()
+        self._remove_depleted()
+        self._count_citytiles()
+        self.turn += 1
+
+    @property
+    def done(self) -> bool:
+        """Game is ended by turns limit or one of teams has nothing
+        """
+        if self.turn >= PARAMETERS['MAX_DAYS']:
+            return True
+        return any(
+            not player.units and not player.cities
+            for player in self.players
+            )
+
+    def rewards(self) -> List[int]:
+        """Rewards of teams as in kaggle environment
+
+        Returns:
+            List[int]: citytiles * 10000 + units for each team
+        """
+        self._count_citytiles()
+        return [
+            player.city_tile_count * 10000 + len(player.units)
+            for player in self.players
+            ]
+
+
+class SimpleAgent:
+    """Analog of kaggle "simple_agent": workers mine closest available
+    resource and return to closest citytile when full
+    """
+
+    def __init__(self) -> None:
+        self.game_state: Game = None
+
+    def __call__(self, observation: Observation, configuration: dict) -> List[str]:
+        if observation['step'] == 0:
+            self.game_state = Game()
+            self.game_state._initialize(observation['updates'])
+            self.game_state._update(observation['updates'][2:])
+            self.game_state.id = observation.player
+        else:
+            self.game_state._update(observation['updates'])
+
+        actions = []
+        player = self.game_state.players[observation.player]
+        resource_tiles = [
+            cell
+            for row in self.game_state.map.map
+            for cell in row
+            if cell.has_resource()
+            ]
+        citytiles = [
+            citytile
+            for city in player.cities.values()
+            for citytile in city.citytiles
+            ]
+        for unit in player.units:
+            if not unit.is_worker() or not unit.can_act():
+                continue
+            if unit.get_cargo_space_left() > 0:
+                targets = [
+                    cell.pos for cell in resource_tiles
+                    if not (cell.resource.type == RESOURCE_TYPES.COAL and not player.researched_coal())
+                    and not (cell.resource.type == RESOURCE_TYPES.URANIUM and not player.researched_uranium())
+                    ]
+            else:
+                targets = [citytile.pos for citytile in citytiles]
+            if targets:
+                closest = min(targets, key=lambda pos: pos.distance_to(unit.pos))
+                actions.append(unit.move(unit.pos.direction_to(closest)))
+        return actions
+
+
+BUILTIN_AGENTS = {'simple_agent': SimpleAgent}
+
+
+def _make_agent(agent: Union[str, Agent]) -> Agent:
+    """Get agent callable from callable or name of builtin agent
+    """
+    if callable(agent):
+        return agent
+    if agent in BUILTIN_AGENTS:
+        return BUILTIN_AGENTS[agent]()
+    raise ValueError(f'Unknown agent: {agent}')
+
+
+def run_episode(
+    agents: List[Union[str, Agent]],
+    configuration: dict = None,
+    steps: int = None,
+    debug: bool = False
+    ) -> List[Optional[int]]:
+    """Play single game in process
+
+    Args:
+        agents (List[Union[str, Agent]]): agent functions or builtin agent names
+        configuration (dict, optional): kaggle-like game config with
+        seed, rows and columns. Defaults to None
+        steps (int, optional): max number of turns. Defaults to None
+        debug (bool, optional): log agents errors. Defaults to False
+
+    Returns:
+        List[Optional[int]]: rewards of players, None for failed agent
+    """
+    configuration = dict(configuration or {})
+    seed = configuration.get('seed')
+    if seed is None:
+        seed = random.randint(0, 2 ** 31)
+    size = configuration.get('rows') or configuration.get('columns')
+    if size not in MAP_SIZES:
+        size = random.Random(seed).choice(MAP_SIZES)
+    max_turns = min(steps or PARAMETERS['MAX_DAYS'], PARAMETERS['MAX_DAYS'])
+
+    engine = LuxEngine(size=size, seed=seed)
+    agents = [_make_agent(agent) for agent in agents]
+    failed = [False, False]
+    decided = [None, None]
+    while engine.turn < max_turns and not engine.done:
+        updates = engine.get_updates()
+        actions = [[], []]
+        for team, agent in enumerate(agents):
+            obs_updates = updates
+            if engine.turn == 0:
+                obs_updates = [str(team), f'{size} {size}'] + updates
+            observation = Observation(
+                player=team,
+                step=engine.turn,
+                updates=obs_updates,
+                remainingOverageTime=60,
+                reward=0
+                )
+            try:
+                actions[team] = agent(observation, configuration) or []
+            except GameDecided as e:
+                decided[team] = e.reward
+            except Exception as e:
+                if debug:
+                    logger.exception(f'Agent {team} failed on turn {engine.turn}: {e}')
+                failed[team] = True
+        if any(failed) or any(reward is not None for reward in decided):
+            break
+        engine.step(actions)
+
+    rewards = [
+        reward if decided[team] is None else decided[team]
+        for team, reward in enumerate(engine.rewards())
+        ]
+    return [None if failed[team] else reward for team, reward in enumerate(rewards)]
+
+
+def evaluate(
+    environment: str,
+    agents: List[Union[str, Agent]],
+    configuration: dict = None,
+    steps: int = None,
+    num_episodes: int = 1,
+    debug: bool = False,
+    configurations: List[dict] = None
+    ) -> List[List[Optional[int]]]:
+    """Drop-in replacement of kaggle_environments.evaluate for lux_ai_2021
+
+    Args:
+        environment (str): environment name, only lux_ai_2021 is supported
+        agents (List[Union[str, Agent]]): agent functions or builtin agent names
+        configuration (dict, optional): game config. Defaults to None
+        steps (int, optional): max number of turns. Defaults to None
+        num_episodes (int, optional): number of games. Defaults to 1
+        debug (bool, optional): log agents errors. Defaults to False
+        configurations (List[dict], optional): config of each game, for example
+        with own seed and size, replaces num_episodes. Defaults to None
+
+    Returns:
+        List[List[Optional[int]]]: rewards of players for each game
+    """
+    if environment != 'lux_ai_2021':
+        raise ValueError(f'Unsupported environment: {environment}')
+    if configurations is None:
+        configurations = [configuration] * num_episodes
+    return [
+        run_episode(agents=agents, configuration=episode, steps=steps, debug=debug)
+        for episode in configurations
+        ]
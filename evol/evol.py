@@ -1,8 +1,19 @@
 from deap import base, creator, tools, algorithms
-from kaggle_environments import evaluate
+from kaggle_environments import evaluate as kaggle_evaluate
+from engine.simulator import evaluate as local_evaluate
+from engine.batch import evaluate_batch
 from bots.genutil import GenConstruct
 from bots.scoring import FinalScoring
 from bots.statements import GameSpace, SubGameSpace
+from bots.utility import AD, Rewards, CrossGameScore
+from bots import profiler
+from ga.workers import EvaluationPool
+from ga.cache import FitnessCache
+from ga.islands import run_islands, TOPOLOGIES
+from ga.steady import eaSteadyState
+from ga.racing import Racing
+from ga.seeds import SeedBank, Episode
+from ga.checkpoint import Checkpointer
 import agent_train
 import agent_random
 import numpy as np
@@ -11,7 +22,7 @@ import seaborn as sns
 import networkx as nx
 from typing import List, Tuple
 from loguru import logger
-import os, time, datetime, json, random, multiprocessing, pickle
+import os, time, datetime, json, random, multiprocessing
 from dotenv import load_dotenv
 import click
 
@@ -20,52 +31,150 @@ load_dotenv(dotenv_path='shared.env')
 
 gen_const = GenConstruct()  # get genome construction object
 
+# game engines for fitness evaluation
+ENGINES = {'local': local_evaluate, 'batch': evaluate_batch, 'kaggle': kaggle_evaluate}
 
-# Fitness calculation
-def GameScoreFitness(
-    individual: List[int],
-    config: dict,
-    num_of_episodes: int,
-    agent_) -> Tuple[float]:
-    """Return game statistics for evaluation criterium
+
+def _as_function(agent_object) -> callable:
+    """Wrap agent object to function, kaggle_environments inspects agent arguments
+    """
+    def agent(observation, configuration):
+        return agent_object(observation, configuration)
+    return agent
+
+
+def final_fitness(rewards: Rewards, cross_game_score: CrossGameScore) -> float:
+    """Fitness of played games, it is mean over games
 
     Args:
-        individual (List[int]): individual genome list
+        rewards (Rewards): game rewards
+        cross_game_score (CrossGameScore): score of each game, calculated by agent
 
     Returns:
-        Tuple[float]: tuple, that contains only one value of mean rewards for first player
+        float: fitness value
     """
-    agent_train.gen_const = gen_const
-    # agent_train.genome = gen_const.convert_day_genome(vector=individual)
-    agent_train.genome = gen_const.convert_daily_genome(vector=individual)
-    agent_train.subgame_space = SubGameSpace()
-    agent_train.game_space = GameSpace()
-    agent_random.game_space = GameSpace()
-    agent_random.gen_const = gen_const
-    agent_random.genome = gen_const.init_daily_genome()
-    rewards = evaluate(
-        'lux_ai_2021',
-        [agent_train.agent, agent_],
-        configuration=config,
-        num_episodes=num_of_episodes,
-        debug=True
-        )
-
     # final scoring - is a scoring, calculated inside game for each game
     # plus final rewards, returned by game. SYou can see scoring strategies
     # in scoring.py
     final_scoring = FinalScoring(rewards=rewards)
     
     # day plus night final scoring
-    # mean_r = final_scoring.day_plus_night_final_scoring(
-    #     cross_game_score=agent_train.subgame_space.cross_game_score
+    # return final_scoring.day_plus_night_final_scoring(
+    #     cross_game_score=cross_game_score
     #     )
     
     # each day final scoring
-    mean_r = final_scoring.each_day_final_scoring(
-        cross_game_score=agent_train.subgame_space.cross_game_score
+    return final_scoring.each_day_final_scoring(
+        cross_game_score=cross_game_score
         )
 
+
+# Fitness calculation
+def GameScoreFitness(
+    individual: List[int],
+    config: dict,
+    num_of_episodes: int,
+    agent_: str,
+    engine: str = 'local',
+    with_scores: bool = False,
+    episodes: List[Episode] = None,
+    opponent_seed: int = None) -> Tuple[float]:
+    """Return game statistics for evaluation criterium
+
+    NOTE: each evaluation plays by own agent objects and statements,
+    module globals of agent_train and agent_random are not used
+
+    Args:
+        individual (List[int]): individual genome list
+        agent_ (str): opponent, builtin agent name or 'random'
+        engine (str, optional): 'local' for in-process engine, 'batch' for
+        in-process engine with all episodes played in lockstep or 'kaggle'
+        for kaggle_environments. Defaults to 'local'
+        with_scores (bool, optional): return per game scores too. Defaults to False
+        episodes (List[Episode], optional): map seed and size of each game from
+        seed bank, replaces num_of_episodes. Defaults to None
+        opponent_seed (int, optional): seed of random opponent genome, the same
+        seed gives the same opponent, so cached fitness of genomes is comparable.
+        Defaults to None, opponent is drawn for each evaluation
+
+    Returns:
+        Tuple[float]: tuple, that contains only one value of mean rewards for first player
+        and, if with_scores, dict with game rewards, cross game score and episodes
+    """
+    configurations = None
+    if episodes:
+        num_of_episodes = len(episodes)
+        configurations = [
+            dict(config, seed=seed, rows=size, columns=size)
+            for seed, size in episodes
+            ]
+
+    subgame_space = SubGameSpace()
+    # genome = gen_const.convert_day_genome(vector=individual)
+    genome = gen_const.convert_daily_genome(vector=individual)
+    random_genome = gen_const.init_daily_genome(rng=random.Random(opponent_seed))
+
+    def train_agent(game_num: int = None):
+        return agent_train.TrainAgent(
+            genome=genome,
+            gen_const=gen_const,
+            subgame_space=subgame_space,
+            # kaggle_environments counts exception as agent error
+            early_stop=engine != 'kaggle',
+            game_num=game_num
+            )
+
+    def opponent():
+        if agent_ == 'random':
+            return agent_random.RandomAgent(genome=random_genome, gen_const=gen_const)
+        return agent_
+
+    if engine == 'batch':
+        # each game of batch needs agents with own statements,
+        # games are grouped by map size, so scores are numbered by episode
+        agents = [
+            [train_agent(game_num=episode) for episode in range(num_of_episodes)],
+            agent_ if agent_ != 'random' else [opponent() for _ in range(num_of_episodes)]
+            ]
+    else:
+        opponent_ = opponent()
+        agents = [
+            _as_function(train_agent()),
+            opponent_ if isinstance(opponent_, str) else _as_function(opponent_)
+            ]
+    if configurations is None:
+        rewards = ENGINES[engine](
+            'lux_ai_2021',
+            agents,
+            configuration=config,
+            num_episodes=num_of_episodes,
+            debug=True
+            )
+    elif engine == 'kaggle':
+        # kaggle_environments plays all episodes with one config
+        rewards = [
+            reward
+            for configuration in configurations
+            for reward in kaggle_evaluate('lux_ai_2021', agents, configuration=configuration,
+                                          num_episodes=1, debug=True)
+            ]
+    else:
+        rewards = ENGINES[engine](
+            'lux_ai_2021',
+            agents,
+            configuration=config,
+            debug=True,
+            configurations=configurations
+            )
+
+    cross_game_score = dict(sorted(subgame_space.cross_game_score.items()))
+    mean_r = final_fitness(rewards=rewards, cross_game_score=cross_game_score)
+
+    if with_scores:
+        scores = {'rewards': rewards, 'cross_game_score': cross_game_score}
+        if episodes:
+            scores['episodes'] = list(episodes)
+        return (mean_r,), scores
     return mean_r,
 
 
@@ -79,15 +188,31 @@ def eaSimpleWithElitism(
     stats=None,
     halloffame=None, 
     verbose=__debug__,
-    freq=10
+    freq=10,
+    migration=None,
+    checkpointer=None,
+    seed_bank=None,
+    start_gen=0,
+    logbook=None
     ):
     """This algorithm is similar to DEAP eaSimple() algorithm, with the modification that
     halloffame is used to implement an elitism mechanism. The individuals contained in the
     halloffame are directly injected into the next generation and are not subject to the
     genetic operators of selection, crossover and mutation.
+
+    If migration is given, it is called with generation number and population
+    after each generation, island model uses it for exchange of individuals.
+
+    If seed_bank is given, it is rotated before generation, then population
+    and hall of fame are evaluated again with new games.
+
+    If checkpointer is given, checkpoint is written every freq generations.
+    Resumed flow gets generation and logbook of checkpoint in start_gen and logbook.
     """
-    logbook = tools.Logbook()
-    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+    resumed = logbook is not None
+    if not resumed:
+        logbook = tools.Logbook()
+        logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
 
     # Evaluate the individuals with an invalid fitness
     invalid_ind = [ind for ind in population if not ind.fitness.valid]
@@ -101,13 +226,32 @@ def eaSimpleWithElitism(
     halloffame.update(population)
     hof_size = len(halloffame.items) if halloffame.items else 0
 
-    record = stats.compile(population) if stats else {}
-    logbook.record(gen=0, nevals=len(invalid_ind), **record)
-    if verbose:
-        click.echo(logbook.stream)
+    if not resumed:
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=0, nevals=len(invalid_ind), **record)
+        if verbose:
+            click.echo(logbook.stream)
+    else:
+        # restored records are not streamed again, resumed output starts with header
+        logbook.buffindex = len(logbook)
+        if verbose:
+            click.echo('\t'.join(logbook.header))
 
     # Begin the generational process
-    for gen in range(1, ngen + 1):
+    for gen in range(start_gen + 1, ngen + 1):
+        nevals = 0
+
+        # Fitness of previous games is not comparable with new ones
+        if seed_bank is not None and seed_bank.update(gen):
+            elites = [toolbox.clone(ind) for ind in halloffame.items]
+            for ind in population + elites:
+                del ind.fitness.values
+            fitnesses = toolbox.map(toolbox.evaluate, population + elites)
+            for ind, fit in zip(population + elites, fitnesses):
+                ind.fitness.values = fit
+            halloffame.clear()
+            halloffame.update(population + elites)
+            nevals += len(population) + len(elites)
 
         # Select the next generation individuals
         offspring = toolbox.select(population, len(population) - hof_size)
@@ -130,19 +274,19 @@ def eaSimpleWithElitism(
         # Replace the current population by the offspring
         population[:] = offspring
 
+        # Exchange individuals with other islands
+        if migration is not None:
+            migration(gen, population)
+            halloffame.update(population)
+
         # Append the current generation statistics to the logbook
         record = stats.compile(population) if stats else {}
-        logbook.record(gen=gen, nevals=len(invalid_ind), **record)
+        logbook.record(gen=gen, nevals=nevals + len(invalid_ind), **record)
         if verbose:
             click.echo(logbook.stream)
         
-        if gen % freq == 0:
-            # Fill the dictionary using the dict(key=value[, ...]) constructor
-            cp = dict(population=population, generation=gen, halloffame=halloffame,
-                      logbook=logbook, rndstate=random.getstate())
-
-            with open('bots_dump/checkpoint.pkl', "wb") as cp_file:
-                pickle.dump(cp, cp_file)
+        if checkpointer is not None and gen % freq == 0:
+            checkpointer.save(gen, population, halloffame, logbook)
 
     return population, logbook
 
@@ -155,15 +299,55 @@ def eaSimpleWithElitism(
 @click.option('--loglevel', default=0, show_default=True, type=int, 
               help='set 0, 1, 2 or 3')
 @click.option('-annotations', is_flag=True, help='on annotation mode')
-@click.option('-checkpoint', is_flag=True, help='on checkpoints')
-@click.option('--freq', default=10, show_default=True, 
+@click.option('-checkpoint', is_flag=True, help='resume from the last checkpoint')
+@click.option('--freq', default=1, show_default=True, 
               type=int, help='set frequincy of checkpoint')
+@click.option('--keep', default=3, show_default=True,
+              type=int, help='number of retained checkpoints, set 0 to keep all')
 @click.option('--episodes', 'num_of_episodes', default=10, show_default=True, 
               type=int, help='set the number of episodes for mean metrics')
 @click.option('--agent', 'agent_', default='simple_agent', show_default=True, 
               type=click.Choice(['simple_agent', 'random']))
-def main(seed, size, loglevel, annotations, checkpoint, freq, num_of_episodes, agent_):
+@click.option('--engine', default='local', show_default=True,
+              type=click.Choice(list(ENGINES.keys())), help='game engine for evaluation')
+@click.option('--chunksize', default=1, show_default=True,
+              type=int, help='individuals sent to worker at once')
+@click.option('--cache-size', default=10000, show_default=True,
+              type=int, help='fitness cache size, set 0 to off cache')
+@click.option('--cache-path', default='', show_default=True,
+              type=str, help='file of on-disk fitness cache')
+@click.option('--mode', default='generational', show_default=True,
+              type=click.Choice(['generational', 'steady']),
+              help='generational flow or asynchronous steady-state flow')
+@click.option('--islands', default=1, show_default=True,
+              type=int, help='number of islands, each island is evolved in own process')
+@click.option('--migration-interval', default=5, show_default=True,
+              type=int, help='generations between migrations, set 0 to off migration')
+@click.option('--migrants', default=2, show_default=True,
+              type=int, help='best individuals sent to each neighbour island')
+@click.option('--topology', default='ring', show_default=True,
+              type=click.Choice(TOPOLOGIES), help='islands migration topology')
+@click.option('-seed-bank', is_flag=True,
+              help='all individuals play the same map seeds and sizes of --episodes games')
+@click.option('--bank-rotate', default=0, show_default=True,
+              type=int, help='generations between seed bank rotations, set 0 to fix bank')
+@click.option('--race-episodes', default=0, show_default=True,
+              type=int, help='episodes of the first racing stage, set 0 to off racing')
+@click.option('--race-eta', default=2, show_default=True,
+              type=int, help='episodes growth and survivors reduction of racing stage')
+@click.option('--race-z', default=1.96, show_default=True,
+              type=float, help='half width of racing confidence interval in standard errors')
+@click.option('-profile', is_flag=True,
+              help='profile stages of bot pipeline in workers, report is written to bots_dump')
+def main(seed, size, loglevel, annotations, checkpoint, freq, keep, num_of_episodes, agent_, engine,
+         chunksize, cache_size, cache_path, mode, islands, migration_interval, migrants, topology,
+         seed_bank, bank_rotate, race_episodes, race_eta, race_z, profile):
     
+    if race_episodes and (mode != 'generational' or islands > 1):
+        raise click.UsageError('Racing is supported by generational flow without islands')
+    if bank_rotate and mode != 'generational':
+        raise click.UsageError('Seed bank is rotated by generational flow only')
+
     start = datetime.datetime.now().replace(microsecond=0)
     
     # Constants
@@ -198,11 +382,11 @@ def main(seed, size, loglevel, annotations, checkpoint, freq, num_of_episodes, a
         config['rows'] = size
         config['columns'] = size
 
-    click.echo(f'Config: {config}, Opponent: {agent_}')
+    # random opponent is the same for all evaluations, seed bank replaces it on rotation
+    opponent_seed = random.Random(seed).randint(0, 2 ** 31)
+
+    click.echo(f'Config: {config}, Opponent: {agent_}, Engine: {engine}')
 
-    if agent_ == 'random':
-        agent_ = agent_random.agent
-   
     # Space initialisation
     toolbox = base.Toolbox()
     # history = tools.History()
@@ -234,7 +418,8 @@ def main(seed, size, loglevel, annotations, checkpoint, freq, num_of_episodes, a
     
     # Register evaluate function
     toolbox.register("evaluate", GameScoreFitness, config=config, 
-                     num_of_episodes=num_of_episodes, agent_=agent_)
+                     num_of_episodes=num_of_episodes, agent_=agent_, engine=engine,
+                     with_scores=True, opponent_seed=opponent_seed)
 
     # Tournament selection with tournament size
     toolbox.register("select", tools.selTournament, tournsize=TOURNAMENT_SIZE)
@@ -252,42 +437,165 @@ def main(seed, size, loglevel, annotations, checkpoint, freq, num_of_episodes, a
         indpb=INDPB_MUTATION
         )
     
-    # Devine multiprocessing 
-    pool = multiprocessing.Pool(processes=NUM_OF_PROCESS)
-    toolbox.register("map", pool.map)
-
-    # Use picked data
-    if checkpoint:
-        with open('bots_dump/checkpoint.pkl', "rb") as cp_file:
-            cp = pickle.load(cp_file)
-        population = cp["population"]
-        logbook = cp["logbook"]
-        hof = cp["halloffame"]
-        random.setstate(cp["rndstate"])
-        click.echo('Checkpoint loaded.')
-    else:
-        population = toolbox.populationCreator(n=POPULATION_SIZE)
-        hof = tools.HallOfFame(HALL_OF_FAME_SIZE)
+    # Build distance tables once, forked workers share them read-only
+    AD.preload()
+
+    # Forked workers inherit instrumented bot
+    if profile:
+        profiler.enable()
+
+    # Fitness cache of evaluated genomes
+    def make_cache(index: int = None) -> FitnessCache:
+        if not cache_size:
+            return None
+        path = cache_path or None
+        if path and index is not None:
+            path = f'{path}.{index}'
+        context = dict(config=config, agent=agent_, engine=engine, episodes=num_of_episodes)
+        if agent_ == 'random':
+            context['opponent_seed'] = opponent_seed
+        if race_episodes:
+            context['racing'] = dict(episodes=race_episodes, eta=race_eta, z=race_z)
+        return FitnessCache(
+            context=context,
+            maxsize=cache_size,
+            path=path
+            )
+
+    # Common games of all individuals
+    bank = None
+    if seed_bank:
+        bank = SeedBank(
+            num_episodes=num_of_episodes,
+            sizes=[size] if size in [12, 16, 24, 32] else None,
+            rotate=bank_rotate,
+            seed=seed
+            )
+        click.echo(f'Seed bank: {bank.episodes}, rotation: {bank_rotate}')
 
     # Prepare the statistics object
     stats = tools.Statistics(lambda ind: ind.fitness.values)
     stats.register("max", np.max)
     stats.register("avg", np.mean)
 
-    # Perform the Genetic Algorithm flow with hof feature added
-    population, logbook = eaSimpleWithElitism(
-        population,
-        toolbox,
-        cxpb=P_CROSSOVER,
-        mutpb=P_MUTATION,
-        ngen=MAX_GENERATIONS,
-        stats=stats,
-        halloffame=hof,
-        verbose=True,
-        freq=freq
-        )
-    
-    pool.close()
+    if islands > 1:
+        # Perform the Genetic Algorithm flow on islands with migration
+        click.echo(f'Islands: {islands}, topology: {topology}, '
+                   f'migration interval: {migration_interval}, migrants: {migrants}')
+        population, logbook, hof = run_islands(
+            algorithm=eaSimpleWithElitism,
+            toolbox=toolbox,
+            num_islands=islands,
+            population_size=POPULATION_SIZE,
+            hof_size=HALL_OF_FAME_SIZE,
+            stats=stats,
+            processes=NUM_OF_PROCESS,
+            interval=migration_interval,
+            migrants=migrants,
+            topology=topology,
+            chunksize=chunksize,
+            cache_factory=make_cache,
+            checkpoint=checkpoint,
+            keep=keep,
+            seed=seed,
+            cxpb=P_CROSSOVER,
+            mutpb=P_MUTATION,
+            ngen=MAX_GENERATIONS,
+            verbose=False,
+            freq=freq,
+            seed_bank=bank
+            )
+        click.echo(logbook)
+    else:
+        cache = make_cache()
+
+        # Devine multiprocessing with warm workers
+        pool = EvaluationPool(
+            evaluate=toolbox.evaluate,
+            processes=NUM_OF_PROCESS,
+            chunksize=chunksize,
+            cache=cache
+            )
+        toolbox.register("map", pool.map)
+
+        if bank is not None:
+            bank.bind(pool)
+
+        # Atomic checkpoints, the last one is resumed
+        checkpointer = Checkpointer(
+            prefix='checkpoint' if mode == 'generational' else f'checkpoint_{mode}',
+            keep=keep,
+            cache=cache,
+            seed_bank=bank
+            )
+        state = checkpointer.load() if checkpoint else None
+        if state is not None:
+            population = state.population
+            hof = state.halloffame
+            click.echo(f'Checkpoint {state.version} loaded.')
+        else:
+            population = toolbox.populationCreator(n=POPULATION_SIZE)
+            hof = tools.HallOfFame(HALL_OF_FAME_SIZE)
+
+        racing = None
+        if race_episodes:
+            # Spend episodes only on individuals, that can reach the top
+            racing = Racing(
+                pool=pool,
+                final_fitness=final_fitness,
+                max_episodes=num_of_episodes,
+                min_episodes=race_episodes,
+                eta=race_eta,
+                z=race_z,
+                halloffame=hof
+                )
+            toolbox.register("map", racing.map)
+
+        if mode == 'steady':
+            # Perform asynchronous steady-state flow, budget of generational flow
+            population, logbook = eaSteadyState(
+                population,
+                toolbox,
+                pool=pool,
+                cxpb=P_CROSSOVER,
+                mutpb=P_MUTATION,
+                max_evals=MAX_GENERATIONS * POPULATION_SIZE,
+                stats=stats,
+                halloffame=hof,
+                verbose=True,
+                freq=POPULATION_SIZE,
+                checkpoint_freq=freq * POPULATION_SIZE,
+                checkpointer=checkpointer,
+                start_evals=state.version if state else 0,
+                logbook=state.logbook if state else None
+                )
+        else:
+            # Perform the Genetic Algorithm flow with hof feature added
+            population, logbook = eaSimpleWithElitism(
+                population,
+                toolbox,
+                cxpb=P_CROSSOVER,
+                mutpb=P_MUTATION,
+                ngen=MAX_GENERATIONS,
+                stats=stats,
+                halloffame=hof,
+                verbose=True,
+                freq=freq,
+                checkpointer=checkpointer,
+                seed_bank=bank,
+                start_gen=state.version if state else 0,
+                logbook=state.logbook if state else None
+                )
+        
+        pool.close()
+        if racing is not None:
+            click.echo(f'Racing episodes: {racing.episodes}')
+        if cache is not None:
+            click.echo(f'Fitness cache hits: {cache.hits}, misses: {cache.misses}')
+            cache.close()
+        if pool.profile.stats:
+            for path in pool.profile.write('bots_dump/profile'):
+                click.echo(f'Profile: {path}')
     
     timestamp = time.strftime("%m-%d_%H-%M", time.gmtime())
 
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import hashlib, json, shelve
+
+
+class CacheEntry(NamedTuple):
+    """Cached evaluation of genome
+    """
+    fitness: Tuple[float]
+    scores: Any
+
+
+class FitnessCache:
+    """Content-addressed fitness cache with LRU eviction
+
+    Key is a hash of genome vector and evaluation context (opponent,
+    engine, game config with seed). Entries are kept in memory and,
+    if path is given, in shelve file, that survives between runs.
+
+    NOTE: with random seeds fitness is noisy, cached value is the
+    first sample of it
+    """
+
+    def __init__(self, context: Dict[str, Any], maxsize: int = 10000, path: str = None) -> None:
+        self.context = json.dumps(context, sort_keys=True, default=str)
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict = OrderedDict()
+        self._disk = shelve.open(path) if path else None
+
+    def key(self, vector: List[int], extra: Dict[str, Any] = None) -> str:
+        """Get key of genome vector in current context
+
+        Args:
+            vector (List[int]): genome vector
+            extra (Dict[str, Any], optional): changing part of context,
+            for example seed bank of generation. Defaults to None.
+
+        Returns:
+            str: sha1 hex digest
+        """
+        data = f'{self.context}|{json.dumps(list(vector))}'
+        if extra:
+            data = f'{data}|{json.dumps(extra, sort_keys=True, default=str)}'
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get cached entry and mark it as recently used
+
+        Args:
+            key (str): genome key
+
+        Returns:
+            Optional[CacheEntry]: entry or None if genome was not evaluated
+        """
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        elif self._disk is not None and key in self._disk:
+            entry = CacheEntry(*self._disk[key])
+            self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, fitness: Tuple[float], scores: Any = None) -> None:
+        """Store evaluation of genome
+
+        Args:
+            key (str): genome key
+            fitness (Tuple[float]): fitness values
+            scores (Any, optional): per game scores. Defaults to None.
+        """
+        entry = CacheEntry(fitness=tuple(fitness), scores=scores)
+        self._remember(key, entry)
+        if self._disk is not None:
+            self._disk[key] = tuple(entry)
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def fitness_items(self) -> List[Tuple[str, Tuple[float]]]:
+        """Keys and fitness of entries in memory, from the least recently used
+        """
+        return [(key, entry.fitness) for key, entry in self._memory.items()]
+
+    def restore(self, items: List[Tuple[str, Tuple[float]]]) -> None:
+        """Put fitness of checkpoint to memory, known entries are not changed
+
+        Args:
+            items (List[Tuple[str, Tuple[float]]]): keys and fitness
+        """
+        for key, fitness in items:
+            if key not in self._memory:
+                self._remember(key, CacheEntry(fitness=tuple(fitness), scores=None))
+
+    def sync(self) -> None:
+        if self._disk is not None:
+            self._disk.sync()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
@@ -0,0 +1,211 @@
+from deap import creator, tools
+from ga.cache import FitnessCache
+from ga.seeds import SeedBank
+from typing import Any, Dict, List, NamedTuple, Optional
+from loguru import logger
+import glob, json, os, random, re, time
+import numpy as np
+
+
+# format of checkpoint files, older files are not loaded
+FORMAT_VERSION = 1
+
+
+class CheckpointState(NamedTuple):
+    """GA state, restored from checkpoint
+    """
+    version: int
+    population: list
+    halloffame: tools.HallOfFame
+    logbook: tools.Logbook
+    extra: Dict[str, Any]
+
+
+def _genomes(individuals: list) -> Dict[str, np.ndarray]:
+    """Compact arrays of genomes and fitness, nan for invalid fitness
+    """
+    width = len(individuals[0].fitness.weights) if individuals else 0
+    genomes = np.array([list(ind) for ind in individuals], dtype=np.int16)
+    fitness = np.array([
+        ind.fitness.values if ind.fitness.valid else (np.nan,) * width
+        for ind in individuals
+        ], dtype=np.float64)
+    return {'genomes': genomes, 'fitness': fitness.reshape(len(individuals), width)}
+
+
+def _individuals(genomes: np.ndarray, fitness: np.ndarray) -> list:
+    """Individuals of creator classes from compact arrays
+    """
+    individuals = []
+    for genome, values in zip(genomes, fitness):
+        ind = creator.Individual(genome.tolist())
+        if not np.isnan(values).any():
+            ind.fitness.values = tuple(values.tolist())
+        individuals.append(ind)
+    return individuals
+
+
+class Checkpointer:
+    """Atomic versioned checkpoints of GA state
+
+    Each checkpoint is a separate npz file `<prefix>_<version>.npz` with
+    genomes and fitness arrays of population and hall of fame, states
+    of python and numpy random generators, fitness values of cache and
+    json metadata (logbook, seed bank, hall of fame size). File is written
+    to temporary file and renamed, so crash never corrupts the last
+    checkpoint. Only the last keep checkpoints are retained, 0 keeps all.
+
+    NOTE: individuals are restored with creator.Individual, so creator
+    classes must be created before load, but no pickled classes are needed
+    """
+
+    def __init__(
+        self,
+        directory: str = 'bots_dump',
+        prefix: str = 'checkpoint',
+        keep: int = 3,
+        cache: FitnessCache = None,
+        seed_bank: SeedBank = None
+        ) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.keep = keep
+        self.cache = cache
+        self.seed_bank = seed_bank
+        self._pattern = re.compile(rf"{re.escape(prefix)}_(\d+)\.npz")
+
+    def path(self, version: int) -> str:
+        return os.path.join(self.directory, f'{self.prefix}_{version:08d}.npz')
+
+    def versions(self) -> List[int]:
+        """Versions of checkpoints in directory in ascending order
+        """
+        versions = []
+        for path in glob.glob(os.path.join(self.directory, f'{self.prefix}_*.npz')):
+            match = self._pattern.fullmatch(os.path.basename(path))
+            if match:
+                versions.append(int(match.group(1)))
+        return sorted(versions)
+
+    def save(
+        self,
+        version: int,
+        population: list,
+        halloffame: tools.HallOfFame,
+        logbook: tools.Logbook,
+        **extra
+        ) -> str:
+        """Write checkpoint atomically and drop old ones
+
+        Args:
+            version (int): generation or number of evaluations
+            population (list): population
+            halloffame (tools.HallOfFame): hall of fame
+            logbook (tools.Logbook): logbook
+            extra: other json serializable state of algorithm
+
+        Returns:
+            str: path of checkpoint
+        """
+        start = time.perf_counter()
+        arrays = {}
+        for name, individuals in (('population', population), ('halloffame', halloffame.items)):
+            for key, array in _genomes(individuals).items():
+                arrays[f'{name}_{key}'] = array
+
+        py_version, py_state, py_gauss = random.getstate()
+        arrays['random_state'] = np.array(py_state, dtype=np.uint64)
+        np_name, np_keys, np_pos, np_has_gauss, np_gauss = np.random.get_state()
+        arrays['numpy_keys'] = np_keys
+
+        if self.cache is not None:
+            self.cache.sync()
+            items = self.cache.fitness_items()
+            arrays['cache_keys'] = np.array([key for key, _ in items], dtype='S40')
+            arrays['cache_fitness'] = np.array(
+                [fitness for _, fitness in items], dtype=np.float64
+                ).reshape(len(items), len(items[0][1]) if items else 0)
+
+        meta = dict(
+            format=FORMAT_VERSION,
+            version=version,
+            halloffame_size=halloffame.maxsize,
+            logbook=dict(header=logbook.header, records=list(logbook)),
+            random=dict(version=py_version, gauss=py_gauss),
+            numpy=dict(name=np_name, pos=np_pos, has_gauss=np_has_gauss, gauss=np_gauss),
+            seed_bank=self.seed_bank.get_state() if self.seed_bank is not None else None,
+            extra=extra
+            )
+        arrays['meta'] = np.array(json.dumps(meta, default=float))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(version)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as cp_file:
+            np.savez(cp_file, **arrays)
+            cp_file.flush()
+            os.fsync(cp_file.fileno())
+        os.replace(tmp_path, path)
+
+        if self.keep:
+            for old in self.versions()[:-self.keep]:
+                os.remove(self.path(old))
+        logger.info(f'Checkpoint {path} is written in {time.perf_counter() - start:.3f}s')
+        return path
+
+    def load(self, version: int = None) -> Optional[CheckpointState]:
+        """Read checkpoint and restore random states, seed bank and cache
+
+        Args:
+            version (int, optional): version of checkpoint. Defaults to the last one.
+
+        Returns:
+            Optional[CheckpointState]: GA state or None, if there are no checkpoints
+        """
+        if version is None:
+            versions = self.versions()
+            if not versions:
+                return None
+            version = versions[-1]
+        with np.load(self.path(version), allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['format'] != FORMAT_VERSION:
+                raise ValueError(f'Unsupported checkpoint format: {meta["format"]}')
+
+            population = _individuals(data['population_genomes'], data['population_fitness'])
+            halloffame = tools.HallOfFame(meta['halloffame_size'])
+            halloffame.update(_individuals(data['halloffame_genomes'], data['halloffame_fitness']))
+
+            random.setstate((
+                meta['random']['version'],
+                tuple(int(value) for value in data['random_state']),
+                meta['random']['gauss']
+                ))
+            np.random.set_state((
+                meta['numpy']['name'],
+                data['numpy_keys'],
+                meta['numpy']['pos'],
+                meta['numpy']['has_gauss'],
+                meta['numpy']['gauss']
+                ))
+
+            if self.cache is not None and 'cache_keys' in data:
+                self.cache.restore(
+                    (key.decode(), fitness.tolist())
+                    for key, fitness in zip(data['cache_keys'], data['cache_fitness'])
+                    )
+
+        if self.seed_bank is not None and meta['seed_bank'] is not None:
+            self.seed_bank.set_state(meta['seed_bank'])
+
+        logbook = tools.Logbook()
+        logbook.header = meta['logbook']['header']
+        for record in meta['logbook']['records']:
+            logbook.record(**record)
+        return CheckpointState(
+            version=meta['version'],
+            population=population,
+            halloffame=halloffame,
+            logbook=logbook,
+            extra=meta['extra']
+            )
@@ -0,0 +1,324 @@
+from deap import base, creator, tools
+from ga.workers import EvaluationPool
+from ga.cache import FitnessCache
+from ga.checkpoint import Checkpointer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+import multiprocessing, os, queue, random
+import numpy as np
+
+
+Migrant = Tuple[List[int], Tuple[float]]
+
+TOPOLOGIES = ['ring', 'complete']
+
+# seconds between checks of island processes, while results are awaited
+RESULT_POLL = 5.0
+
+
+def make_topology(name: str, num_islands: int) -> Dict[int, List[int]]:
+    """Get neighbours, that receive migrants of each island
+
+    Args:
+        name (str): 'ring' - to next island, 'complete' - to all other islands
+        num_islands (int): number of islands
+
+    Returns:
+        Dict[int, List[int]]: island and its neighbours
+    """
+    if name == 'ring':
+        return {i: [(i + 1) % num_islands] for i in range(num_islands) if num_islands > 1}
+    elif name == 'complete':
+        return {i: [j for j in range(num_islands) if j != i] for i in range(num_islands)}
+    raise ValueError(f'Unknown topology: {name}')
+
+
+class QueueTransport:
+    """Migration transport, each island has own inbox queue
+
+    NOTE: islands never wait for migrants, inbox is drained without blocking.
+    Any object with the same send/receive methods (for example queues of
+    multiprocessing manager, served on socket) can be used instead
+    """
+
+    def __init__(self, num_islands: int) -> None:
+        self.inboxes = [multiprocessing.Queue() for _ in range(num_islands)]
+
+    def send(self, island: int, migrants: List[Migrant]) -> None:
+        self.inboxes[island].put(migrants)
+
+    def receive(self, island: int) -> List[Migrant]:
+        migrants = []
+        inbox = self.inboxes[island]
+        while True:
+            try:
+                migrants.extend(inbox.get_nowait())
+            except queue.Empty:
+                return migrants
+
+
+class Migration:
+    """Migration policy of island, called by GA after each generation
+
+    Best individuals are copied to neighbours, received migrants
+    replace the worst individuals of population
+    """
+
+    def __init__(
+        self,
+        island: int,
+        transport: QueueTransport,
+        neighbours: List[int],
+        interval: int,
+        migrants: int
+        ) -> None:
+        self.island = island
+        self.transport = transport
+        self.neighbours = neighbours
+        self.interval = interval
+        self.migrants = migrants
+
+    def __call__(self, gen: int, population: list) -> None:
+        if not self.interval or gen % self.interval:
+            return
+        best = tools.selBest(population, self.migrants)
+        emigrants = [(list(ind), ind.fitness.values) for ind in best]
+        for neighbour in self.neighbours:
+            self.transport.send(neighbour, emigrants)
+
+        immigrants = self.transport.receive(self.island)[:len(population) - 1]
+        worst = sorted(range(len(population)), key=lambda i: population[i].fitness.values)
+        for index, (vector, values) in zip(worst, immigrants):
+            ind = creator.Individual(vector)
+            ind.fitness.values = values
+            population[index] = ind
+        logger.info(f'Island {self.island}, gen {gen}: {len(emigrants)} sent, {len(immigrants)} received')
+
+
+def _run_island(
+    index: int,
+    algorithm: Callable,
+    toolbox: base.Toolbox,
+    population_size: int,
+    hof_size: int,
+    stats: tools.Statistics,
+    migration: Migration,
+    processes: int,
+    chunksize: int,
+    cache_factory: Optional[Callable[[int], FitnessCache]],
+    checkpoint: bool,
+    checkpoint_dir: str,
+    keep: int,
+    seed: Optional[int],
+    results: multiprocessing.Queue,
+    kwargs: Dict[str, Any]
+    ) -> None:
+    """Evolve single island in its own process and put result to queue
+    """
+    # forked processes have the same random state
+    random.seed(None if seed is None else seed + index)
+    np.random.seed(None if seed is None else seed + index)
+
+    cache = cache_factory(index) if cache_factory else None
+    pool = EvaluationPool(
+        evaluate=toolbox.evaluate,
+        processes=processes,
+        chunksize=chunksize,
+        cache=cache
+        )
+    toolbox.register("map", pool.map)
+
+    # islands have copies of the same seed bank
+    seed_bank = kwargs.get("seed_bank")
+    if seed_bank is not None:
+        seed_bank.bind(pool)
+
+    checkpointer = Checkpointer(
+        directory=checkpoint_dir,
+        prefix=f'checkpoint_island_{index}',
+        keep=keep,
+        cache=cache,
+        seed_bank=seed_bank
+        )
+    state = checkpointer.load() if checkpoint else None
+    if state is not None:
+        population, hof = state.population, state.halloffame
+        kwargs = dict(kwargs, start_gen=state.version, logbook=state.logbook)
+    else:
+        population = toolbox.populationCreator(n=population_size)
+        hof = tools.HallOfFame(hof_size)
+
+    population, logbook = algorithm(
+        population,
+        toolbox,
+        stats=stats,
+        halloffame=hof,
+        migration=migration,
+        checkpointer=checkpointer,
+        **kwargs
+        )
+    pool.close()
+    if cache is not None:
+        cache.close()
+    if pool.profile.stats:
+        pool.profile.write(os.path.join(checkpoint_dir, f'profile_island_{index}'))
+
+    results.put((
+        index,
+        [(list(ind), ind.fitness.values) for ind in population],
+        [(list(ind), ind.fitness.values) for ind in hof.items],
+        logbook
+        ))
+
+
+def _collect_results(
+    results: multiprocessing.Queue,
+    islands: List[multiprocessing.Process],
+    poll: float = RESULT_POLL
+    ) -> list:
+    """Wait for results of all islands, ordered by island
+
+    NOTE: result is flushed to queue before island exits, so queue is read
+    once more, when dead island is found. Island, that exited without result,
+    stops the others, as they can wait for its migrants
+
+    Raises:
+        RuntimeError: island exited without result
+    """
+    collected = {}
+    while len(collected) < len(islands):
+        try:
+            result = results.get(timeout=poll)
+        except queue.Empty:
+            dead = [
+                index for index, island in enumerate(islands)
+                if index not in collected and island.exitcode is not None
+                ]
+            if not dead:
+                continue
+            try:
+                result = results.get(timeout=poll)
+            except queue.Empty:
+                codes = {index: islands[index].exitcode for index in dead}
+                for island in islands:
+                    if island.is_alive():
+                        island.terminate()
+                    island.join()
+                raise RuntimeError(f'Islands exited without result, exit codes: {codes}')
+        collected[result[0]] = result
+    return [collected[index] for index in sorted(collected)]
+
+
+def _merge_logbooks(logbooks: List[tools.Logbook]) -> tools.Logbook:
+    """Merge island logbooks by generation: max of max and mean of avg
+    """
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals', 'max', 'avg']
+    for records in zip(*logbooks):
+        logbook.record(
+            gen=records[0]['gen'],
+            nevals=sum(record['nevals'] for record in records),
+            max=max(record['max'] for record in records),
+            avg=float(np.mean([record['avg'] for record in records]))
+            )
+    return logbook
+
+
+def run_islands(
+    algorithm: Callable,
+    toolbox: base.Toolbox,
+    num_islands: int,
+    population_size: int,
+    hof_size: int,
+    stats: tools.Statistics,
+    processes: int,
+    interval: int = 5,
+    migrants: int = 2,
+    topology: str = 'ring',
+    chunksize: int = 1,
+    cache_factory: Optional[Callable[[int], FitnessCache]] = None,
+    checkpoint: bool = False,
+    checkpoint_dir: str = 'bots_dump',
+    keep: int = 3,
+    seed: Optional[int] = None,
+    **kwargs
+    ) -> Tuple[list, tools.Logbook, tools.HallOfFame]:
+    """Evolve num_islands sub-populations in separate processes with migration
+
+    NOTE: each island has population_size individuals, own evaluation pool
+    with processes // num_islands workers and own checkpoints
+
+    Args:
+        algorithm (Callable): GA flow, eaSimpleWithElitism
+        toolbox (base.Toolbox): toolbox with registered operators and evaluate
+        num_islands (int): number of islands
+        population_size (int): population size of each island
+        hof_size (int): hall of fame size
+        stats (tools.Statistics): statistics with max and avg fields
+        processes (int): total number of evaluation processes
+        interval (int, optional): generations between migrations. Defaults to 5.
+        migrants (int, optional): best individuals sent to each neighbour. Defaults to 2.
+        topology (str, optional): 'ring' or 'complete'. Defaults to 'ring'.
+        chunksize (int, optional): individuals sent to worker at once. Defaults to 1.
+        cache_factory (Callable, optional): makes fitness cache of island. Defaults to None.
+        checkpoint (bool, optional): resume islands from checkpoints. Defaults to False.
+        checkpoint_dir (str, optional): folder of checkpoints. Defaults to 'bots_dump'.
+        keep (int, optional): checkpoints retained for each island. Defaults to 3.
+        seed (int, optional): base random seed of islands. Defaults to None.
+        kwargs: other arguments of algorithm
+
+    Returns:
+        Tuple[list, tools.Logbook, tools.HallOfFame]: all islands population,
+        merged logbook and common hall of fame
+    """
+    neighbours = make_topology(topology, num_islands)
+    transport = QueueTransport(num_islands)
+    results = multiprocessing.Queue()
+    islands = []
+    for index in range(num_islands):
+        migration = Migration(
+            island=index,
+            transport=transport,
+            neighbours=neighbours.get(index, []),
+            interval=interval,
+            migrants=migrants
+            )
+        island = multiprocessing.Process(
+            target=_run_island,
+            kwargs=dict(
+                index=index,
+                algorithm=algorithm,
+                toolbox=toolbox,
+                population_size=population_size,
+                hof_size=hof_size,
+                stats=stats,
+                migration=migration,
+                processes=max(1, processes // num_islands),
+                chunksize=chunksize,
+                cache_factory=cache_factory,
+                checkpoint=checkpoint,
+                checkpoint_dir=checkpoint_dir,
+                keep=keep,
+                seed=seed,
+                results=results,
+                kwargs=kwargs
+                )
+            )
+        island.start()
+        islands.append(island)
+
+    # results must be read before join, queue feeder blocks exit of island
+    collected = _collect_results(results, islands)
+    for island in islands:
+        island.join()
+
+    def individual(vector: List[int], values: Tuple[float]):
+        ind = creator.Individual(vector)
+        ind.fitness.values = values
+        return ind
+
+    population = [individual(*data) for result in collected for data in result[1]]
+    hof = tools.HallOfFame(hof_size)
+    hof.update([individual(*data) for result in collected for data in result[2]])
+    logbook = _merge_logbooks([result[3] for result in collected])
+    return population, logbook, hof
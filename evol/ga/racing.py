@@ -0,0 +1,208 @@
+from deap import tools
+from ga.workers import EvaluationPool, Fitness
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+from loguru import logger
+import math, statistics, time
+
+
+Scores = Dict[str, Any]
+# final fitness of played games: rewards and cross game score
+FinalFitness = Callable[[list, Dict[int, float]], float]
+
+
+class Bounds(NamedTuple):
+    """Mean score of individual and its confidence interval
+    """
+    mean: float
+    low: float
+    high: float
+
+
+class Race:
+    """Games, played by single individual during racing
+    """
+
+    def __init__(self, vector: List[int]) -> None:
+        self.vector = vector
+        self.rewards: list = []
+        self.cross_game_score: Dict[int, float] = {}
+        self.episodes: list = []
+
+    def add(self, scores: Scores) -> None:
+        """Append games of next stage, games are renumbered in order of playing
+
+        Args:
+            scores (Scores): rewards and cross game score of stage games
+        """
+        self.rewards.extend(scores['rewards'])
+        for value in scores['cross_game_score'].values():
+            self.cross_game_score[len(self.cross_game_score) + 1] = value
+        self.episodes.extend(scores.get('episodes', []))
+
+    @property
+    def scores(self) -> Scores:
+        scores = {'rewards': self.rewards, 'cross_game_score': self.cross_game_score}
+        if self.episodes:
+            scores['episodes'] = self.episodes
+        return scores
+
+    def samples(self, final_fitness: FinalFitness) -> List[float]:
+        """Fitness of each played game
+
+        NOTE: final scorings are means over games, so fitness of all games
+        is the mean of these samples
+        """
+        return [
+            final_fitness([reward], {1: score})
+            for reward, score in zip(self.rewards, self.cross_game_score.values())
+            ]
+
+    def bounds(self, final_fitness: FinalFitness, z: float) -> Bounds:
+        """Mean fitness and its confidence interval
+
+        Args:
+            final_fitness (FinalFitness): final scoring of games
+            z (float): half width of interval in standard errors
+
+        Returns:
+            Bounds: mean, low and high bounds, interval of single game is infinite
+        """
+        samples = self.samples(final_fitness)
+        mean = final_fitness(self.rewards, self.cross_game_score)
+        if len(samples) < 2:
+            return Bounds(mean=mean, low=-math.inf, high=math.inf)
+        error = z * statistics.stdev(samples) / math.sqrt(len(samples))
+        return Bounds(mean=mean, low=mean - error, high=mean + error)
+
+
+class Racing:
+    """Adaptive evaluation of individuals by racing with successive halving
+
+    All new individuals play min_episodes games. On each next stage number
+    of played games is multiplied by eta, but only for individuals,
+    that still can reach the top: upper bound of their confidence interval
+    is not lower than top-th best of lower bounds of racers and fitness of
+    hall of fame. Not more than 1/eta of racers with best mean pass to next stage.
+    Fitness is final scoring of all played games, so it is comparable with
+    fitness of full evaluation.
+
+    NOTE: racing replaces toolbox.map of generational flow, workers play games
+    with num_of_episodes argument of evaluation function or, if pool has
+    seed bank, with next games of the bank
+    """
+
+    def __init__(
+        self,
+        pool: EvaluationPool,
+        final_fitness: FinalFitness,
+        max_episodes: int,
+        min_episodes: int = 2,
+        eta: int = 2,
+        z: float = 1.96,
+        top: int = None,
+        halloffame: tools.HallOfFame = None
+        ) -> None:
+        if min_episodes < 1 or eta < 2:
+            raise ValueError('Racing needs min_episodes >= 1 and eta >= 2')
+        self.pool = pool
+        self.final_fitness = final_fitness
+        self.max_episodes = max_episodes
+        self.min_episodes = min(min_episodes, max_episodes)
+        self.eta = eta
+        self.z = z
+        self.top = top
+        self.halloffame = halloffame
+        self.episodes = 0
+
+    def _threshold(self, bounds: Dict[str, Bounds]) -> float:
+        """Lower bound of the top of racers and hall of fame
+        """
+        reference = [bound.low for bound in bounds.values()]
+        if self.halloffame is not None:
+            reference.extend(ind.fitness.values[0] for ind in self.halloffame.items)
+        top = self.top or max(1, len(self.halloffame or []))
+        reference.sort(reverse=True)
+        return reference[min(top, len(reference)) - 1]
+
+    def _survivors(self, keys: List[str], races: Dict[str, Race]) -> List[str]:
+        """Racers, that play the next stage
+        """
+        bounds = {key: races[key].bounds(self.final_fitness, self.z) for key in keys}
+        threshold = self._threshold(bounds)
+        alive = [key for key in keys if bounds[key].high >= threshold]
+        alive.sort(key=lambda key: bounds[key].mean, reverse=True)
+        return alive[:math.ceil(len(keys) / self.eta)]
+
+    def _stage(self, played: int, target: int) -> Dict[str, Any]:
+        """Arguments of evaluation function for games of stage
+        """
+        kwargs = dict(self.pool.kwargs)
+        bank = kwargs.pop('episodes', None)
+        if bank:
+            kwargs['episodes'] = bank[played:target]
+        else:
+            kwargs['num_of_episodes'] = target - played
+        return kwargs
+
+    def map(self, func: Callable, individuals: Iterable[List[int]]) -> List[Fitness]:
+        """Evaluate individuals by racing, compatible with toolbox.map
+
+        NOTE: as EvaluationPool.map - func is not used, cached and duplicated
+        genomes are evaluated once, cache keeps fitness of all played games
+
+        Args:
+            func (Callable): registered toolbox.evaluate
+            individuals (Iterable[List[int]]): genome vectors
+
+        Returns:
+            List[Fitness]: fitness for each individual in given order
+        """
+        start = time.perf_counter()
+        cache = self.pool.cache
+        individuals = list(individuals)
+        fitnesses: List[Optional[Fitness]] = [None] * len(individuals)
+        pending: Dict[str, List[int]] = {}
+        races: Dict[str, Race] = {}
+        for index, vector in enumerate(individuals):
+            key = self.pool.key(vector) if cache is not None else index
+            entry = cache.get(key) if cache is not None else None
+            if entry is not None:
+                fitnesses[index] = entry.fitness
+            elif key in pending:
+                pending[key].append(index)
+            else:
+                pending[key] = [index]
+                races[key] = Race(vector)
+
+        alive = list(races)
+        max_episodes = len(self.pool.kwargs.get('episodes') or []) or self.max_episodes
+        played, target, episodes = 0, min(self.min_episodes, max_episodes), 0
+        stages = []
+        while alive:
+            for result in self.pool.imap(
+                (races[key].vector for key in alive),
+                **self._stage(played, target)
+                ):
+                races[alive[result.index]].add(result.scores)
+            episodes += (target - played) * len(alive)
+            stages.append(len(alive))
+            played = target
+            if played >= max_episodes:
+                break
+            alive = self._survivors(alive, races)
+            target = min(played * self.eta, max_episodes)
+
+        for key, race in races.items():
+            fitness = (self.final_fitness(race.rewards, race.cross_game_score),)
+            for index in pending[key]:
+                fitnesses[index] = fitness
+            if cache is not None:
+                cache.put(key, fitness, race.scores)
+        self.episodes += episodes
+        if races:
+            logger.info(
+                f'Raced {len(races)} of {len(individuals)} individuals '
+                f'in {time.perf_counter() - start:.1f}s, racers by stage {stages}, '
+                f'{episodes} of {len(races) * max_episodes} episodes played'
+                )
+        return fitnesses
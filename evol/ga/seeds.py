@@ -0,0 +1,97 @@
+from engine.mapgen import MAP_SIZES
+from ga.workers import EvaluationPool
+from typing import List, Optional, Tuple
+from loguru import logger
+import random
+
+
+# map seed and size of single game
+Episode = Tuple[int, int]
+
+
+class SeedBank:
+    """Common random numbers: all individuals of generation play the same games
+
+    Bank keeps map seed and size of each game, sizes are balanced, and
+    seed of random opponent genome, so all individuals play the same opponent.
+    Bound pools send the bank to workers with each genome, so scores
+    of each seed are stored with fitness in cache and paired comparison
+    of individuals is not noised by map differences.
+
+    NOTE: bank is rotated every `rotate` generations, fitness of other
+    bank is not comparable, so elites must be evaluated again
+    """
+
+    def __init__(
+        self,
+        num_episodes: int,
+        sizes: List[int] = None,
+        rotate: int = 0,
+        seed: Optional[int] = None
+        ) -> None:
+        self.num_episodes = num_episodes
+        self.sizes = list(sizes or MAP_SIZES)
+        self.rotate = rotate
+        self.rng = random.Random(seed)
+        self.pools: List[EvaluationPool] = []
+        self.opponent_seed: int = None
+        self.episodes: List[Episode] = self._draw()
+
+    def _draw(self) -> List[Episode]:
+        sizes = [self.sizes[i % len(self.sizes)] for i in range(self.num_episodes)]
+        self.rng.shuffle(sizes)
+        episodes = [(self.rng.randint(0, 2 ** 31), size) for size in sizes]
+        self.opponent_seed = self.rng.randint(0, 2 ** 31)
+        return episodes
+
+    def _send(self, pool: EvaluationPool) -> None:
+        pool.kwargs['episodes'] = self.episodes
+        pool.kwargs['opponent_seed'] = self.opponent_seed
+
+    def bind(self, pool: EvaluationPool) -> None:
+        """Evaluate genomes of pool with games of bank
+
+        Args:
+            pool (EvaluationPool): evaluation pool
+        """
+        self.pools.append(pool)
+        self._send(pool)
+
+    def update(self, gen: int) -> bool:
+        """Draw new games, if it is time to rotate bank
+
+        Args:
+            gen (int): generation number
+
+        Returns:
+            bool: bank is rotated
+        """
+        if not self.rotate or gen % self.rotate:
+            return False
+        self.episodes = self._draw()
+        for pool in self.pools:
+            self._send(pool)
+        logger.info(f'Seed bank is rotated on gen {gen}: {self.episodes}, opponent seed {self.opponent_seed}')
+        return True
+
+    def get_state(self) -> dict:
+        """Json serializable state for checkpoints
+        """
+        version, state, gauss = self.rng.getstate()
+        return dict(episodes=self.episodes, opponent_seed=self.opponent_seed, rng=[version, list(state), gauss])
+
+    def set_state(self, state: dict) -> None:
+        """Restore state of checkpoint, bound pools get restored games
+        """
+        version, rng_state, gauss = state['rng']
+        self.rng.setstate((version, tuple(rng_state), gauss))
+        self.episodes = [tuple(episode) for episode in state['episodes']]
+        self.opponent_seed = state.get('opponent_seed', self.opponent_seed)
+        for pool in self.pools:
+            self._send(pool)
+
+    def __getstate__(self) -> dict:
+        # pools are not pickled to island processes
+        state = self.__dict__.copy()
+        state['pools'] = []
+        return state
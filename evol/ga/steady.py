@@ -0,0 +1,160 @@
+from deap import algorithms, tools
+from ga.workers import EvaluationPool
+from ga.checkpoint import Checkpointer
+from typing import Dict
+import click
+
+
+def eaSteadyState(
+    population,
+    toolbox,
+    pool: EvaluationPool,
+    cxpb: float,
+    mutpb: float,
+    max_evals: int,
+    stats=None,
+    halloffame=None,
+    verbose=__debug__,
+    freq: int = None,
+    checkpoint_freq: int = None,
+    checkpointer: Checkpointer = None,
+    in_flight: int = None,
+    start_evals: int = 0,
+    logbook: tools.Logbook = None
+    ):
+    """Asynchronous steady-state algorithm without generational barrier
+
+    As soon as any worker returns fitness, the offspring replaces the worst
+    individual of population, if it is not worse, and new offspring is bred
+    from current population and dispatched. So in_flight offspring are always
+    evaluated. Finished offspring, cached ones included, are counted for
+    budget, statistics are recorded every freq offspring and checkpoint is
+    written every checkpoint_freq offspring, its version is this number.
+    Final statistics and checkpoint are always written.
+
+    NOTE: cached genomes are inserted at once without dispatching. Offspring,
+    that are in flight at checkpoint, are bred again by resumed flow
+
+    Args:
+        population (list): initial population
+        toolbox (base.Toolbox): toolbox with select, mate, mutate and clone
+        pool (EvaluationPool): evaluation pool
+        cxpb (float): probability of crossover
+        mutpb (float): probability of mutation
+        max_evals (int): number of bred offspring, cached ones included
+        stats (tools.Statistics, optional): statistics. Defaults to None.
+        halloffame (tools.HallOfFame, optional): hall of fame. Defaults to None.
+        verbose (bool, optional): echo logbook. Defaults to __debug__.
+        freq (int, optional): offspring between records. Defaults to population size.
+        checkpoint_freq (int, optional): offspring between checkpoints. Defaults to None.
+        checkpointer (Checkpointer, optional): checkpoints writer. Defaults to None.
+        in_flight (int, optional): offspring evaluated at once. Defaults to number of workers.
+        start_evals (int, optional): bred offspring of resumed flow. Defaults to 0.
+        logbook (tools.Logbook, optional): logbook of resumed flow. Defaults to None.
+
+    Returns:
+        Tuple[list, tools.Logbook]: final population and logbook
+    """
+    if halloffame is None:
+        raise ValueError("halloffame parameter must not be empty!")
+    freq = freq or len(population)
+    in_flight = in_flight or pool.processes
+
+    resumed = logbook is not None
+    if not resumed:
+        logbook = tools.Logbook()
+        logbook.header = ['evals', 'nevals'] + (stats.fields if stats else [])
+
+    # Evaluate the individuals with an invalid fitness
+    invalid_ind = [ind for ind in population if not ind.fitness.valid]
+    fitnesses = pool.map(toolbox.evaluate, invalid_ind)
+    for ind, fit in zip(invalid_ind, fitnesses):
+        ind.fitness.values = fit
+    halloffame.update(population)
+
+    if not resumed:
+        record = stats.compile(population) if stats else {}
+        logbook.record(evals=0, nevals=len(invalid_ind), **record)
+        if verbose:
+            click.echo(logbook.stream)
+    else:
+        # restored records are not streamed again, resumed output starts with header
+        logbook.buffindex = len(logbook)
+        if verbose:
+            click.echo('\t'.join(logbook.header))
+
+    pending: Dict[int, object] = {}
+    ticket = 0
+    # finished offspring, cached ones included: budget, records and checkpoints
+    bred = start_evals
+    nevals = 0
+    recorded = saved = bred
+
+    def breed():
+        child = toolbox.clone(toolbox.select(population, 1)[0])
+        mate = toolbox.clone(toolbox.select(population, 1)[0])
+        child, _ = algorithms.varAnd([child, mate], toolbox, cxpb, mutpb)
+        if child.fitness.valid:
+            # unchanged copy of parent is not evaluated again
+            toolbox.mutate(child)
+            del child.fitness.values
+        return child
+
+    def record() -> None:
+        nonlocal nevals, recorded
+        values = stats.compile(population) if stats else {}
+        logbook.record(evals=bred, nevals=nevals, **values)
+        nevals = 0
+        recorded = bred
+        if verbose:
+            click.echo(logbook.stream)
+
+    def save() -> None:
+        nonlocal saved
+        checkpointer.save(bred, population, halloffame, logbook)
+        saved = bred
+
+    def insert(child) -> None:
+        nonlocal bred
+        worst = min(range(len(population)), key=lambda i: population[i].fitness.values)
+        if child.fitness.values >= population[worst].fitness.values:
+            population[worst] = child
+        halloffame.update([child])
+        bred += 1
+        if bred % freq == 0:
+            record()
+        if checkpointer is not None and checkpoint_freq and bred % checkpoint_freq == 0:
+            save()
+
+    def dispatch() -> None:
+        nonlocal ticket
+        while len(pending) < in_flight and bred + len(pending) < max_evals:
+            child = breed()
+            if pool.cache is not None:
+                entry = pool.cache.get(pool.key(child))
+                if entry is not None:
+                    child.fitness.values = entry.fitness
+                    insert(child)
+                    continue
+            pending[ticket] = child
+            pool.submit(ticket, child)
+            ticket += 1
+
+    dispatch()
+    while pending:
+        result = pool.next_result()
+        child = pending.pop(result.index)
+        child.fitness.values = result.fitness
+        if pool.cache is not None:
+            pool.cache.put(pool.key(child), result.fitness, result.scores)
+        nevals += 1
+        insert(child)
+        dispatch()
+
+    # the last offspring can be cached ones, so final state is written here
+    if recorded != bred:
+        record()
+    if checkpointer is not None and saved != bred:
+        save()
+
+    return population, logbook
@@ -0,0 +1,196 @@
+from bots.utility import AD
+from bots.profiler import PROFILER, Profiler, Snapshot
+from ga.cache import FitnessCache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+from loguru import logger
+import multiprocessing, queue, time
+
+
+Fitness = Tuple[float]
+# evaluation function returns fitness and per game scores
+Evaluate = Callable[[List[int]], Tuple[Fitness, Any]]
+
+# evaluation function of the worker process, set once by _init_worker
+_evaluate: Evaluate = None
+
+
+class EvalResult(NamedTuple):
+    """Result of single evaluation, returned by worker
+    """
+    index: int
+    fitness: Fitness
+    scores: Any
+    seconds: float
+    profile: Snapshot = None
+
+
+def _init_worker(evaluate: Evaluate) -> None:
+    """Warm up worker process once: keep evaluation function and build tables
+
+    Args:
+        evaluate (Evaluate): function of genome vector, returns fitness and scores
+    """
+    global _evaluate
+    _evaluate = evaluate
+    AD.preload()
+
+
+def _run(task: Tuple[int, List[int], Dict[str, Any]]) -> EvalResult:
+    """Evaluate one genome vector in worker process
+
+    Args:
+        task (Tuple[int, List[int], Dict[str, Any]]): index of individual,
+        genome vector and keyword arguments of evaluation function
+
+    Returns:
+        EvalResult: index, fitness, scores and evaluation time
+    """
+    index, vector, kwargs = task
+    start = time.perf_counter()
+    fitness, scores = _evaluate(vector, **kwargs)
+    profile = None
+    if PROFILER.enabled:
+        # bot times of this evaluation are sent with result
+        profile = PROFILER.snapshot()
+        PROFILER.reset()
+    return EvalResult(
+        index=index,
+        fitness=fitness,
+        scores=scores,
+        seconds=time.perf_counter() - start,
+        profile=profile
+        )
+
+
+class EvaluationPool:
+    """Pool of warm evaluation workers
+
+    NOTE: each worker gets evaluation function once at start, tasks
+    are plain genome vectors. Results are streamed back in order of
+    completion, so slow games don't stall other workers. If cache is
+    given, only new genomes are sent to workers. Keyword arguments
+    of evaluation function in self.kwargs are sent with each genome
+    and are part of cache key. If bot profiling is enabled, bot times
+    of workers are collected in self.profile
+    """
+
+    def __init__(
+        self,
+        evaluate: Evaluate,
+        processes: int = None,
+        chunksize: int = 1,
+        cache: FitnessCache = None
+        ) -> None:
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunksize = chunksize
+        self.cache = cache
+        self.timings: List[float] = []
+        self.kwargs: Dict[str, Any] = {}
+        self.profile = Profiler()
+        self._done: queue.Queue = queue.Queue()
+        self.pool = multiprocessing.Pool(
+            processes=self.processes,
+            initializer=_init_worker,
+            initargs=(evaluate,)
+            )
+
+    def key(self, vector: List[int]) -> str:
+        """Cache key of genome vector with current evaluation arguments
+        """
+        return self.cache.key(vector, self.kwargs)
+
+    def imap(self, individuals: Iterable[List[int]], **kwargs) -> Iterator[EvalResult]:
+        """Evaluate individuals and yield results as they are ready
+
+        Args:
+            individuals (Iterable[List[int]]): genome vectors
+            kwargs: arguments of evaluation function, for example num_of_episodes,
+            self.kwargs are used if not given
+
+        Yields:
+            Iterator[EvalResult]: results in order of completion
+        """
+        kwargs = kwargs or self.kwargs
+        tasks = ((index, list(vector), kwargs) for index, vector in enumerate(individuals))
+        for result in self.pool.imap_unordered(_run, tasks, chunksize=self.chunksize):
+            if result.profile:
+                self.profile.merge(result.profile)
+            yield result
+
+    def submit(self, ticket: int, vector: List[int]) -> None:
+        """Dispatch single genome vector without waiting for result
+
+        Args:
+            ticket (int): id of task, returned as index of result
+            vector (List[int]): genome vector
+        """
+        self.pool.apply_async(
+            _run,
+            ((ticket, list(vector), self.kwargs),),
+            callback=self._done.put,
+            error_callback=self._done.put
+            )
+
+    def next_result(self) -> EvalResult:
+        """Wait for any submitted genome
+
+        Returns:
+            EvalResult: first completed result
+        """
+        result = self._done.get()
+        if isinstance(result, BaseException):
+            raise result
+        if result.profile:
+            self.profile.merge(result.profile)
+        return result
+
+    def map(self, func: Evaluate, individuals: Iterable[List[int]]) -> List[Fitness]:
+        """Evaluate individuals, compatible with toolbox.map
+
+        NOTE: func is not sent to workers, they use evaluation function,
+        given at pool start. Cached and duplicated genomes are evaluated
+        once. Evaluation times of dispatched genomes are kept in self.timings
+
+        Args:
+            func (Evaluate): registered toolbox.evaluate
+            individuals (Iterable[List[int]]): genome vectors
+
+        Returns:
+            List[Fitness]: fitness for each individual in given order
+        """
+        start = time.perf_counter()
+        individuals = list(individuals)
+        fitnesses: List[Fitness] = [None] * len(individuals)
+        pending: Dict[str, List[int]] = {}
+        vectors = []
+        for index, vector in enumerate(individuals):
+            key = self.key(vector) if self.cache is not None else index
+            entry = self.cache.get(key) if self.cache is not None else None
+            if entry is not None:
+                fitnesses[index] = entry.fitness
+            elif key in pending:
+                pending[key].append(index)
+            else:
+                pending[key] = [index]
+                vectors.append(vector)
+
+        keys = list(pending)
+        self.timings = []
+        for result in self.imap(vectors):
+            key = keys[result.index]
+            for index in pending[key]:
+                fitnesses[index] = result.fitness
+            if self.cache is not None:
+                self.cache.put(key, result.fitness, result.scores)
+            self.timings.append(result.seconds)
+        if self.timings:
+            logger.info(
+                f'Evaluated {len(self.timings)} of {len(individuals)} individuals '
+                f'in {time.perf_counter() - start:.1f}s, '
+                f'mean {sum(self.timings) / len(self.timings):.1f}s, max {max(self.timings):.1f}s'
+                )
+        return fitnesses
+
+    def close(self) -> None:
+        self.pool.close()
+        self.pool.join()
@@ -1,14 +1,17 @@
 from .constants import Constants
-from .game_map import GameMap
+from .game_map import GameMap, Position, Resource
 from .game_objects import Player, Unit, City, CityTile
 
 INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
 
 
 class Game:
-    def _initialize(self, messages):
+    def _initialize(self, messages, incremental=True):
         """
         initialize state
+
+        incremental - reuse map cells and game objects between turns
+        instead of rebuilding them on each update
         """
         self.id = int(messages[0])
         self.turn = -1
@@ -18,6 +21,14 @@ class Game:
         self.map_height = int(mapInfo[1])
         self.map = GameMap(self.map_width, self.map_height)
         self.players = [Player(0), Player(1)]
+        self.incremental = incremental
+        # persistent objects and cells, changed in previous turn
+        self._units = {}
+        self._cities = {}
+        self._citytiles = {}
+        self._resource_cells = []
+        self._citytile_cells = []
+        self._road_cells = []
 
     def _end_turn(self):
         print("D_FINISH")
@@ -34,6 +45,15 @@ class Game:
         """
         update state
         """
+        if self.incremental:
+            self._update_incremental(messages)
+        else:
+            self._update_full(messages)
+
+    def _update_full(self, messages):
+        """
+        update state by rebuilding map and game objects
+        """
         self.map = GameMap(self.map_width, self.map_height)
         self.turn += 1
         self._reset_player_states()
@@ -84,3 +104,112 @@ class Game:
                 y = int(strs[2])
                 road = float(strs[3])
                 self.map.get_cell(x, y).road = road
+
+    def _update_incremental(self, messages):
+        """
+        update state by mutating map cells and objects of previous turn
+
+        only cells, that had resource, citytile or road in previous turn
+        are reset, units, cities and citytiles are kept by id and reused
+        """
+        self.turn += 1
+        self._reset_player_states()
+        rows = self.map.map
+
+        # resources, that are absent in this update, are marked by -1
+        stale_resource_cells = self._resource_cells
+        for cell in stale_resource_cells:
+            cell.resource.amount = -1
+        for cell in self._citytile_cells:
+            cell.citytile = None
+        for cell in self._road_cells:
+            cell.road = 0
+        resource_cells = []
+        citytile_cells = []
+        road_cells = []
+        prev_units = self._units
+        prev_cities = self._cities
+        prev_citytiles = self._citytiles
+        units = {}
+        cities = {}
+        citytiles = {}
+
+        for update in messages:
+            if update == "D_DONE":
+                break
+            strs = update.split(" ")
+            input_identifier = strs[0]
+            if input_identifier == INPUT_CONSTANTS.RESOURCES:
+                cell = rows[int(strs[3])][int(strs[2])]
+                amt = int(float(strs[4]))
+                if cell.resource is None:
+                    cell.resource = Resource(strs[1], amt)
+                else:
+                    cell.resource.type = strs[1]
+                    cell.resource.amount = amt
+                resource_cells.append(cell)
+            elif input_identifier == INPUT_CONSTANTS.UNITS:
+                team = int(strs[2])
+                unitid = strs[3]
+                x = int(strs[4])
+                y = int(strs[5])
+                unit = prev_units.get(unitid)
+                if unit is None or unit.team != team:
+                    unit = Unit(team, int(strs[1]), unitid, x, y, float(strs[6]),
+                                int(strs[7]), int(strs[8]), int(strs[9]))
+                else:
+                    if unit.pos.x != x or unit.pos.y != y:
+                        unit.pos = Position(x, y)
+                    unit.type = int(strs[1])
+                    unit.cooldown = float(strs[6])
+                    unit.cargo.wood = int(strs[7])
+                    unit.cargo.coal = int(strs[8])
+                    unit.cargo.uranium = int(strs[9])
+                units[unitid] = unit
+                self.players[team].units.append(unit)
+            elif input_identifier == INPUT_CONSTANTS.CITY:
+                team = int(strs[1])
+                cityid = strs[2]
+                city = prev_cities.get(cityid)
+                if city is None or city.team != team:
+                    city = City(team, cityid, float(strs[3]), float(strs[4]))
+                else:
+                    city.fuel = float(strs[3])
+                    city.light_upkeep = float(strs[4])
+                    city.citytiles = []
+                cities[cityid] = city
+                self.players[team].cities[cityid] = city
+            elif input_identifier == INPUT_CONSTANTS.CITY_TILES:
+                team = int(strs[1])
+                cityid = strs[2]
+                cell = rows[int(strs[4])][int(strs[3])]
+                cooldown = float(strs[5])
+                city = self.players[team].cities[cityid]
+                citytile = prev_citytiles.get(cell)
+                if citytile is None or citytile.team != team:
+                    citytile = city._add_city_tile(cell.pos.x, cell.pos.y, cooldown)
+                else:
+                    citytile.cityid = cityid
+                    citytile.cooldown = cooldown
+                    city.citytiles.append(citytile)
+                citytiles[cell] = citytile
+                cell.citytile = citytile
+                citytile_cells.append(cell)
+                self.players[team].city_tile_count += 1
+            elif input_identifier == INPUT_CONSTANTS.ROADS:
+                cell = rows[int(strs[2])][int(strs[1])]
+                cell.road = float(strs[3])
+                road_cells.append(cell)
+            elif input_identifier == INPUT_CONSTANTS.RESEARCH_POINTS:
+                team = int(strs[1])
+                self.players[team].research_points = int(strs[2])
+
+        for cell in stale_resource_cells:
+            if cell.resource is not None and cell.resource.amount == -1:
+                cell.resource = None
+        self._resource_cells = resource_cells
+        self._citytile_cells = citytile_cells
+        self._road_cells = road_cells
+        self._units = units
+        self._cities = cities
+        self._citytiles = citytiles
@@ -14,6 +14,8 @@ class Resource:
 
 
 class Cell:
+    __slots__ = ("pos", "resource", "citytile", "road")
+
     def __init__(self, x, y):
         self.pos = Position(x, y)
         self.resource: Resource = None
@@ -48,6 +50,8 @@ class GameMap:
 
 
 class Position:
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -65,8 +69,20 @@ class Position:
         return (self - pos) <= 1
 
     def __eq__(self, pos) -> bool:
+        if not isinstance(pos, Position):
+            return NotImplemented
         return self.x == pos.x and self.y == pos.y
 
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+    def __iter__(self):
+        """
+        Unpack position as x, y
+        """
+        yield self.x
+        yield self.y
+
     def equals(self, pos):
         return self == pos
 
@@ -13,12 +13,16 @@ tar -czvf submissions/submission.tar.gz \
 --exclude="img" \
 --exclude="submissions" \
 --exclude="runner.py" \
+--exclude="engine" \
+--exclude="ga" \
 --exclude="agent_test.py" \
 --exclude="agent_random.py" \
 --exclude="agent_train.py" \
 --exclude="npstatements.py" \
 --exclude="tournament.py" \
 --exclude="evol.py" \
+--exclude="benchmark.py" \
+--exclude="benchmarks" \
 --exclude="scoring.py" \
 --exclude="bots_dump/hall_of_fame.json" \
 --exclude="shared.env" \
@@ -9,9 +9,15 @@ import click
 @click.option('--player', default='agent_test.py', show_default=True)
 @click.option('--opponent', default='simple_agent', show_default=True)
 @click.option('--path', 'path_to_replay', show_default=True, default='replays/replay.json')
-def run(debug, player, opponent, path_to_replay):
+@click.option('--trace/--no-trace', default=True, show_default=True, help='trace bot pipeline to log')
+@click.option('--profile/--no-profile', default=False, show_default=True,
+    help='profile stages of bot pipeline, report is written to errorlogs/profile.*')
+def run(debug, player, opponent, path_to_replay, trace, profile):
     
     click.echo(f'Start game with player: {player}, opponent: {opponent} with debug: {debug}')
+    # must be set before bots are imported by agents
+    os.environ['BOT_TRACE'] = '1' if trace else '0'
+    os.environ['BOT_PROFILE'] = '1' if profile else '0'
     logger.remove()
     logger.add(open(
         'errorlogs/run_test.log', 'w'),
@@ -38,6 +44,11 @@ def run(debug, player, opponent, path_to_replay):
         os.remove(path_to_replay)
     with open(path_to_replay, "w") as f:
         json.dump(replay, f)
+
+    if profile:
+        from bots.profiler import PROFILER
+        for path in PROFILER.write('errorlogs/profile'):
+            click.echo(f'Profile: {path}')
         
     click.echo('Game success!')
 
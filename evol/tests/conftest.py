@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules are imported from evol folder, as scripts of evol do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+from engine.simulator import LuxEngine, Observation, SimpleAgent, PARAMETERS
+from engine.batch import BatchLuxEngine
+from bots.genutil import GenConstruct
+from bots.statements import SubGameSpace
+from loguru import logger
+import agent_train
+import pytest
+import random
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    logger.disable('')
+    yield
+    logger.enable('')
+
+
+def make_agents(seed: int) -> list:
+    gen_const = GenConstruct()
+    rng = random.Random(seed)
+    genome = gen_const.convert_daily_genome([rng.randint(1, 10) for _ in range(18 * gen_const.prob_len)])
+    trained = agent_train.TrainAgent(
+        genome=genome, gen_const=gen_const, subgame_space=SubGameSpace(), early_stop=False
+        )
+    return [trained, SimpleAgent()]
+
+
+@pytest.mark.parametrize('size', [12, 16, 24, 32])
+@pytest.mark.parametrize('seed', [5, 7])
+def test_updates_are_identical_every_turn(size, seed):
+    random.seed(seed)
+    local = LuxEngine(size=size, seed=seed)
+    batch = BatchLuxEngine(size=size, seeds=[seed])
+    agents = make_agents(seed)
+    while local.turn < PARAMETERS['MAX_DAYS'] and not local.done:
+        updates = local.get_updates()
+        assert batch.get_updates(0) == updates, f'turn {local.turn}'
+        actions = []
+        for team, agent in enumerate(agents):
+            observation = Observation(
+                player=team,
+                step=local.turn,
+                updates=updates if local.turn else [str(team), f'{size} {size}'] + updates,
+                remainingOverageTime=60,
+                reward=0
+                )
+            actions.append(agent(observation, {}) or [])
+        local.step(actions)
+        batch.step([actions])
+        assert batch.done[0] == local.done, f'turn {local.turn}'
+    assert batch.rewards()[0].tolist() == local.rewards()
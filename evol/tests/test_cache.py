@@ -0,0 +1,50 @@
+from ga.cache import FitnessCache
+
+
+def test_key_depends_on_genome_and_context():
+    cache = FitnessCache(context={'opponent': 'simple_agent'})
+    key = cache.key([1, 2, 3])
+    assert key == cache.key([1, 2, 3])
+    assert key != cache.key([1, 2, 4])
+    assert key != cache.key([1, 2, 3], extra={'episodes': [[1, 12]]})
+    assert key != FitnessCache(context={'opponent': 'random'}).key([1, 2, 3])
+
+
+def test_hits_and_misses():
+    cache = FitnessCache(context={})
+    key = cache.key([1])
+    assert cache.get(key) is None
+    cache.put(key, (2.0,), scores=[3])
+    entry = cache.get(key)
+    assert entry.fitness == (2.0,)
+    assert entry.scores == [3]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FitnessCache(context={}, maxsize=2)
+    first, second, third = (cache.key([value]) for value in range(3))
+    cache.put(first, (1.0,))
+    cache.put(second, (2.0,))
+    cache.get(first)
+    cache.put(third, (3.0,))
+    assert len(cache) == 2
+    assert cache.get(second) is None
+    assert cache.get(first).fitness == (1.0,)
+    assert [key for key, _ in cache.fitness_items()] == [third, first]
+
+
+def test_entries_survive_in_shelve(tmp_path):
+    path = str(tmp_path / 'fitness')
+    cache = FitnessCache(context={}, maxsize=1, path=path)
+    first, second = cache.key([1]), cache.key([2])
+    cache.put(first, (1.0,), scores=[1])
+    cache.put(second, (2.0,), scores=[2])
+    # evicted from memory entry is read from shelve
+    assert cache.get(first).fitness == (1.0,)
+    cache.close()
+
+    cache = FitnessCache(context={}, path=path)
+    assert cache.get(second) == ((2.0,), [2])
+    assert cache.hits == 1
+    cache.close()
@@ -0,0 +1,145 @@
+from deap import base, creator, tools
+from ga.cache import FitnessCache
+from ga.checkpoint import Checkpointer
+from ga.seeds import SeedBank
+from ga.steady import eaSteadyState
+from ga.workers import EvaluationPool
+import numpy as np
+import pytest
+import os, random
+
+
+GENOME_SIZE = 12
+
+
+@pytest.fixture(scope='module', autouse=True)
+def classes():
+    if not hasattr(creator, 'FitnessMax'):
+        creator.create('FitnessMax', base.Fitness, weights=(1.0,))
+    if not hasattr(creator, 'Individual'):
+        creator.create('Individual', list, fitness=creator.FitnessMax)
+
+
+def evaluate(vector, **kwargs):
+    return (float(sum(value * (index % 3 + 1) for index, value in enumerate(vector))),), None
+
+
+def make_toolbox() -> base.Toolbox:
+    toolbox = base.Toolbox()
+    toolbox.register('gene', random.randint, 0, 10)
+    toolbox.register('individual', tools.initRepeat, creator.Individual, toolbox.gene, GENOME_SIZE)
+    toolbox.register('population', tools.initRepeat, list, toolbox.individual)
+    toolbox.register('evaluate', evaluate)
+    toolbox.register('select', tools.selTournament, tournsize=3)
+    toolbox.register('mate', tools.cxUniform, indpb=0.5)
+    toolbox.register('mutate', tools.mutUniformInt, low=0, up=10, indpb=0.2)
+    return toolbox
+
+
+def state(population: list) -> list:
+    return [(list(ind), ind.fitness.values if ind.fitness.valid else None) for ind in population]
+
+
+def test_round_trip_restores_state(tmp_path):
+    random.seed(1)
+    np.random.seed(1)
+    toolbox = make_toolbox()
+    population = toolbox.population(n=6)
+    for ind in population[:4]:
+        ind.fitness.values = evaluate(ind)[0]
+    halloffame = tools.HallOfFame(2)
+    halloffame.update(population[:4])
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals']
+    logbook.record(gen=0, nevals=4)
+    cache = FitnessCache(context={'test': 1})
+    cache.put(cache.key([1, 2, 3]), (6.0,), scores=[1, 2])
+    seed_bank = SeedBank(num_episodes=4, sizes=[12, 16], rotate=1, seed=7)
+    Checkpointer(directory=str(tmp_path), cache=cache, seed_bank=seed_bank).save(
+        3, population, halloffame, logbook, note='extra'
+        )
+    expected = (random.random(), np.random.random_sample(), seed_bank.episodes)
+
+    # state is changed after checkpoint
+    random.random()
+    np.random.random_sample()
+    seed_bank.update(1)
+    cache = FitnessCache(context={'test': 1})
+    loaded = Checkpointer(directory=str(tmp_path), cache=cache, seed_bank=seed_bank).load()
+
+    assert loaded.version == 3
+    assert state(loaded.population) == state(population)
+    assert state(loaded.halloffame.items) == state(halloffame.items)
+    assert loaded.halloffame.maxsize == 2
+    assert loaded.logbook.header == logbook.header
+    assert list(loaded.logbook) == list(logbook)
+    assert loaded.extra == {'note': 'extra'}
+    assert (random.random(), np.random.random_sample(), seed_bank.episodes) == expected
+    assert cache.get(cache.key([1, 2, 3])).fitness == (6.0,)
+
+
+def test_keeps_last_checkpoints_and_survives_failed_write(tmp_path, monkeypatch):
+    toolbox = make_toolbox()
+    population = toolbox.population(n=4)
+    halloffame = tools.HallOfFame(1)
+    checkpointer = Checkpointer(directory=str(tmp_path), keep=2)
+    for version in range(1, 6):
+        checkpointer.save(version, population, halloffame, tools.Logbook())
+    assert checkpointer.versions() == [4, 5]
+
+    def crash(src, dst):
+        raise OSError('disk is full')
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        checkpointer.save(6, population, halloffame, tools.Logbook())
+    monkeypatch.undo()
+    assert checkpointer.versions() == [4, 5]
+    assert checkpointer.load().version == 5
+    assert not any(name.endswith('.npz') and '_6' in name for name in os.listdir(tmp_path))
+
+
+def run_steady(directory: str, max_evals: int, resume: int = None) -> tuple:
+    toolbox = make_toolbox()
+    cache = FitnessCache(context={'test': 2})
+    checkpointer = Checkpointer(directory=directory, keep=0, cache=cache)
+    if resume is None:
+        random.seed(5)
+        np.random.seed(5)
+        population = toolbox.population(n=8)
+        halloffame = tools.HallOfFame(2)
+        start_evals, logbook = 0, None
+    else:
+        # random states of new process are restored from checkpoint
+        random.seed(99)
+        np.random.seed(99)
+        loaded = checkpointer.load(resume)
+        population, halloffame = loaded.population, loaded.halloffame
+        start_evals, logbook = loaded.version, loaded.logbook
+    pool = EvaluationPool(evaluate=evaluate, processes=1, cache=cache)
+    try:
+        population, logbook = eaSteadyState(
+            population,
+            toolbox,
+            pool=pool,
+            cxpb=0.5,
+            mutpb=0.3,
+            max_evals=max_evals,
+            halloffame=halloffame,
+            verbose=False,
+            freq=8,
+            checkpoint_freq=16,
+            checkpointer=checkpointer,
+            start_evals=start_evals,
+            logbook=logbook
+            )
+    finally:
+        pool.close()
+    return state(population), state(halloffame.items), list(logbook)
+
+
+def test_resumed_flow_gives_identical_results(tmp_path):
+    full = run_steady(str(tmp_path / 'full'), max_evals=48)
+    run_steady(str(tmp_path / 'part'), max_evals=16)
+    resumed = run_steady(str(tmp_path / 'part'), max_evals=48, resume=16)
+    assert resumed == full
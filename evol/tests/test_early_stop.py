@@ -0,0 +1,75 @@
+from engine.simulator import (
+    LuxEngine, Observation, SimpleAgent, GameDecided, UNIT_TYPES, PARAMETERS
+)
+from bots.genutil import GenConstruct
+from bots.statements import SubGameSpace
+from loguru import logger
+import agent_train
+import pytest
+import random
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    logger.disable('')
+    yield
+    logger.enable('')
+
+
+def play_decided(cargos: list, early_stop: bool, seed: int = 3, size: int = 12) -> tuple:
+    """Play game, where player 0 has only carts with given cargo from the start
+
+    Returns:
+        tuple: cross game score and reward of player 0
+    """
+    random.seed(seed)
+    engine = LuxEngine(size=size, seed=seed)
+    player = engine.players[0]
+    (citytile,) = [citytile for city in player.cities.values() for citytile in city.citytiles]
+    engine.map.get_cell(citytile.pos.x, citytile.pos.y).citytile = None
+    player.cities.clear()
+    player.units.clear()
+    for wood, coal, uranium in cargos:
+        cart = engine._spawn_unit(team=0, u_type=UNIT_TYPES.CART, x=citytile.pos.x, y=citytile.pos.y)
+        cart.cargo.wood, cart.cargo.coal, cart.cargo.uranium = wood, coal, uranium
+
+    gen_const = GenConstruct()
+    rng = random.Random(seed)
+    genome = gen_const.convert_daily_genome([rng.randint(1, 10) for _ in range(18 * gen_const.prob_len)])
+    subgame_space = SubGameSpace()
+    agents = [
+        agent_train.TrainAgent(
+            genome=genome, gen_const=gen_const, subgame_space=subgame_space, early_stop=early_stop
+            ),
+        SimpleAgent()
+        ]
+    while engine.turn < PARAMETERS['MAX_DAYS'] and not engine.done:
+        updates = engine.get_updates()
+        actions = []
+        for team, agent in enumerate(agents):
+            observation = Observation(
+                player=team,
+                step=engine.turn,
+                updates=updates if engine.turn else [str(team), f'{size} {size}'] + updates,
+                remainingOverageTime=60,
+                reward=0
+                )
+            try:
+                actions.append(agent(observation, {}) or [])
+            except GameDecided as ex:
+                return dict(subgame_space.cross_game_score), ex.reward
+        engine.step(actions)
+    return dict(subgame_space.cross_game_score), engine.rewards()[0]
+
+
+@pytest.mark.parametrize('cargos', [
+    [(0, 0, 0)],
+    [(100, 0, 0), (0, 0, 0)],
+    [(100, 0, 0), (0, 50, 0), (0, 0, 20), (30, 10, 1)],
+    [(2000, 0, 0), (0, 0, 400)],
+    ])
+def test_early_stop_scores_as_full_game(cargos):
+    score, reward = play_decided(cargos, early_stop=True)
+    assert (score, reward) == play_decided(cargos, early_stop=False)
+    # score is summed over turns, not taken from the last turn
+    assert score[0] > len(cargos)
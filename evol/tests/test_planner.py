@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from bots.planner import MovePlanner
+
+
+def planner_on_road(road: float, night: bool = False) -> MovePlanner:
+    planner = MovePlanner.__new__(MovePlanner)
+    cell = SimpleNamespace(road=road)
+    game_map = SimpleNamespace(get_cell=lambda x, y: cell)
+    planner.turn_space = SimpleNamespace(tiles=SimpleNamespace(game_state=SimpleNamespace(map=game_map)))
+    planner.night = night
+    planner.costs = {}
+    return planner
+
+
+def engine_turns(cooldown: float, road: float) -> int:
+    turns = 0
+    while True:
+        cooldown = max(cooldown - 1 - road, 0)
+        turns += 1
+        if cooldown < 1:
+            return turns
+
+
+def test_cooldown_follows_engine_with_fractional_roads():
+    worker = SimpleNamespace(type=0, is_worker=lambda: True)
+    cart = SimpleNamespace(type=1, is_worker=lambda: False)
+    for road in (0., 0.75, 1.5, 2.25, 3., 6.):
+        for night in (False, True):
+            for unit, cooldown in ((worker, 2), (cart, 3)):
+                planner = planner_on_road(road, night)
+                base = cooldown * 2 if night else cooldown
+                assert planner._cooldown(unit, (0, 0)) == engine_turns(base, road)
+    assert planner_on_road(0.75)._cooldown(worker, (0, 0)) == 1
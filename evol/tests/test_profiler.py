@@ -0,0 +1,18 @@
+from types import SimpleNamespace
+
+from bots.profiler import PROFILER, _wrap
+
+
+def get_actions(genome, game_state, player=None):
+    return genome
+
+
+def test_root_turn_of_positional_and_keyword_call():
+    PROFILER.reset()
+    wrapped = _wrap(get_actions, 'turn', root=True)
+    assert wrapped([1], SimpleNamespace(turn=3)) == [1]
+    wrapped(genome=[1], game_state=SimpleNamespace(turn=3))
+    wrapped([1], game_state=SimpleNamespace(turn=4), player=None)
+    assert PROFILER.stats['turn'][0] == 3
+    assert {turn: stat[0] for turn, stat in PROFILER.turns.items()} == {3: 2, 4: 1}
+    PROFILER.reset()
@@ -0,0 +1,31 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+from bots.genutil import GenConstruct
+from ga.seeds import SeedBank
+
+
+def test_seeded_opponent_genome_is_the_same():
+    gen_const = GenConstruct()
+    first = gen_const.init_daily_genome(rng=random.Random(3))
+    second = gen_const.init_daily_genome(rng=random.Random(3))
+    other = gen_const.init_daily_genome(rng=random.Random(4))
+    assert np.array_equal(first.weights, second.weights)
+    assert not np.array_equal(first.weights, other.weights)
+
+
+def test_bank_sends_opponent_seed_and_rotates_it():
+    pool = SimpleNamespace(kwargs={})
+    bank = SeedBank(num_episodes=2, sizes=[12], rotate=2, seed=1)
+    bank.bind(pool)
+    opponent_seed = bank.opponent_seed
+    assert pool.kwargs == {'episodes': bank.episodes, 'opponent_seed': opponent_seed}
+    assert not bank.update(1)
+    assert pool.kwargs['opponent_seed'] == opponent_seed
+    state = bank.get_state()
+    assert bank.update(2)
+    assert pool.kwargs['opponent_seed'] == bank.opponent_seed != opponent_seed
+    bank.set_state(state)
+    assert pool.kwargs['opponent_seed'] == opponent_seed